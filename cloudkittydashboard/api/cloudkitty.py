@@ -14,18 +14,92 @@
 # under the License.
 #
 from collections import abc
+from collections import OrderedDict
+from concurrent import futures
+import datetime
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
 
 from django.conf import settings
-from horizon.utils.memoized import memoized  # noqa
+from django.core.cache import cache
+from django.utils import timezone
+from keystoneauth1 import exceptions as ks_exceptions
 from keystoneauth1.identity.v3 import Token
 
 from cloudkittyclient import client as ck_client
+from openstack_dashboard.api import keystone as api_keystone
+
+from cloudkittydashboard.api import hashmap as hashmap_api
+from cloudkittydashboard.api import metrics
 from cloudkittydashboard import utils
 
+LOG = logging.getLogger(__name__)
 
-@memoized
-def cloudkittyclient(request, version='1'):
-    """Initialization of Cloudkitty client."""
+
+class ClientPool(object):
+    """Bounded, thread-safe pool of CloudKitty clients.
+
+    Clients are keyed on the token and on everything that influences endpoint
+    discovery, so that concurrent views for the same user share the resolved
+    endpoint and the keep-alive connections of the underlying session.
+    Entries expire with the token they were built for, and the least recently
+    used entry is evicted once the pool is full.
+    """
+
+    def __init__(self, max_size=100, default_ttl=3600):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expiry(self, token):
+        expires = getattr(token, 'expires', None)
+        if expires is None:
+            return timezone.now() + datetime.timedelta(
+                seconds=self.default_ttl)
+        if timezone.is_naive(expires):
+            expires = timezone.make_aware(expires, datetime.timezone.utc)
+        return expires
+
+    def get(self, key, token, factory):
+        now = timezone.now()
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                client, expires = entry
+                if expires > now:
+                    self._clients.move_to_end(key)
+                    return client
+                del self._clients[key]
+
+        # Build the client outside of the lock, concurrent misses for the
+        # same key are harmless and only cost an extra client.
+        client = factory()
+        with self._lock:
+            self._clients[key] = (client, self._expiry(token))
+            self._clients.move_to_end(key)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+        return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self):
+        return len(self._clients)
+
+
+_client_pool = ClientPool(
+    max_size=getattr(settings, 'CLOUDKITTY_CLIENT_POOL_SIZE', 100),
+    default_ttl=getattr(settings, 'CLOUDKITTY_CLIENT_POOL_TTL', 3600))
+
+
+def _build_client(request, version):
     cacert = getattr(settings, 'OPENSTACK_SSL_CACERT', None)
     insecure = getattr(settings, 'OPENSTACK_SSL_NO_VERIFY', False)
     auth_url = getattr(settings, 'OPENSTACK_KEYSTONE_URL', None)
@@ -41,26 +115,715 @@ def cloudkittyclient(request, version='1'):
         'region_name': request.user.services_region,
         'interface': interface,
     }
+    # Bypass the catalog, for example to use a fake CloudKitty API
+    endpoint = getattr(settings, 'CLOUDKITTY_ENDPOINT_OVERRIDE', None)
+    if endpoint:
+        adapter_options['endpoint_override'] = endpoint
 
-    return ck_client.Client(
+    client = ck_client.Client(
         version,
         auth=auth,
         cacert=cacert,
         insecure=insecure,
         adapter_options=adapter_options,
     )
+    # Measure the size of the responses, see metrics.InstrumentedProxy
+    client.session.session.hooks['response'].append(metrics.response_hook)
+    return client
+
+
+def cloudkittyclient(request, version='1'):
+    """Initialization of Cloudkitty client.
+
+    Clients are shared between requests made with the same token, see
+    :class:`ClientPool`. Unless ``CLOUDKITTY_API_METRICS`` is disabled, the
+    calls made with the client are recorded, see
+    :class:`metrics.InstrumentedProxy`.
+    """
+    user = request.user
+    key = (
+        user.token.id,
+        user.project_id,
+        user.domain_id,
+        user.services_region,
+        getattr(settings, 'OPENSTACK_ENDPOINT_TYPE', 'publicURL'),
+        str(version),
+    )
+    client = _client_pool.get(
+        key, user.token, lambda: _build_client(request, version))
+    if getattr(settings, 'CLOUDKITTY_API_METRICS', True):
+        return metrics.InstrumentedProxy(client, request)
+    return client
+
+
+def request_cache(request, namespace):
+    """Return a dict kept for the duration of the request.
+
+    :param namespace: Name of the dict, one per kind of cached objects.
+    """
+    caches = getattr(request, '_cloudkitty_cache', None)
+    if caches is None:
+        caches = request._cloudkitty_cache = {}
+    return caches.setdefault(namespace, {})
+
+
+def get_hashmap_object(request, kind, object_id):
+    """Return a hashmap object, cached for the duration of the request.
+
+    :param kind: One of 'service', 'field', 'group', 'mapping' or
+                 'threshold'.
+    :param object_id: ID of the object to retrieve.
+    """
+    cache = request_cache(request, 'hashmap_%s' % kind)
+    if object_id not in cache:
+        getter = getattr(cloudkittyclient(request).rating.hashmap,
+                         'get_%s' % kind)
+        cache[object_id] = getter(**{'%s_id' % kind: object_id})
+    return cache[object_id]
+
+
+_info_config_cache = {}
+_info_config_lock = threading.Lock()
+
+
+def get_info_config(request):
+    """Return the configuration exposed by the CloudKitty info API.
+
+    It only changes when CloudKitty is restarted, so it is cached for the
+    whole process for ``CLOUDKITTY_INFO_CONFIG_TTL`` seconds.
+    """
+    ttl = getattr(settings, 'CLOUDKITTY_INFO_CONFIG_TTL', 3600)
+    key = (request.user.services_region,
+           getattr(settings, 'OPENSTACK_ENDPOINT_TYPE', 'publicURL'))
+    now = time.monotonic()
+    with _info_config_lock:
+        entry = _info_config_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    config = cloudkittyclient(request).info.get_config()
+    with _info_config_lock:
+        _info_config_cache[key] = (now + ttl, config)
+    return config
+
+
+def _refresh_cached(key, ttl, loader):
+    try:
+        value = loader()
+        cache.set(key, (time.time() + ttl, value), ttl)
+    except Exception:
+        LOG.exception('Unable to refresh %s', key)
+    finally:
+        cache.delete(key + ':refreshing')
+
+
+def get_cached(key, loader, ttl=None, refresh=False):
+    """Return a value from the Django cache, loading it if needed.
+
+    Values are refreshed in the background once they are older than
+    ``ttl - CLOUDKITTY_SUMMARY_CACHE_REFRESH_AHEAD`` seconds, so that users
+    do not have to wait for them to be reloaded.
 
+    :param key: Cache key.
+    :param loader: Callable returning the value.
+    :param ttl: Lifetime of the value in seconds. Defaults to the
+                ``CLOUDKITTY_SUMMARY_CACHE_TTL`` setting.
+    :param refresh: If True, reload the value unconditionally.
+    """
+    if ttl is None:
+        ttl = getattr(settings, 'CLOUDKITTY_SUMMARY_CACHE_TTL', 300)
+    ahead = getattr(settings, 'CLOUDKITTY_SUMMARY_CACHE_REFRESH_AHEAD', 60)
 
-def identify(what, name=False, key=None):
-    if isinstance(what, abc.Iterable):
-        for i in what:
-            i['id'] = i.get(key or "%s_id" % i['key'])
-            if name and not i.get('name'):
-                i['name'] = i.get(key or "%s_id" % i['key'])
-        what = [utils.TemplatizableDict(i) for i in what]
+    entry = None if refresh else cache.get(key)
+    if entry is None:
+        value = loader()
+        cache.set(key, (time.time() + ttl, value), ttl)
+        return value
+
+    expires, value = entry
+    stale = time.time() >= expires - ahead
+    # cache.add() is atomic, only one refresh is started at a time
+    if stale and cache.add(key + ':refreshing', True, ahead or ttl):
+        threading.Thread(target=_refresh_cached,
+                         args=(key, ttl, loader),
+                         daemon=True).start()
+    return value
+
+
+def _summary_cache_key(request, name):
+    return 'cloudkittydashboard:%s:%s' % (name,
+                                          request.user.services_region)
+
+
+def _use_summary_matrix():
+    return getattr(settings, 'CLOUDKITTY_SUMMARY_V2_MATRIX', False)
+
+
+def get_rating_matrix(request, refresh=False):
+    """Return the rating summary of all projects, per resource type.
+
+    The summary is retrieved with a single (paginated) v2 summary request
+    and cached, see :func:`get_cached`.
+
+    :returns: A ``{project_id: {type: rate}}`` dict, rates being exact
+              :class:`decimal.Decimal` sums, see :func:`utils.to_decimal`.
+    """
+    client = cloudkittyclient(request, version='2')
+    limit = getattr(settings, 'CLOUDKITTY_SUMMARY_V2_PAGE_SIZE', 1000)
+
+    def _load():
+        matrix = {}
+        offset = 0
+        while True:
+            summary = client.summary.get_summary(
+                groupby=['project_id', 'type'], offset=offset, limit=limit,
+                response_format='object')
+            results = summary.get('results') or []
+            for item in results:
+                rates = matrix.setdefault(item['project_id'], {})
+                rate = rates.get(item['type'], 0)
+                rates[item['type']] = rate + utils.to_decimal(item['rate'])
+            offset += len(results)
+            if len(results) < limit or offset >= summary.get('total', 0):
+                return matrix
+
+    return get_cached(_summary_cache_key(request, 'matrix'), _load,
+                      refresh=refresh)
+
+
+def get_rating_summary(request, refresh=False):
+    """Return the rating summary of all projects, grouped by project."""
+    if _use_summary_matrix():
+        matrix = get_rating_matrix(request, refresh=refresh)
+        return [{'tenant_id': project_id, 'rate': sum(rates.values())}
+                for project_id, rates in matrix.items()]
+
+    report = cloudkittyclient(request).report
+    return get_cached(
+        _summary_cache_key(request, 'summary'),
+        lambda: report.get_summary(
+            groupby=['tenant_id'], all_tenants=True)['summary'],
+        refresh=refresh)
+
+
+def get_project_summary(request, project_id):
+    """Return the rating summary of a project, grouped by resource type.
+
+    :param project_id: ID of the project, or 'ALL' for the whole cloud.
+    """
+    if not _use_summary_matrix():
+        report = cloudkittyclient(request).report
+        if project_id == 'ALL':
+            return report.get_summary(groupby=['res_type'],
+                                      all_tenants=True)['summary']
+        return report.get_summary(groupby=['res_type'],
+                                  tenant_id=project_id)['summary']
+
+    matrix = get_rating_matrix(request)
+    if project_id == 'ALL':
+        rates = {}
+        for project_rates in matrix.values():
+            for res_type, rate in project_rates.items():
+                rates[res_type] = rates.get(res_type, 0) + rate
     else:
-        what['id'] = what.get(key or "%s_id" % what['key'])
-        if name and not i.get('name'):
-            what['name'] = what.get(key or "%s_id" % what['key'])
-        what = utils.TemplatizableDict(what)
-    return what
+        rates = matrix.get(project_id, {})
+    return [{'tenant_id': project_id, 'res_type': res_type, 'rate': rate}
+            for res_type, rate in sorted(rates.items())]
+
+
+def get_project_names(request, refresh=False):
+    """Return a project ID -> project name dict of all projects."""
+    def _load():
+        projects, __ = api_keystone.tenant_list(request)
+        return {project.id: project.name for project in projects}
+
+    return get_cached(_summary_cache_key(request, 'project_names'), _load,
+                      refresh=refresh)
+
+
+class ProjectNameCache(object):
+    """Bounded, thread-safe LRU cache of project ID -> project name.
+
+    Projects which do not exist anymore are cached as well (with a ``None``
+    name) for ``negative_ttl`` seconds, so that the summary of deleted
+    projects does not trigger a Keystone request on every page.
+    """
+
+    def __init__(self, max_size=10000, ttl=600, negative_ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._names = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, project_ids):
+        """Return a ``({id: name}, [missing ids])`` tuple."""
+        now = time.monotonic()
+        names, missing = {}, []
+        with self._lock:
+            for project_id in project_ids:
+                entry = self._names.get(project_id)
+                if entry is not None and entry[0] > now:
+                    self._names.move_to_end(project_id)
+                    names[project_id] = entry[1]
+                else:
+                    missing.append(project_id)
+        return names, missing
+
+    def set_many(self, names):
+        now = time.monotonic()
+        with self._lock:
+            for project_id, name in names.items():
+                ttl = self.ttl if name is not None else self.negative_ttl
+                self._names[project_id] = (now + ttl, name)
+                self._names.move_to_end(project_id)
+            while len(self._names) > self.max_size:
+                self._names.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._names.clear()
+
+    def __len__(self):
+        return len(self._names)
+
+
+_project_name_cache = ProjectNameCache(
+    max_size=getattr(settings, 'CLOUDKITTY_PROJECT_NAMES_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'CLOUDKITTY_PROJECT_NAMES_CACHE_TTL', 600),
+    negative_ttl=getattr(settings,
+                         'CLOUDKITTY_PROJECT_NAMES_NEGATIVE_TTL', 60))
+
+
+def _get_project_name(request, project_id):
+    try:
+        return api_keystone.tenant_get(request, project_id, admin=True).name
+    except ks_exceptions.NotFound:
+        return None
+
+
+def resolve_project_names(request, project_ids):
+    """Return a project ID -> project name dict of the given projects.
+
+    Only the projects which are not in the shared cache are looked up in
+    Keystone, concurrently. If there are more than
+    ``CLOUDKITTY_PROJECT_NAMES_LIST_THRESHOLD`` of them, the projects are
+    listed instead. Projects which do not exist are not part of the result.
+    """
+    names, missing = _project_name_cache.get_many(set(project_ids))
+    if not missing:
+        return {k: v for k, v in names.items() if v is not None}
+
+    threshold = getattr(settings,
+                        'CLOUDKITTY_PROJECT_NAMES_LIST_THRESHOLD', 100)
+    found = {}
+    if len(missing) > threshold:
+        projects = get_project_names(request)
+        found = {project_id: projects.get(project_id)
+                 for project_id in missing}
+        # Fill the cache with the other projects as well
+        _project_name_cache.set_many(projects)
+    else:
+        results = gather(*[
+            functools.partial(_get_project_name, request, project_id)
+            for project_id in missing])
+        for project_id, (name, error) in zip(missing, results):
+            # Transient errors are not cached
+            if error is None:
+                found[project_id] = name
+    _project_name_cache.set_many(found)
+    names.update(found)
+    return {k: v for k, v in names.items() if v is not None}
+
+
+def invalidate_project_names(request):
+    """Forget the cached project names."""
+    _project_name_cache.clear()
+    cache.delete(_summary_cache_key(request, 'project_names'))
+
+
+def _rating_config_version_key(request):
+    return _summary_cache_key(request, 'rating_config_version')
+
+
+def get_rating_config_version(request):
+    """Return the version of the rating configuration.
+
+    The version is stored in the Django cache and changes every time the
+    rating configuration (hashmap, pyscripts or modules) is modified through
+    the dashboard, see :func:`bump_rating_config_version`.
+    """
+    key = _rating_config_version_key(request)
+    version = cache.get(key)
+    if version is None:
+        # Start from the current time rather than from 0, so that quotes
+        # cached before the version was evicted are not reused
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_rating_config_version(request):
+    """Invalidate the values depending on the rating configuration."""
+    key = _rating_config_version_key(request)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def _quote_cache_key(request, res_data):
+    data = json.dumps([
+        request.user.services_region,
+        request.user.project_id,
+        get_rating_config_version(request),
+        res_data,
+    ], sort_keys=True, separators=(',', ':'))
+    return 'cloudkittydashboard:quote:%s' % hashlib.sha256(
+        data.encode('utf-8')).hexdigest()
+
+
+# Rating modules which do not prevent quotations from being computed locally
+LOCAL_RATING_MODULES = ('hashmap', 'noop')
+
+
+def _get_results(results):
+    for __, error in results:
+        if error is not None:
+            raise error
+    return [result for result, __ in results]
+
+
+def _load_hashmap_service(hashmap, service):
+    """Load a hashmap service, in the format expected by build_rules."""
+    def _get_entries(**kwargs):
+        return (hashmap.get_mapping(**kwargs)['mappings'],
+                hashmap.get_threshold(**kwargs)['thresholds'])
+
+    service_id = service['service_id']
+    fields = hashmap.get_field(service_id=service_id)['fields']
+    mappings, thresholds = _get_entries(service_id=service_id)
+    return (service, mappings, thresholds,
+            [(field,) + _get_entries(field_id=field['field_id'])
+             for field in fields])
+
+
+def _has_project_rules(services):
+    for __, mappings, thresholds, fields in services:
+        entries = mappings + thresholds
+        for __, field_mappings, field_thresholds in fields:
+            entries += field_mappings + field_thresholds
+        if any(entry.get('tenant_id') for entry in entries):
+            return True
+    return False
+
+
+def _load_hashmap_rules(request):
+    """Load the hashmap configuration for local quotations.
+
+    :returns: The rules used by :class:`hashmap.HashmapEvaluator`, or None if
+              the quotations can not be computed locally.
+    """
+    client = cloudkittyclient(request)
+    enabled = set(module['module_id'] for module
+                  in client.rating.get_module()['modules']
+                  if module.get('enabled'))
+    if 'hashmap' not in enabled or enabled - set(LOCAL_RATING_MODULES):
+        return None
+
+    hashmap = client.rating.hashmap
+    services = _get_results(gather(*[
+        functools.partial(_load_hashmap_service, hashmap, service)
+        for service in hashmap.get_service()['services']]))
+    # Project specific rules are left to CloudKitty
+    if _has_project_rules(services):
+        return None
+    groups = {group['group_id']: group['name']
+              for group in hashmap.get_group()['groups']}
+    return hashmap_api.build_rules(services, groups)
+
+
+def iter_hashmap_services(request):
+    """Yield the hashmap services, with their fields and rules.
+
+    Services are loaded concurrently, by at most
+    ``CLOUDKITTY_API_GATHER_MAX_WORKERS`` threads, and yielded in order as
+    soon as they are loaded, in the format expected by
+    :func:`hashmap.build_rules`.
+    """
+    hashmap = cloudkittyclient(request).rating.hashmap
+    services = hashmap.get_service()['services']
+    if not services:
+        return
+    max_workers = getattr(settings, 'CLOUDKITTY_API_GATHER_MAX_WORKERS', 10)
+    executor = futures.ThreadPoolExecutor(
+        max_workers=min(len(services), max_workers))
+    try:
+        yield from executor.map(
+            functools.partial(_load_hashmap_service, hashmap), services)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_hashmap_config(request):
+    """Return the current hashmap configuration.
+
+    See :func:`hashmap.config_from_api`.
+    """
+    groups = cloudkittyclient(request).rating.hashmap.get_group()['groups']
+    return hashmap_api.config_from_api(iter_hashmap_services(request),
+                                       groups)
+
+
+def _resolve_id(ids, key):
+    object_id = ids.get(key)
+    if object_id is None:
+        raise ValueError('%s %s does not exist' % (key[0], '/'.join(
+            key[1:])))
+    return object_id
+
+
+def _apply_hashmap_operation(hashmap, operation, ids):
+    kind = operation['kind']
+    if operation['action'] == 'delete':
+        getattr(hashmap, 'delete_%s' % kind)(
+            **{'%s_id' % kind: operation['id']})
+        return
+
+    if kind in ('group', 'service', 'field'):
+        params = {'name': operation['name']}
+        key = (kind, operation['name'])
+        if kind == 'field':
+            params['service_id'] = _resolve_id(
+                ids, ('service', operation['service']))
+            key = (kind, operation['service'], operation['name'])
+        created = getattr(hashmap, 'create_%s' % kind)(**params)
+        ids[key] = created['%s_id' % kind]
+        return
+
+    params = {'type': operation['type'], 'cost': float(operation['cost'])}
+    if operation['action'] == 'update':
+        params['%s_id' % kind] = operation['id']
+        getattr(hashmap, 'update_%s' % kind)(**params)
+        return
+    if operation['field'] is None:
+        params['service_id'] = _resolve_id(
+            ids, ('service', operation['service']))
+    else:
+        params['field_id'] = _resolve_id(
+            ids, ('field', operation['service'], operation['field']))
+    if operation['group']:
+        params['group_id'] = _resolve_id(ids, ('group', operation['group']))
+    if operation['tenant_id']:
+        params['tenant_id'] = operation['tenant_id']
+    if kind == 'threshold':
+        params['level'] = float(operation['level'])
+    elif operation['value'] is not None:
+        params['value'] = operation['value']
+    getattr(hashmap, 'create_%s' % kind)(**params)
+
+
+def apply_hashmap_operations(request, operations, current, progress=None):
+    """Apply the operations returned by :func:`hashmap.diff`.
+
+    The operations of each phase are applied concurrently, by at most
+    ``CLOUDKITTY_HASHMAP_IMPORT_WORKERS`` threads. Failed operations do not
+    stop the others, but the operations depending on an object which could
+    not be created fail.
+
+    :param current: The configuration the operations were computed from, see
+                    :func:`get_hashmap_config`.
+    :param progress: Callable called with ``(done, total, operation,
+                     error)`` each time an operation is applied, ``error``
+                     being ``None`` if it succeeded.
+    :returns: A list of ``(operation, error)`` tuples, in the order the
+              operations were applied.
+    """
+    if not operations:
+        return []
+    hashmap = cloudkittyclient(request).rating.hashmap
+    ids = hashmap_api.config_ids(current)
+    max_workers = getattr(settings, 'CLOUDKITTY_HASHMAP_IMPORT_WORKERS', 10)
+    results = []
+    executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for phase in sorted(set(op['phase'] for op in operations)):
+            pending = {
+                executor.submit(_apply_hashmap_operation, hashmap, op, ids): op
+                for op in operations if op['phase'] == phase}
+            for future in futures.as_completed(pending):
+                operation, error = pending[future], future.exception()
+                if error is not None:
+                    LOG.warning('Unable to %s hashmap %s %s: %s',
+                                operation['action'], operation['kind'],
+                                operation['path'], error)
+                results.append((operation, error))
+                if progress is not None:
+                    progress(len(results), len(operations), operation, error)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        if any(error is None for __, error in results):
+            bump_rating_config_version(request)
+    return results
+
+
+_hashmap_evaluators = {}
+# One lock per region, held while its rules are loaded
+_hashmap_evaluator_locks = {}
+_hashmap_evaluators_lock = threading.Lock()
+
+
+def _cached_hashmap_evaluator(key, version, now):
+    with _hashmap_evaluators_lock:
+        entry = _hashmap_evaluators.get(key)
+    if entry is not None and entry[0] > now and entry[1] == version:
+        return True, entry[2]
+    return False, None
+
+
+def get_hashmap_evaluator(request):
+    """Return a hashmap evaluator for the current region.
+
+    Evaluators are kept by each process until the rating configuration
+    version changes, or for ``CLOUDKITTY_LOCAL_QUOTATION_TTL`` seconds.
+
+    :returns: A :class:`hashmap.HashmapEvaluator`, or None if rating modules
+              other than hashmap are enabled.
+    """
+    ttl = getattr(settings, 'CLOUDKITTY_LOCAL_QUOTATION_TTL', 300)
+    key = request.user.services_region
+    version = get_rating_config_version(request)
+    now = time.monotonic()
+    found, evaluator = _cached_hashmap_evaluator(key, version, now)
+    if found:
+        return evaluator
+
+    with _hashmap_evaluators_lock:
+        region_lock = _hashmap_evaluator_locks.setdefault(
+            key, threading.Lock())
+    # Concurrent misses, such as the quotes of a batch, load the rules once:
+    # the other threads wait for the first one and use its evaluator
+    with region_lock:
+        found, evaluator = _cached_hashmap_evaluator(key, version, now)
+        if found:
+            return evaluator
+        rules = _load_hashmap_rules(request)
+        evaluator = hashmap_api.HashmapEvaluator(rules) if rules else None
+        with _hashmap_evaluators_lock:
+            _hashmap_evaluators[key] = (now + ttl, version, evaluator)
+    return evaluator
+
+
+def _get_price(request, res_data):
+    if getattr(settings, 'CLOUDKITTY_LOCAL_QUOTATION', False):
+        try:
+            evaluator = get_hashmap_evaluator(request)
+            if evaluator is not None:
+                return evaluator.quote(res_data)
+        except Exception:
+            LOG.warning('Unable to compute the quotation locally, falling '
+                        'back to the CloudKitty API', exc_info=True)
+    return cloudkittyclient(request).rating.get_quotation(res_data=res_data)
+
+
+def get_quotation(request, res_data):
+    """Return the price of the given resources.
+
+    Prices are computed locally if ``CLOUDKITTY_LOCAL_QUOTATION`` is enabled
+    and only the hashmap rating module is used, see
+    :func:`get_hashmap_evaluator`.
+
+    Quotes are cached for ``CLOUDKITTY_QUOTE_CACHE_TTL`` seconds, keyed on
+    the resources, the project and the version of the rating configuration.
+    """
+    ttl = getattr(settings, 'CLOUDKITTY_QUOTE_CACHE_TTL', 60)
+    if ttl <= 0:
+        return _get_price(request, res_data)
+
+    key = _quote_cache_key(request, res_data)
+    price = cache.get(key)
+    if price is None:
+        price = _get_price(request, res_data)
+        cache.set(key, price, ttl)
+    return price
+
+
+def gather(*calls, timeout=None):
+    """Run independent API calls concurrently.
+
+    :param calls: Callables taking no argument, usually built with
+                  ``functools.partial``.
+    :param timeout: Number of seconds to wait for the calls to complete.
+                    Defaults to the ``CLOUDKITTY_API_GATHER_TIMEOUT`` setting.
+    :returns: A list of ``(result, error)`` tuples, in the order of
+              ``calls``. ``error`` is ``None`` if the call succeeded, the
+              exception it raised otherwise (``TimeoutError`` if it did not
+              complete in time).
+    """
+    if not calls:
+        return []
+    if timeout is None:
+        timeout = getattr(settings, 'CLOUDKITTY_API_GATHER_TIMEOUT', 60)
+    max_workers = getattr(settings, 'CLOUDKITTY_API_GATHER_MAX_WORKERS', 10)
+
+    executor = futures.ThreadPoolExecutor(
+        max_workers=min(len(calls), max_workers))
+    results = []
+    try:
+        pending = [executor.submit(call) for call in calls]
+        deadline = time.monotonic() + timeout
+        for call, future in zip(calls, pending):
+            try:
+                remaining = max(0, deadline - time.monotonic())
+                results.append((future.result(timeout=remaining), None))
+            except futures.TimeoutError as e:
+                LOG.warning('API call %s timed out after %ss', call, timeout)
+                results.append((None, e))
+            except Exception as e:
+                LOG.debug('API call %s failed: %s', call, e)
+                results.append((None, e))
+    finally:
+        # Do not wait for calls which timed out
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def _identify(items, name, key):
+    # The id key is computed from the first item only: the items returned by
+    # an API call share their keys
+    for item in items:
+        key = key or '%s_id' % item['key']
+        item['id'] = item.get(key)
+        if name and not item.get('name'):
+            item['name'] = item['id']
+        yield utils.TemplatizableDict(item)
+
+
+def identify(what, name=False, key=None, lazy=False):
+    """Add an ``id`` to API objects, and convert them to table rows.
+
+    The objects are updated in place, and converted to
+    :class:`cloudkittydashboard.utils.TemplatizableDict` in a single pass.
+
+    :param what: A dict, or an iterable of dicts.
+    :param name: Whether to set the ``name`` of the objects without one to
+                 their id.
+    :param key: Key holding the id of the objects. Defaults to
+                ``<object['key']>_id``.
+    :param lazy: Return a generator of rows, for consumers iterating over
+                 them once. Horizon tables index their data, and need a list.
+    :returns: A row if ``what`` is a dict, a list or a generator of rows
+              otherwise. A list is updated in place and returned.
+    """
+    if isinstance(what, abc.Mapping):
+        return next(_identify((what,), name, key))
+    rows = _identify(what, name, key)
+    if lazy:
+        return rows
+    if isinstance(what, list):
+        # Replace the dicts as their rows are built, no second list is
+        # allocated
+        for index, row in enumerate(rows):
+            what[index] = row
+        return what
+    return list(rows)
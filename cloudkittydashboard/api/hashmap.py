@@ -0,0 +1,637 @@
+# -*- coding: utf-8 -*-
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+import csv
+import decimal
+import io
+import json
+
+import yaml
+
+DEFAULT_GROUP = '_DEFAULT_'
+
+# Formats of the configuration documents, see parse_config
+FORMATS = ('yaml', 'json', 'csv')
+CONTENT_TYPES = {
+    'yaml': 'application/x-yaml',
+    'json': 'application/json',
+    'csv': 'text/csv',
+}
+CSV_COLUMNS = ('service', 'field', 'value', 'level', 'type', 'cost', 'group',
+               'tenant_id')
+MAPPING_TYPES = ('flat', 'rate')
+
+
+def _group_name(entry, groups):
+    group_id = entry.get('group_id')
+    return groups.get(group_id, group_id) if group_id else DEFAULT_GROUP
+
+
+def _load_mappings(mappings, groups):
+    loaded = {}
+    for mapping in mappings:
+        scope = loaded.setdefault(_group_name(mapping, groups), {})
+        if mapping.get('value'):
+            scope = scope.setdefault(mapping['value'], {})
+        scope['type'] = mapping['type']
+        scope['cost'] = decimal.Decimal(str(mapping['cost']))
+    return loaded
+
+
+def _load_thresholds(thresholds, groups):
+    loaded = {}
+    for threshold in thresholds:
+        scope = loaded.setdefault(_group_name(threshold, groups), {})
+        scope[decimal.Decimal(str(threshold['level']))] = {
+            'type': threshold['type'],
+            'cost': decimal.Decimal(str(threshold['cost'])),
+        }
+    return loaded
+
+
+def build_rules(services, groups):
+    """Build the rules used by :class:`HashmapEvaluator`.
+
+    :param services: List of ``(service, mappings, thresholds, fields)``
+                     tuples, ``fields`` being a list of
+                     ``(field, mappings, thresholds)`` tuples. Services,
+                     fields, mappings and thresholds are dicts, as returned
+                     by the hashmap API.
+    :param groups: Dict of group ID -> group name.
+    """
+    rules = {}
+    for service, mappings, thresholds, fields in services:
+        rules[service['name']] = {
+            'mappings': _load_mappings(mappings, groups),
+            'thresholds': _load_thresholds(thresholds, groups),
+            'fields': {
+                field['name']: {
+                    'mappings': _load_mappings(field_mappings, groups),
+                    'thresholds': _load_thresholds(field_thresholds, groups),
+                } for field, field_mappings, field_thresholds in fields
+            },
+        }
+    return rules
+
+
+class HashmapEvaluator(object):
+    """Compute quotations from a hashmap configuration.
+
+    This follows the rating algorithm of the hashmap module of CloudKitty:
+    within a group, the highest flat cost is kept and rates are multiplied,
+    the price being ``rate * flat * qty``. Only the threshold with the
+    highest level reached is applied for each group, to the flat cost for
+    field thresholds and to the price for service thresholds.
+    """
+
+    def __init__(self, rules):
+        self._rules = rules
+
+    @staticmethod
+    def _update(res, group, map_type, cost, level=None, scope=None):
+        entry = res.setdefault(group, {
+            'flat': decimal.Decimal(0),
+            'rate': decimal.Decimal(1),
+            'threshold': {'level': -1, 'cost': decimal.Decimal(0),
+                          'type': 'flat', 'scope': 'field'},
+        })
+        if level is not None:
+            if level > entry['threshold']['level']:
+                entry['threshold'] = {'level': level, 'cost': cost,
+                                      'type': map_type, 'scope': scope}
+        elif map_type == 'rate':
+            entry['rate'] *= cost
+        elif map_type == 'flat' and cost > entry['flat']:
+            entry['flat'] = cost
+
+    def _process_thresholds(self, res, thresholds, value, scope):
+        for group, levels in thresholds.items():
+            for level, threshold in levels.items():
+                if value >= level:
+                    self._update(res, group, threshold['type'],
+                                 threshold['cost'], level, scope)
+
+    def _rate(self, service, desc, qty):
+        rules = self._rules.get(service)
+        if rules is None:
+            return decimal.Decimal(0)
+
+        res = {}
+        for group, mapping in rules['mappings'].items():
+            self._update(res, group, mapping['type'], mapping['cost'])
+        self._process_thresholds(res, rules['thresholds'], qty, 'service')
+        for name, field in rules['fields'].items():
+            if name not in desc:
+                continue
+            value = desc[name]
+            for group, mappings in field['mappings'].items():
+                mapping = mappings.get(value)
+                if mapping is not None:
+                    self._update(res, group, mapping['type'],
+                                 mapping['cost'])
+            if field['thresholds']:
+                self._process_thresholds(res, field['thresholds'],
+                                         decimal.Decimal(str(value)),
+                                         'field')
+
+        price = decimal.Decimal(0)
+        for entry in res.values():
+            flat, rate = entry['flat'], entry['rate']
+            threshold = entry['threshold']
+            if threshold['scope'] == 'field':
+                if threshold['type'] == 'flat':
+                    flat += threshold['cost']
+                else:
+                    rate *= threshold['cost']
+            entry_price = rate * flat * qty
+            if threshold['scope'] == 'service':
+                if threshold['type'] == 'flat':
+                    entry_price += threshold['cost']
+                else:
+                    entry_price *= threshold['cost']
+            price += entry_price
+        return price
+
+    def quote(self, res_data):
+        """Return the price of the given resources.
+
+        :param res_data: List of resources, as sent to the quotation API:
+                         dicts with a ``service``, a ``desc`` dict and a
+                         ``volume``.
+        """
+        price = decimal.Decimal(0)
+        for resource in res_data:
+            price += self._rate(resource['service'], resource['desc'],
+                                decimal.Decimal(str(resource['volume'])))
+        return price
+
+
+class ConfigError(ValueError):
+    """Invalid hashmap configuration document."""
+
+
+def _format_decimal(value):
+    return '{:f}'.format(value.normalize())
+
+
+def _decimal(value, where, name):
+    if value is None or value == '':
+        raise ConfigError('%s: %s is required' % (where, name))
+    try:
+        return decimal.Decimal(str(value))
+    except decimal.InvalidOperation:
+        raise ConfigError('%s: invalid %s %r' % (where, name, value))
+
+
+def _name(value, where):
+    if not isinstance(value, (str, int)) or value == '':
+        raise ConfigError('%s: invalid name %r' % (where, value))
+    return str(value)
+
+
+def _items(document, key, where):
+    items = document.get(key) or []
+    if not isinstance(items, list):
+        raise ConfigError('%s: %s must be a list' % (where, key))
+    return items
+
+
+def _check_keys(item, allowed, where):
+    if not isinstance(item, dict):
+        raise ConfigError('%s: expected a mapping, got %r' % (where, item))
+    unknown = set(item) - set(allowed)
+    if unknown:
+        raise ConfigError('%s: unknown keys %s' % (
+            where, ', '.join(sorted(map(str, unknown)))))
+
+
+def _load_csv(content):
+    reader = csv.DictReader(io.StringIO(content))
+    unknown = set(reader.fieldnames or ()) - set(CSV_COLUMNS)
+    if unknown or 'service' not in (reader.fieldnames or ()):
+        raise ConfigError('The CSV columns must be among: %s' % ', '.join(
+            CSV_COLUMNS))
+    groups = []
+    services = {}
+    for line, row in enumerate(reader, 2):
+        if None in row:
+            raise ConfigError('line %d: too many values' % line)
+        row = {key: value.strip() for key, value in row.items() if value}
+        service = row.pop('service', None)
+        if not service:
+            if set(row) != {'group'}:
+                raise ConfigError('line %d: service is required' % line)
+            groups.append(row['group'])
+            continue
+        scope = services.setdefault(service, {
+            'name': service, 'mappings': [], 'thresholds': [], 'fields': {}})
+        field = row.pop('field', None)
+        if field:
+            scope = scope['fields'].setdefault(field, {
+                'name': field, 'mappings': [], 'thresholds': []})
+        # Rows with a level are thresholds, other rows with values are
+        # mappings, and rows without values declare a service or a field
+        if 'level' in row:
+            scope['thresholds'].append(row)
+        elif row:
+            scope['mappings'].append(row)
+    return {'groups': groups, 'services': [
+        dict(service, fields=list(service['fields'].values()))
+        for service in services.values()]}
+
+
+def load_document(content, fmt):
+    """Parse a hashmap configuration document.
+
+    :param content: The document, as text.
+    :param fmt: One of :data:`FORMATS`.
+    :returns: The document, to be validated by :func:`parse_config`.
+    """
+    if fmt == 'csv':
+        return _load_csv(content)
+    try:
+        if fmt == 'json':
+            return json.loads(content)
+        return yaml.safe_load(content)
+    except (ValueError, yaml.YAMLError) as e:
+        raise ConfigError('Invalid %s document: %s' % (fmt.upper(), e))
+
+
+def _entries(item, kind, where, groups, field):
+    allowed = ['type', 'cost', 'group', 'tenant_id']
+    if kind == 'thresholds':
+        allowed.append('level')
+    elif field:
+        allowed.append('value')
+    entries = {}
+    for index, entry in enumerate(_items(item, kind, where), 1):
+        entry_where = '%s %s #%d' % (where, kind[:-1], index)
+        _check_keys(entry, allowed, entry_where)
+        entry_type = entry.get('type') or 'flat'
+        if entry_type not in MAPPING_TYPES:
+            raise ConfigError('%s: type must be one of %s' % (
+                entry_where, ', '.join(MAPPING_TYPES)))
+        group = entry.get('group')
+        if group:
+            group = _name(group, entry_where)
+            groups.setdefault(group, {})
+        if kind == 'thresholds':
+            key = _decimal(entry.get('level'), entry_where, 'level')
+        elif field:
+            key = entry.get('value')
+            if key is None or key == '':
+                raise ConfigError('%s: value is required' % entry_where)
+            key = str(key)
+        else:
+            key = None
+        key = (key, group or None, entry.get('tenant_id') or None)
+        if key in entries:
+            raise ConfigError('%s: duplicate %s' % (entry_where, kind[:-1]))
+        entries[key] = {
+            'type': entry_type,
+            'cost': _decimal(entry.get('cost'), entry_where, 'cost'),
+        }
+    return entries
+
+
+def parse_config(document):
+    """Validate a hashmap configuration document.
+
+    Documents look like the following, groups used by the mappings and
+    thresholds being declared implicitly::
+
+        groups: [instance_uptime]
+        services:
+          - name: instance
+            mappings:
+              - {type: flat, cost: 0.01, group: instance_uptime}
+            thresholds:
+              - {level: 100, type: rate, cost: 0.9}
+            fields:
+              - name: flavor_id
+                mappings:
+                  - {value: m1.small, cost: 0.1, tenant_id: <project ID>}
+
+    In CSV, each row holds the ``service`` and the ``field`` of a mapping,
+    or of a threshold if it has a ``level``. Rows without values declare
+    services, fields, or groups if only the ``group`` column is set.
+
+    :returns: The normalized configuration, compared to the current one by
+              :func:`diff`. Mappings and thresholds are identified by their
+              value or level, their group and their project.
+    """
+    if document is None:
+        document = {}
+    _check_keys(document, ('groups', 'services'), 'document')
+    config = {'groups': {}, 'services': {}}
+    for index, group in enumerate(_items(document, 'groups', 'document'), 1):
+        config['groups'][_name(group, 'group #%d' % index)] = {}
+    services = config['services']
+    for index, service in enumerate(
+            _items(document, 'services', 'document'), 1):
+        _check_keys(service, ('name', 'mappings', 'thresholds', 'fields'),
+                    'service #%d' % index)
+        name = _name(service.get('name'), 'service #%d' % index)
+        if name in services:
+            raise ConfigError('%s: duplicate service' % name)
+        fields = {}
+        services[name] = _scope(service, name, config['groups'], False)
+        services[name]['fields'] = fields
+        for field in _items(service, 'fields', name):
+            _check_keys(field, ('name', 'mappings', 'thresholds'), name)
+            field_name = _name(field.get('name'), '%s field' % name)
+            where = '%s/%s' % (name, field_name)
+            if field_name in fields:
+                raise ConfigError('%s: duplicate field' % where)
+            fields[field_name] = _scope(field, where, config['groups'], True)
+    return config
+
+
+def _scope(item, where, groups, field):
+    return {
+        'mappings': _entries(item, 'mappings', where, groups, field),
+        'thresholds': _entries(item, 'thresholds', where, groups, field),
+    }
+
+
+def _api_entries(entries, kind, groups):
+    loaded = {}
+    for entry in entries:
+        group_id = entry.get('group_id')
+        group = groups.get(group_id, group_id) if group_id else None
+        if kind == 'thresholds':
+            key = decimal.Decimal(str(entry['level']))
+        else:
+            key = entry.get('value') or None
+        loaded[(key, group, entry.get('tenant_id') or None)] = {
+            'id': entry['%s_id' % kind[:-1]],
+            'type': entry['type'],
+            'cost': decimal.Decimal(str(entry['cost'])),
+        }
+    return loaded
+
+
+def _api_service(loaded, groups):
+    service, mappings, thresholds, fields = loaded
+    return {
+        'id': service['service_id'],
+        'mappings': _api_entries(mappings, 'mappings', groups),
+        'thresholds': _api_entries(thresholds, 'thresholds', groups),
+        'fields': {field['name']: {
+            'id': field['field_id'],
+            'mappings': _api_entries(field_mappings, 'mappings', groups),
+            'thresholds': _api_entries(field_thresholds, 'thresholds',
+                                       groups),
+        } for field, field_mappings, field_thresholds in fields},
+    }
+
+
+def config_from_api(services, groups):
+    """Build the configuration returned by :func:`parse_config` from the API.
+
+    Services, fields, groups, mappings and thresholds also hold their
+    ``id``.
+
+    :param services: Iterable of services, in the format expected by
+                     :func:`build_rules`.
+    :param groups: List of groups, as returned by the hashmap API.
+    """
+    names = {group['group_id']: group['name'] for group in groups}
+    return {
+        'groups': {group['name']: {'id': group['group_id']}
+                   for group in groups},
+        'services': {loaded[0]['name']: _api_service(loaded, names)
+                     for loaded in services},
+    }
+
+
+def _sort_key(item):
+    (key, group, tenant_id), __ = item
+    return (key is not None, '' if key is None else key, group or '',
+            tenant_id or '')
+
+
+def _document_entries(entries, kind):
+    items = []
+    for (key, group, tenant_id), entry in sorted(entries.items(),
+                                                 key=_sort_key):
+        item = {}
+        if kind == 'thresholds':
+            item['level'] = _format_decimal(key)
+        elif key is not None:
+            item['value'] = key
+        item['type'] = entry['type']
+        item['cost'] = _format_decimal(entry['cost'])
+        if group:
+            item['group'] = group
+        if tenant_id:
+            item['tenant_id'] = tenant_id
+        items.append(item)
+    return items
+
+
+def export_service(loaded, groups):
+    """Return a service of a configuration document.
+
+    :param loaded: A service, in the format expected by :func:`build_rules`.
+    :param groups: Dict of group ID -> group name.
+    """
+    service = _api_service(loaded, groups)
+    return {
+        'name': loaded[0]['name'],
+        'mappings': _document_entries(service['mappings'], 'mappings'),
+        'thresholds': _document_entries(service['thresholds'],
+                                        'thresholds'),
+        'fields': [{
+            'name': name,
+            'mappings': _document_entries(field['mappings'], 'mappings'),
+            'thresholds': _document_entries(field['thresholds'],
+                                            'thresholds'),
+        } for name, field in sorted(service['fields'].items())],
+    }
+
+
+def _iter_json(groups, services):
+    yield '{"groups": %s, "services": [' % json.dumps(groups)
+    separator = '\n'
+    for service in services:
+        yield separator + json.dumps(service)
+        separator = ',\n'
+    yield '\n]}\n'
+
+
+def _iter_yaml(groups, services):
+    yield yaml.safe_dump({'groups': groups}, default_flow_style=False)
+    header = 'services:\n'
+    for service in services:
+        yield header + yaml.safe_dump([service], default_flow_style=False,
+                                      sort_keys=False)
+        header = ''
+    if header:
+        yield 'services: []\n'
+
+
+def _iter_csv(groups, services):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_COLUMNS)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writeheader()
+    writer.writerows({'group': group} for group in groups)
+    yield flush()
+    for service in services:
+        scopes = [({'service': service['name']}, service)]
+        scopes += [({'service': service['name'], 'field': field['name']},
+                    field) for field in service['fields']]
+        for row, scope in scopes:
+            writer.writerow(row)
+            for kind in ('mappings', 'thresholds'):
+                writer.writerows(dict(row, **entry) for entry in scope[kind])
+        yield flush()
+
+
+def iter_export(fmt, groups, services):
+    """Yield a configuration document, see :func:`parse_config`, in chunks.
+
+    :param fmt: One of :data:`FORMATS`.
+    :param groups: List of group names.
+    :param services: Iterable of services, as returned by
+                     :func:`export_service`. It is consumed lazily, each
+                     service being written once it is available.
+    """
+    writers = {'json': _iter_json, 'yaml': _iter_yaml, 'csv': _iter_csv}
+    return writers[fmt](groups, services)
+
+
+def _describe(kind, service, field=None, key=None, group=None,
+              tenant_id=None):
+    path = service if field is None else '%s/%s' % (service, field)
+    if kind == 'threshold':
+        path += ' >= %s' % _format_decimal(key)
+    elif key is not None:
+        path += ' = %s' % key
+    extra = ['group %s' % group] if group else []
+    if tenant_id:
+        extra.append('project %s' % tenant_id)
+    return '%s (%s)' % (path, ', '.join(extra)) if extra else path
+
+
+def _diff_entries(operations, current, desired, prune, service, field):
+    for kind in ('mappings', 'thresholds'):
+        singular = kind[:-1]
+        for key, entry in desired[kind].items():
+            existing = current[kind].get(key)
+            operation = {
+                'phase': 2,
+                'kind': singular,
+                'path': _describe(singular, service, field, *key),
+                'service': service,
+                'field': field,
+                'group': key[1],
+                'tenant_id': key[2],
+                'type': entry['type'],
+                'cost': entry['cost'],
+            }
+            operation['level' if kind == 'thresholds' else 'value'] = key[0]
+            if existing is None:
+                operations.append(dict(operation, action='create'))
+            elif (existing['type'], existing['cost']) != (entry['type'],
+                                                          entry['cost']):
+                operations.append(dict(operation, action='update',
+                                       id=existing['id']))
+        if prune:
+            operations.extend({
+                'phase': 2, 'action': 'delete', 'kind': singular,
+                'path': _describe(singular, service, field, *key),
+                'id': existing['id'],
+            } for key, existing in current[kind].items()
+                if key not in desired[kind])
+
+
+def diff(current, desired, prune=False):
+    """Return the operations turning a configuration into another one.
+
+    :param current: The current configuration, see :func:`config_from_api`.
+    :param desired: The desired configuration, see :func:`parse_config`.
+    :param prune: Whether to delete the objects missing from ``desired``.
+                  Deleting a service or a field deletes its mappings and
+                  thresholds as well.
+    :returns: A list of operations, as dicts with an ``action`` (create,
+              update or delete), the ``kind`` of object, a ``path``
+              describing it, and the values of the object. The operations
+              of a ``phase`` are independent, and must be applied after the
+              ones of the previous phases.
+    """
+    empty = {'mappings': {}, 'thresholds': {}, 'fields': {}}
+    operations = [{'phase': 0, 'action': 'create', 'kind': 'group',
+                   'path': name, 'name': name}
+                  for name in desired['groups']
+                  if name not in current['groups']]
+    for name, service in desired['services'].items():
+        existing = current['services'].get(name)
+        if existing is None:
+            operations.append({'phase': 0, 'action': 'create',
+                               'kind': 'service', 'path': name,
+                               'name': name})
+            existing = empty
+        _diff_entries(operations, existing, service, prune, name, None)
+        for field_name, field in service['fields'].items():
+            existing_field = existing['fields'].get(field_name)
+            path = '%s/%s' % (name, field_name)
+            if existing_field is None:
+                operations.append({'phase': 1, 'action': 'create',
+                                   'kind': 'field', 'path': path,
+                                   'service': name, 'name': field_name})
+                existing_field = empty
+            _diff_entries(operations, existing_field, field, prune, name,
+                          field_name)
+        if prune:
+            operations.extend({
+                'phase': 3, 'action': 'delete', 'kind': 'field',
+                'path': '%s/%s' % (name, field_name), 'id': field['id'],
+            } for field_name, field in existing['fields'].items()
+                if field_name not in service['fields'])
+    if prune:
+        operations.extend({
+            'phase': 4, 'action': 'delete', 'kind': 'service', 'path': name,
+            'id': service['id'],
+        } for name, service in current['services'].items()
+            if name not in desired['services'])
+        operations.extend({
+            'phase': 4, 'action': 'delete', 'kind': 'group', 'path': name,
+            'id': group['id'],
+        } for name, group in current['groups'].items()
+            if name not in desired['groups'])
+    operations.sort(key=lambda operation: operation['phase'])
+    return operations
+
+
+def config_ids(config):
+    """Return the IDs of the objects of a configuration.
+
+    :param config: A configuration returned by :func:`config_from_api`.
+    :returns: A dict of ``('group', name)``, ``('service', name)`` and
+              ``('field', service, name)`` -> ID.
+    """
+    ids = {('group', name): group['id']
+           for name, group in config['groups'].items()}
+    for name, service in config['services'].items():
+        ids[('service', name)] = service['id']
+        ids.update((('field', name, field_name), field['id'])
+                   for field_name, field in service['fields'].items())
+    return ids
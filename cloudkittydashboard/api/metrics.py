@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+from collections import OrderedDict
+import functools
+import logging
+import socket
+import threading
+import time
+
+from django.conf import settings
+
+from cloudkittyclient.common import base as ck_base
+
+LOG = logging.getLogger(__name__)
+
+# Call currently made by the thread, see InstrumentedProxy
+_local = threading.local()
+
+
+class MetricsRegistry(object):
+    """Thread-safe registry of the API calls made by the process."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, duration, size, failed):
+        with self._lock:
+            stats = self._calls.get(name)
+            if stats is None:
+                stats = self._calls[name] = {
+                    'count': 0, 'errors': 0, 'seconds': 0.0,
+                    'max_seconds': 0.0, 'bytes': 0}
+            stats['count'] += 1
+            stats['errors'] += int(failed)
+            stats['seconds'] += duration
+            stats['max_seconds'] = max(stats['max_seconds'], duration)
+            stats['bytes'] += size
+
+    def snapshot(self):
+        """Return a ``{call: stats}`` copy of the recorded calls."""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._calls.items()}
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+
+    def render_prometheus(self):
+        """Return the recorded calls in the Prometheus text format."""
+        metrics = (
+            ('cloudkitty_api_calls_total', 'counter', 'count',
+             'Number of CloudKitty API calls.'),
+            ('cloudkitty_api_errors_total', 'counter', 'errors',
+             'Number of failed CloudKitty API calls.'),
+            ('cloudkitty_api_call_seconds_total', 'counter', 'seconds',
+             'Time spent in CloudKitty API calls.'),
+            ('cloudkitty_api_call_max_seconds', 'gauge', 'max_seconds',
+             'Longest CloudKitty API call.'),
+            ('cloudkitty_api_response_bytes_total', 'counter', 'bytes',
+             'Size of the CloudKitty API responses.'),
+        )
+        snapshot = sorted(self.snapshot().items())
+        lines = []
+        for metric, metric_type, key, help_text in metrics:
+            lines.append('# HELP %s %s' % (metric, help_text))
+            lines.append('# TYPE %s %s' % (metric, metric_type))
+            for name, stats in snapshot:
+                lines.append('%s{call="%s"} %s' % (metric, name, stats[key]))
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class StatsdClient(object):
+    """Minimal statsd client, sending metrics over UDP."""
+
+    def __init__(self, host, port=8125, prefix='cloudkittydashboard'):
+        self._address = (host, port)
+        self._prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, *metrics):
+        for metric in metrics:
+            try:
+                self._socket.sendto(
+                    ('%s.%s' % (self._prefix, metric)).encode('utf-8'),
+                    self._address)
+            except OSError as e:
+                LOG.debug('Unable to send metric to statsd: %s', e)
+
+
+_statsd_client = None
+_statsd_lock = threading.Lock()
+
+
+def _get_statsd_client():
+    global _statsd_client
+    host = getattr(settings, 'CLOUDKITTY_STATSD_HOST', None)
+    if not host:
+        return None
+    with _statsd_lock:
+        if _statsd_client is None:
+            _statsd_client = StatsdClient(
+                host,
+                getattr(settings, 'CLOUDKITTY_STATSD_PORT', 8125),
+                getattr(settings, 'CLOUDKITTY_STATSD_PREFIX',
+                        'cloudkittydashboard'))
+    return _statsd_client
+
+
+def record(name, duration, size, failed, request=None):
+    """Record an API call.
+
+    The call is added to the process registry, logged, sent to statsd if
+    ``CLOUDKITTY_STATSD_HOST`` is set and added to the timings of the
+    request, see :func:`server_timing`.
+    """
+    registry.record(name, duration, size, failed)
+    LOG.debug('CloudKitty API call %s %s in %.1fms (%d bytes)', name,
+              'failed' if failed else 'succeeded', duration * 1000, size)
+
+    statsd = _get_statsd_client()
+    if statsd is not None:
+        metric = 'api.%s' % name
+        statsd_metrics = ['%s:%d|ms' % (metric, duration * 1000),
+                          '%s.bytes:%d|c' % (metric, size)]
+        if failed:
+            statsd_metrics.append('%s.errors:1|c' % metric)
+        statsd.send(*statsd_metrics)
+
+    if request is not None:
+        timings = request.__dict__.setdefault('_cloudkitty_timings', [])
+        timings.append((name, duration, size, failed))
+
+
+def response_hook(response, *args, **kwargs):
+    """requests hook adding the size of the responses to the current call."""
+    call = getattr(_local, 'call', None)
+    if call is not None:
+        call['size'] += len(response.content or b'')
+
+
+def _call(name, request, func, *args, **kwargs):
+    call = {'size': 0}
+    previous = getattr(_local, 'call', None)
+    _local.call = call
+    failed = True
+    start = time.monotonic()
+    try:
+        result = func(*args, **kwargs)
+        failed = False
+        return result
+    finally:
+        _local.call = previous
+        record(name, time.monotonic() - start, call['size'], failed,
+               request)
+
+
+class InstrumentedProxy(object):
+    """Proxy recording the calls made to the managers of a client.
+
+    Calls are named after the path of the method, for example
+    ``rating.hashmap.get_service``.
+    """
+
+    def __init__(self, target, request=None, prefix=None):
+        self._target = target
+        self._request = request
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name.startswith('_'):
+            return attr
+        path = '%s.%s' % (self._prefix, name) if self._prefix else name
+        if isinstance(attr, ck_base.BaseManager):
+            return InstrumentedProxy(attr, self._request, path)
+        if self._prefix and callable(attr):
+            return functools.partial(_call, path, self._request, attr)
+        return attr
+
+
+def server_timing(timings):
+    """Return the value of a Server-Timing header for the given timings.
+
+    Calls with the same name are aggregated.
+    """
+    calls = OrderedDict()
+    for name, duration, size, failed in timings:
+        count, total, total_size = calls.get(name, (0, 0.0, 0))
+        calls[name] = (count + 1, total + duration, total_size + size)
+    return ', '.join(
+        'ck.%s;dur=%.1f;desc="%d call(s), %d bytes"' % (
+            name, total * 1000, count, total_size)
+        for name, (count, total, total_size) in calls.items())
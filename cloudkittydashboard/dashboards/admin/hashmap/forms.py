@@ -11,9 +11,13 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import collections
 from decimal import Decimal
 import logging
+import os
+import uuid
 
+from django.core.cache import cache
 from django.utils.translation import gettext_lazy as _
 from horizon import exceptions as horizon_exceptions
 from horizon import forms
@@ -21,6 +25,7 @@ from horizon import messages
 from keystoneauth1 import exceptions
 
 from cloudkittydashboard.api import cloudkitty as api
+from cloudkittydashboard.api import hashmap as hashmap_api
 
 from openstack_dashboard import api as api_keystone
 
@@ -117,7 +122,7 @@ class CreateFieldForm(forms.SelfHandlingForm):
         super(CreateFieldForm, self).__init__(request, *args, **kwargs)
         service_id = kwargs['initial']['service_id']
         manager = api.cloudkittyclient(request).rating.hashmap
-        service = manager.get_service(service_id=service_id)
+        service = api.get_hashmap_object(request, 'service', service_id)
         self.fields['service_name'].initial = service['name']
 
         try:
@@ -193,7 +198,9 @@ class BaseThresholdForm(BaseForm):
         for k, v in data.items():
             if v:
                 threshold[k] = float(v) if isinstance(v, Decimal) else v
-        return thresholds_mgr.create_threshold(**threshold)
+        threshold = thresholds_mgr.create_threshold(**threshold)
+        api.bump_rating_config_version(request)
+        return threshold
 
 
 class CreateServiceThresholdForm(BaseThresholdForm):
@@ -220,7 +227,9 @@ class BaseMappingForm(BaseForm):
         for k, v in data.items():
             if v:
                 mapping[k] = float(v) if isinstance(v, Decimal) else v
-        return mapping_mgr.create_mapping(**mapping)
+        mapping = mapping_mgr.create_mapping(**mapping)
+        api.bump_rating_config_version(request)
+        return mapping
 
 
 class CreateFieldMappingForm(BaseMappingForm):
@@ -256,7 +265,9 @@ class BaseEditMappingForm(BaseMappingForm):
             if v:
                 mapping[k] = float(v) if isinstance(v, Decimal) else v
         mapping['mapping_id'] = self.initial['mapping_id']
-        return mapping_mgr.update_mapping(**mapping)
+        mapping = mapping_mgr.update_mapping(**mapping)
+        api.bump_rating_config_version(request)
+        return mapping
 
 
 class EditServiceMappingForm(BaseEditMappingForm, CreateServiceMappingForm):
@@ -287,7 +298,9 @@ class BaseEditThresholdForm(BaseThresholdForm):
             if v:
                 threshold[k] = float(v) if isinstance(v, Decimal) else v
         threshold['threshold_id'] = self.initial['threshold_id']
-        return threshold_mgr.update_threshold(**threshold)
+        threshold = threshold_mgr.update_threshold(**threshold)
+        api.bump_rating_config_version(request)
+        return threshold
 
 
 class EditServiceThresholdForm(BaseEditThresholdForm,
@@ -312,3 +325,125 @@ class EditFieldThresholdForm(BaseEditThresholdForm,
         'cost',
         'group_id',
         'tenant_id']
+
+
+# Number of operations listed in the messages of an import
+LISTED_OPERATIONS = 10
+# Number of seconds the progress of an import is kept
+PROGRESS_TTL = 3600
+
+
+def import_progress_key(request, import_id):
+    return 'cloudkittydashboard:hashmap_import:%s:%s' % (request.user.id,
+                                                         import_id)
+
+
+def _describe(operation):
+    return '%s %s %s' % (operation['action'], operation['kind'],
+                         operation['path'])
+
+
+class ImportForm(forms.SelfHandlingForm):
+    document = forms.FileField(
+        label=_("Document"),
+        help_text=_("YAML, JSON or CSV document describing the services, "
+                    "fields, groups, mappings and thresholds."))
+    format = forms.ChoiceField(
+        label=_("Format"),
+        choices=[('', _("Detect from the file extension")),
+                 ('yaml', 'YAML'), ('json', 'JSON'), ('csv', 'CSV')],
+        required=False)
+    prune = forms.BooleanField(
+        label=_("Delete the objects missing from the document"),
+        required=False)
+    dry_run = forms.BooleanField(
+        label=_("Only list the changes"),
+        required=False)
+    # Generated with the form, the import modal polls the progress of the
+    # import while it is submitted
+    import_id = forms.RegexField(
+        regex=r'^[0-9a-f]{32}$',
+        initial=lambda: uuid.uuid4().hex,
+        widget=forms.HiddenInput,
+        required=False)
+
+    def clean(self):
+        data = super(ImportForm, self).clean()
+        document = data.get('document')
+        if document is None:
+            return data
+        fmt = data.get('format')
+        if not fmt:
+            extension = os.path.splitext(document.name)[1].lower()
+            fmt = {'.json': 'json', '.csv': 'csv'}.get(extension, 'yaml')
+        try:
+            content = document.read().decode('utf-8-sig')
+            data['config'] = hashmap_api.parse_config(
+                hashmap_api.load_document(content, fmt))
+        except UnicodeDecodeError:
+            raise forms.ValidationError(
+                _('The document must be encoded in UTF-8.'))
+        except hashmap_api.ConfigError as e:
+            raise forms.ValidationError(str(e))
+        return data
+
+    def _list(self, request, operations, level=messages.info):
+        for operation in operations[:LISTED_OPERATIONS]:
+            level(request, _describe(operation))
+        if len(operations) > LISTED_OPERATIONS:
+            level(request, _('And %d more.') % (
+                len(operations) - LISTED_OPERATIONS))
+
+    def _progress(self, request, import_id):
+        key = import_progress_key(request, import_id)
+        errors = []
+
+        def progress(done, total, operation=None, error=None):
+            if error is not None:
+                errors.append(operation)
+            cache.set(key, {'done': done, 'total': total,
+                            'errors': len(errors)}, PROGRESS_TTL)
+        return progress
+
+    def handle(self, request, data):
+        progress = None
+        if data.get('import_id'):
+            progress = self._progress(request, data['import_id'])
+        try:
+            current = api.get_hashmap_config(request)
+            operations = hashmap_api.diff(current, data['config'],
+                                          prune=data['prune'])
+            if not operations:
+                messages.info(request,
+                              _('The hashmap configuration is up to date.'))
+                return True
+            counts = collections.Counter(
+                operation['action'] for operation in operations)
+            if data['dry_run']:
+                messages.info(request, _(
+                    'Import: %(create)d creations, %(update)d updates and '
+                    '%(delete)d deletions.') % counts)
+                self._list(request, operations)
+                return True
+
+            LOG.info('Importing the hashmap configuration: %s',
+                     dict(counts))
+            if progress is not None:
+                progress(0, len(operations))
+            results = api.apply_hashmap_operations(
+                request, operations, current, progress=progress)
+        except Exception:
+            horizon_exceptions.handle(
+                request, _("Unable to import the hashmap configuration."))
+            return False
+
+        failed = [operation for operation, error in results
+                  if error is not None]
+        counts.subtract(operation['action'] for operation in failed)
+        messages.success(request, _(
+            'Hashmap configuration imported: %(create)d creations, '
+            '%(update)d updates and %(delete)d deletions.') % counts)
+        if failed:
+            messages.error(request, _('%d operations failed:') % len(failed))
+            self._list(request, failed, level=messages.error)
+        return True
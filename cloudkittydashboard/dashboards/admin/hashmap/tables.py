@@ -13,6 +13,8 @@
 #    under the License.
 
 from collections import OrderedDict
+import functools
+
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from django.utils.translation import ngettext_lazy
@@ -32,6 +34,22 @@ class CreateService(tables.LinkAction):
     classes = ("ajax-modal",)
 
 
+class ImportConfig(tables.LinkAction):
+    name = "importconfig"
+    verbose_name = _("Import")
+    url = 'horizon:admin:hashmap:import'
+    icon = "upload"
+    ajax = True
+    classes = ("ajax-modal",)
+
+
+class ExportConfig(tables.LinkAction):
+    name = "exportconfig"
+    verbose_name = _("Export")
+    url = 'horizon:admin:hashmap:export'
+    icon = "download"
+
+
 class DeleteService(tables.DeleteAction):
     name = "deleteservice"
     verbose_name = _("Delete Service")
@@ -57,6 +75,7 @@ class DeleteService(tables.DeleteAction):
     def action(self, request, service_id):
         api.cloudkittyclient(request).rating.hashmap.delete_service(
             service_id=service_id)
+        api.bump_rating_config_version(request)
 
 
 class ServicesTable(tables.DataTable):
@@ -77,7 +96,8 @@ class ServicesTable(tables.DataTable):
     class Meta(object):
         name = "services"
         verbose_name = _("Services")
-        table_actions = (CreateService, DeleteService)
+        table_actions = (CreateService, ImportConfig, ExportConfig,
+                         DeleteService)
         row_actions = (DeleteService,)
 
 
@@ -119,6 +139,7 @@ class DeleteGroup(tables.DeleteAction):
     def action(self, request, group_id):
         api.cloudkittyclient(request).rating.hashmap.delete_group(
             group_id=group_id)
+        api.bump_rating_config_version(request)
 
 
 def get_detail_link(datum):
@@ -150,8 +171,8 @@ class GroupsTab(tabs.TableTab):
     preload = True
 
     def get_groups_data(self):
-        client = api.cloudkittyclient(self.request)
-        groups = client.rating.hashmap.get_group().get('groups', [])
+        # The groups are shared by the tabs, identify updates copies of them
+        groups = (dict(group) for group in get_groups(self.request))
         return api.identify(groups, key='group_id')
 
 
@@ -206,6 +227,7 @@ class DeleteServiceThreshold(tables.DeleteAction):
     def action(self, request, threshold_id):
         api.cloudkittyclient(request).rating.hashmap.delete_threshold(
             threshold_id=threshold_id)
+        api.bump_rating_config_version(request)
 
 
 class DeleteFieldThreshold(tables.DeleteAction):
@@ -233,6 +255,7 @@ class DeleteFieldThreshold(tables.DeleteAction):
     def action(self, request, threshold_id):
         api.cloudkittyclient(request).rating.hashmap.delete_threshold(
             threshold_id=threshold_id)
+        api.bump_rating_config_version(request)
 
 
 class EditServiceThreshold(tables.LinkAction):
@@ -254,20 +277,46 @@ def get_groupname(datum):
     return _("Not available")
 
 
+def get_groups(request):
+    """Return the hashmap groups, listed at most once per request."""
+    cache = api.request_cache(request, 'hashmap_groups')
+    if 'groups' not in cache:
+        client = api.cloudkittyclient(request)
+        cache['groups'] = client.rating.hashmap.get_group().get('groups', [])
+    return cache['groups']
+
+
+def get_group_index(request):
+    """Return a group_id -> name index shared by all tabs of a request."""
+    cache = api.request_cache(request, 'hashmap_groups')
+    if 'index' not in cache:
+        cache['index'] = OrderedDict([(str(group['group_id']), group['name'])
+                                      for group in get_groups(request)])
+    return cache['index']
+
+
+def _resolve_groups(request, index, group_ids):
+    hashmap = api.cloudkittyclient(request).rating.hashmap
+    results = api.gather(*[
+        functools.partial(hashmap.get_group, group_id=group_id)
+        for group_id in group_ids])
+    for group_id, (group, error) in zip(group_ids, results):
+        if error is None:
+            index[group_id] = group['name']
+
+
 def add_groupname(request, datums):
-    client = api.cloudkittyclient(request)
-    groups = client.rating.hashmap.get_group().get('groups', [])
-    full_groups = OrderedDict([(str(group['group_id']), group['name'])
-                               for group in groups])
+    index = get_group_index(request)
+    missing = sorted(set(
+        str(datum['group_id']) for datum in datums
+        if datum.get('group_id') and str(datum['group_id']) not in index))
+    if missing:
+        _resolve_groups(request, index, missing)
 
     for datum in datums:
-        if datum.get('group_id'):
-            if datum['group_id'] in full_groups:
-                datum['group_name'] = full_groups[datum['group_id']]
-            else:
-                group = client.rating.hashmap.get_group(
-                    group_id=datum['group_id'])
-                datum['group_name'] = group['name']
+        group_id = datum.get('group_id')
+        if group_id and str(group_id) in index:
+            datum['group_name'] = index[str(group_id)]
 
 
 class BaseThresholdsTable(tables.DataTable):
@@ -373,6 +422,7 @@ class DeleteField(tables.DeleteAction):
     def action(self, request, field_id):
         api.cloudkittyclient(request).rating.hashmap.delete_field(
             field_id=field_id)
+        api.bump_rating_config_version(request)
 
 
 class CreateField(tables.LinkAction):
@@ -445,6 +495,7 @@ class DeleteMapping(tables.DeleteAction):
     def action(self, request, mapping_id):
         api.cloudkittyclient(request).rating.hashmap.delete_mapping(
             mapping_id=mapping_id)
+        api.bump_rating_config_version(request)
 
 
 class CreateServiceMapping(tables.LinkAction):
@@ -21,6 +21,15 @@ urlpatterns = [
     re_path(r'^service/(?P<service_id>[^/]+)/?$',
             views.ServiceView.as_view(),
             name='service'),
+    re_path(r'^import/?$',
+            views.ImportView.as_view(),
+            name='import'),
+    re_path(r'^import/(?P<import_id>[0-9a-f]{32})/progress/?$',
+            views.ImportProgressView.as_view(),
+            name='import_progress'),
+    re_path(r'^export/?$',
+            views.ExportView.as_view(),
+            name='export'),
     re_path(r'^create_service/?$',
             views.ServiceCreateView.as_view(),
             name='service_create'),
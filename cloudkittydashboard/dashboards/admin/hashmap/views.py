@@ -12,10 +12,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 
+from django.core.cache import cache
+from django import http
 from django.urls import reverse
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
+from django.views import generic
 from horizon import forms
 from horizon import tables
 from horizon import tabs
@@ -23,6 +27,7 @@ from horizon import views
 from keystoneauth1 import exceptions
 
 from cloudkittydashboard.api import cloudkitty as api
+from cloudkittydashboard.api import hashmap as hashmap_api
 from cloudkittydashboard.dashboards.admin.hashmap import forms as hashmap_forms
 from cloudkittydashboard.dashboards.admin.hashmap \
     import tables as hashmap_tables
@@ -32,24 +37,74 @@ class IndexView(tables.DataTableView):
     table_class = hashmap_tables.ServicesTable
     template_name = "admin/hashmap/services_list.html"
 
+    def _get_units_by_service(self, manager, services):
+        try:
+            metrics = manager.info.get_metric().get('metrics', [])
+            return {m['metric_id']: m.get('unit', '-') for m in metrics}
+        except exceptions.HttpError:
+            pass
+
+        # Backends without the metric listing, query each metric concurrently
+        names = [s['name'] for s in services]
+        results = api.gather(*[
+            functools.partial(manager.info.get_metric, metric_name=name)
+            for name in names])
+        return {name: metric['unit']
+                for name, (metric, error) in zip(names, results)
+                if error is None}
+
     def get_data(self):
         manager = api.cloudkittyclient(self.request)
         services = manager.rating.hashmap.get_service().get('services', [])
         services = sorted(services, key=lambda service: service['name'])
-        list_services = []
-        for s in services:
-            try:
-                service = manager.info.get_metric(metric_name=s['name'])
-                unit = service['unit']
-            except exceptions.NotFound:
-                unit = "-"
-
-            list_services.append({
-                "id": s['service_id'],
-                "name": s['name'],
-                "unit": unit
-            })
-        return list_services
+        units = self._get_units_by_service(manager, services)
+        return [{
+            "id": s['service_id'],
+            "name": s['name'],
+            "unit": units.get(s['name'], "-"),
+        } for s in services]
+
+
+class ImportView(forms.ModalFormView):
+    form_class = hashmap_forms.ImportForm
+    form_id = "import_hashmap"
+    modal_header = _("Import Configuration")
+    page_title = _("Import Configuration")
+    submit_label = _("Import")
+    success_url = reverse_lazy('horizon:admin:hashmap:index')
+    submit_url = reverse_lazy('horizon:admin:hashmap:import')
+    template_name = 'admin/hashmap/import.html'
+
+
+class ImportProgressView(generic.View):
+    """Progress of an import of the user, in JSON."""
+
+    def get(self, request, *args, **kwargs):
+        status = cache.get(hashmap_forms.import_progress_key(
+            request, kwargs['import_id']))
+        return http.JsonResponse(status or {})
+
+
+class ExportView(generic.View):
+    """Stream the hashmap configuration, see hashmap.parse_config."""
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get('format', 'yaml')
+        if fmt not in hashmap_api.FORMATS:
+            return http.HttpResponseBadRequest(
+                'Unknown format, expected one of: %s' % ', '.join(
+                    hashmap_api.FORMATS))
+        groups = {group['group_id']: group['name'] for group in
+                  api.cloudkittyclient(request).rating.hashmap.get_group()[
+                      'groups']}
+        services = (hashmap_api.export_service(loaded, groups)
+                    for loaded in api.iter_hashmap_services(request))
+        response = http.StreamingHttpResponse(
+            hashmap_api.iter_export(fmt, sorted(groups.values()), services),
+            content_type=hashmap_api.CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = (
+            'attachment; filename="hashmap.%s"' % fmt)
+        return response
 
 
 class ServiceView(tabs.TabbedTableView):
@@ -57,19 +112,17 @@ class ServiceView(tabs.TabbedTableView):
     template_name = 'admin/hashmap/service_details.html'
 
     def get(self, *args, **kwargs):
-        service = api.cloudkittyclient(
-            self.request).rating.hashmap.get_service(
-            service_id=kwargs['service_id'])
+        service = api.get_hashmap_object(
+            self.request, 'service', kwargs['service_id'])
         self.request.service_id = service['service_id']
         self.page_title = "Hashmap Service : %s" % service['name']
         return super(ServiceView, self).get(*args, **kwargs)
 
     def get_context_data(self, **kwargs):
         context = super(ServiceView, self).get_context_data(**kwargs)
-        manager = api.cloudkittyclient(self.request)
-        service = manager.rating.hashmap.get_service(
-            service_id=kwargs['service_id'])
-        config = manager.info.get_config()
+        service = api.get_hashmap_object(
+            self.request, 'service', kwargs['service_id'])
+        config = api.get_info_config(self.request)
         period = None
 
         if service['name'] in config['metrics'].keys():
@@ -97,8 +150,8 @@ class FieldView(tabs.TabbedTableView):
     template_name = 'admin/hashmap/field_details.html'
 
     def get(self, *args, **kwargs):
-        field = api.cloudkittyclient(self.request).rating.hashmap.get_field(
-            field_id=kwargs['field_id'])
+        field = api.get_hashmap_object(
+            self.request, 'field', kwargs['field_id'])
         self.request.field_id = field['field_id']
         self.page_title = "Hashmap Field : %s" % field['name']
         return super(FieldView, self).get(*args, **kwargs)
@@ -168,8 +221,8 @@ class ServiceMappingEditView(ServiceMappingCreateView):
     success_url = 'horizon:admin:hashmap:service_mapping_edit'
 
     def get_initial(self):
-        out = api.cloudkittyclient(self.request).rating.hashmap.get_mapping(
-            mapping_id=self.kwargs['mapping_id'])
+        out = api.get_hashmap_object(
+            self.request, 'mapping', self.kwargs['mapping_id'])
         self.initial = out
         return self.initial
 
@@ -222,8 +275,8 @@ class FieldMappingEditView(FieldMappingCreateView):
     submit_url = 'horizon:admin:hashmap:field_mapping_edit'
 
     def get_initial(self):
-        out = api.cloudkittyclient(self.request).rating.hashmap.get_mapping(
-            mapping_id=self.kwargs['mapping_id'])
+        out = api.get_hashmap_object(
+            self.request, 'mapping', self.kwargs['mapping_id'])
         self.initial = out
         return self.initial
 
@@ -307,8 +360,8 @@ class ServiceThresholdEditView(ServiceThresholdCreateView):
     submit_url = 'horizon:admin:hashmap:service_threshold_edit'
 
     def get_initial(self):
-        out = api.cloudkittyclient(self.request).rating.hashmap.get_threshold(
-            threshold_id=self.kwargs['threshold_id'])
+        out = api.get_hashmap_object(
+            self.request, 'threshold', self.kwargs['threshold_id'])
         self.initial = out
         return self.initial
 
@@ -361,8 +414,8 @@ class FieldThresholdEditView(FieldThresholdCreateView):
     submit_url = 'horizon:admin:hashmap:field_threshold_edit'
 
     def get_initial(self):
-        out = api.cloudkittyclient(self.request).rating.hashmap.get_threshold(
-            threshold_id=self.kwargs['threshold_id'])
+        out = api.get_hashmap_object(
+            self.request, 'threshold', self.kwargs['threshold_id'])
         self.initial = out
         return self.initial
 
@@ -402,22 +455,13 @@ class GroupDetailsView(views.APIView):
 
     def get_data(self, request, context, *args, **kwargs):
         group_id = kwargs.get("group_id")
-        ck_client = api.cloudkittyclient(self.request)
-
-        try:
-            group = ck_client.rating.hashmap.get_group(group_id=group_id)
-        except Exception:
-            group = None
-        try:
-            mappings = ck_client.rating.hashmap.get_mapping(
-                group_id=group_id)['mappings']
-        except Exception:
-            mappings = []
-        try:
-            thresholds = ck_client.rating.hashmap.get_threshold(
-                group_id=group_id)['thresholds']
-        except Exception:
-            thresholds = []
+        hashmap = api.cloudkittyclient(self.request).rating.hashmap
+        (group, __), (mappings, __), (thresholds, __) = api.gather(
+            functools.partial(hashmap.get_group, group_id=group_id),
+            functools.partial(hashmap.get_mapping, group_id=group_id),
+            functools.partial(hashmap.get_threshold, group_id=group_id))
+        mappings = (mappings or {}).get('mappings', [])
+        thresholds = (thresholds or {}).get('thresholds', [])
 
         values = {
             "mappings": {"fields": [], "services": []},
@@ -28,6 +28,7 @@ class EditPriorityForm(forms.SelfHandlingForm):
         try:
             priority = ck_client.rating.update_module(
                 module_id=self.initial["module_id"], priority=data["priority"])
+            api.bump_rating_config_version(request)
             messages.success(
                 request,
                 _('Successfully updated priority'))
@@ -88,6 +88,7 @@ class ToggleEnabledModule(tables.BatchAction):
         self.current_past_action = DISABLE if self.enabled else ENABLE
         client.rating.update_module(module_id=obj_id,
                                     enabled=(not self.enabled))
+        api.bump_rating_config_version(request)
 
 
 def get_details_link(datum):
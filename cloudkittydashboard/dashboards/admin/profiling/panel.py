@@ -0,0 +1,29 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+
+import horizon
+
+MIDDLEWARE = 'cloudkittydashboard.middleware.ProfilingMiddleware'
+
+
+class Profiling(horizon.Panel):
+    name = _("Profiling")
+    slug = "rating_profiling"
+
+    def allowed(self, context):
+        # The panel is only useful when the profiling middleware is enabled
+        if MIDDLEWARE not in getattr(settings, 'MIDDLEWARE', ()):
+            return False
+        return super(Profiling, self).allowed(context)
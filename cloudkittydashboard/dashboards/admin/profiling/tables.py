@@ -0,0 +1,81 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import datetime
+
+from django.urls import reverse
+from django.utils import formats
+from django.utils.translation import gettext_lazy as _
+
+from horizon import tables
+
+from cloudkittydashboard import profiling
+
+
+def _format_time(timestamp):
+    return formats.localize(
+        datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc))
+
+
+def _format_seconds(seconds):
+    return '%.1f ms' % (seconds * 1000)
+
+
+def get_details_link(datum):
+    url = "horizon:admin:rating_profiling:profile_details"
+    return reverse(url, kwargs={'profile_id': datum['id']})
+
+
+class ClearProfiles(tables.Action):
+    name = "clear"
+    verbose_name = _("Clear Profiles")
+    icon = "trash"
+    requires_input = False
+
+    def handle(self, data_table, request, object_ids):
+        profiling.store.clear()
+
+
+class ProfilesTable(tables.DataTable):
+    time = tables.Column('time', verbose_name=_("Time"),
+                         filters=(_format_time,))
+    view = tables.Column('view', verbose_name=_("View"),
+                         link=get_details_link)
+    path = tables.Column('path', verbose_name=_("Path"))
+    mode = tables.Column('mode', verbose_name=_("Mode"))
+    duration = tables.Column('duration', verbose_name=_("Duration"),
+                             filters=(_format_seconds,))
+
+    def get_object_id(self, datum):
+        return datum['id']
+
+    class Meta(object):
+        name = "profiles"
+        verbose_name = _("Profiles")
+        table_actions = (ClearProfiles,)
+
+
+class FunctionsTable(tables.DataTable):
+    name = tables.Column('name', verbose_name=_("Function"))
+    calls = tables.Column('calls', verbose_name=_("Calls"))
+    self_time = tables.Column('self', verbose_name=_("Self Time"),
+                              filters=(_format_seconds,))
+    cumulative = tables.Column('cumulative',
+                               verbose_name=_("Cumulative Time"),
+                               filters=(_format_seconds,))
+
+    def get_object_id(self, datum):
+        return datum['name']
+
+    class Meta(object):
+        name = "functions"
+        verbose_name = _("Hot Functions")
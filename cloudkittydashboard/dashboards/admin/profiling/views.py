@@ -0,0 +1,48 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from django import http
+from django.utils.translation import gettext_lazy as _
+from horizon import tables
+
+from cloudkittydashboard.dashboards.admin.profiling import tables as \
+    profiling_tables
+from cloudkittydashboard import profiling
+
+
+class IndexView(tables.DataTableView):
+    template_name = 'admin/rating_profiling/index.html'
+    table_class = profiling_tables.ProfilesTable
+    page_title = _("Profiling")
+
+    def get_data(self):
+        return profiling.store.list()
+
+
+class ProfileDetailsView(tables.DataTableView):
+    template_name = 'admin/rating_profiling/details.html'
+    table_class = profiling_tables.FunctionsTable
+    page_title = _("Profile Details")
+
+    def _get_profile(self):
+        profile = profiling.store.get(self.kwargs['profile_id'])
+        if profile is None:
+            raise http.Http404()
+        return profile
+
+    def get_data(self):
+        return self._get_profile()['functions']
+
+    def get_context_data(self, **kwargs):
+        context = super(ProfileDetailsView, self).get_context_data(**kwargs)
+        context['profile'] = self._get_profile()
+        return context
@@ -100,6 +100,7 @@ class CreateScriptForm(forms.SelfHandlingForm):
             script = ck_client.rating.pyscripts.create_script(
                 name=name,
                 data=data['script_data'])
+            api.bump_rating_config_version(request)
             messages.success(
                 request,
                 _('Successfully created script'))
@@ -127,6 +128,7 @@ class EditScriptForm(CreateScriptForm):
             script = ck_client.rating.pyscripts.update_script(
                 script_id=script_id, name=data['name'],
                 data=data['script_data'])
+            api.bump_rating_config_version(request)
             messages.success(
                 request,
                 _('Successfully updated script'))
@@ -72,6 +72,7 @@ class DeletePyScript(tables.DeleteAction):
     def action(self, request, script_id):
         api.cloudkittyclient(request).rating.pyscripts.delete_script(
             script_id=script_id)
+        api.bump_rating_config_version(request)
 
 
 class PyScriptsTable(tables.DataTable):
@@ -12,33 +12,95 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from urllib import parse
+
+from django import shortcuts
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
+from horizon import exceptions
+from horizon import messages
 from horizon import tables
 
+from cloudkittydashboard.api import cloudkitty as api
+from cloudkittydashboard import utils
+
+SORT_KEYS = ('rate', 'name')
+# Query parameters kept when paginating
+LIST_PARAMS = ('sort', 'dir', 'top', 'min_rate')
+# ID of the row aggregating the projects filtered out of the summary
+OTHERS_ID = 'OTHERS'
+
 
 def get_details_link(datum):
-    if datum.tenant_id:
+    if datum.tenant_id and datum.tenant_id != OTHERS_ID:
         url = "horizon:admin:rating_summary:project_details"
         return reverse(url, kwargs={'project_id': datum.tenant_id})
 
 
+class RefreshSummary(tables.Action):
+    name = "refresh"
+    verbose_name = _("Refresh")
+    icon = "refresh"
+    requires_input = False
+
+    def single(self, data_table, request, object_id):
+        try:
+            api.get_rating_summary(request, refresh=True)
+            api.invalidate_project_names(request)
+            messages.success(request, _("Summary was successfully refreshed."))
+        except Exception:
+            exceptions.handle(request, _("Unable to refresh the summary."))
+        return shortcuts.redirect(request.get_full_path())
+
+
 class SummaryTable(tables.DataTable):
     project_id = tables.Column(
         'tenant_id', verbose_name=_("Project ID"), link=get_details_link)
     project_name = tables.Column(
         'name', verbose_name=_("Project Name"), link=get_details_link)
-    total = tables.Column('rate', verbose_name=_("Project Total"))
+    total = tables.Column('rate', verbose_name=_("Project Total"),
+                          filters=(utils.rate_formatter(),))
 
     class Meta(object):
         name = "summary"
         verbose_name = _("Summary")
+        table_actions = (RefreshSummary,)
+
+    def _get_projects(self):
+        # The "Others" and "Cloud Total" rows are not projects and can not
+        # be used as pagination markers
+        return [datum for datum in self.data
+                if datum.tenant_id not in (OTHERS_ID, 'ALL')]
+
+    def _get_params_string(self):
+        params = [(key, self.request.GET[key]) for key in LIST_PARAMS
+                  if self.request.GET.get(key)]
+        return ''.join('&' + parse.urlencode([param]) for param in params)
+
+    def get_prev_marker(self):
+        projects = self._get_projects()
+        return parse.quote_plus(self.get_object_id(projects[0])) \
+            if projects else ''
+
+    def get_marker(self):
+        projects = self._get_projects()
+        return parse.quote_plus(self.get_object_id(projects[-1])) \
+            if projects else ''
+
+    def get_prev_pagination_string(self):
+        pagination = super(SummaryTable, self).get_prev_pagination_string()
+        return pagination + self._get_params_string()
+
+    def get_pagination_string(self):
+        pagination = super(SummaryTable, self).get_pagination_string()
+        return pagination + self._get_params_string()
 
 
 class TenantSummaryTable(tables.DataTable):
     res_type = tables.Column('res_type', verbose_name=_("Res Type"))
-    rate = tables.Column('rate', verbose_name=_("Rate"))
+    rate = tables.Column('rate', verbose_name=_("Rate"),
+                         filters=(utils.rate_formatter(),))
 
     class Meta(object):
         name = "tenant_summary"
@@ -12,44 +12,122 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from django.conf import settings
+import heapq
+
 from django.utils.translation import gettext_lazy as _
 from horizon import tables
-
-from openstack_dashboard.api import keystone as api_keystone
+from horizon.utils import functions as utils_functions
 
 from cloudkittydashboard.api import cloudkitty as api
 from cloudkittydashboard.dashboards.admin.summary import tables as sum_tables
 from cloudkittydashboard import utils
 
-rate_prefix = getattr(settings,
-                      'OPENSTACK_CLOUDKITTY_RATE_PREFIX', None)
-rate_postfix = getattr(settings,
-                       'OPENSTACK_CLOUDKITTY_RATE_POSTFIX', None)
 
+def _get_param(request, name, type_):
+    try:
+        value = type_(request.GET[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return value if value >= 0 else None
+
+
+def _rate_key(item):
+    return (float(item['rate']), str(item['tenant_id']))
 
-class IndexView(tables.DataTableView):
+
+class IndexView(tables.PagedTableMixin, tables.DataTableView):
     template_name = 'admin/rating_summary/index.html'
     table_class = sum_tables.SummaryTable
 
+    def _get_sort(self):
+        sort_key = self.request.GET.get('sort')
+        if sort_key not in sum_tables.SORT_KEYS:
+            sort_key = 'rate'
+        default_dir = 'desc' if sort_key == 'rate' else 'asc'
+        sort_dir = self.request.GET.get('dir', default_dir)
+        return sort_key, sort_dir == 'desc'
+
+    def _sort(self, summary, tenants):
+        sort_key, reverse = self._get_sort()
+        if sort_key == 'name':
+            def key(item):
+                return (tenants.get(item['tenant_id'], '-').lower(),
+                        str(item['tenant_id']))
+        else:
+            key = _rate_key
+        return sorted(summary, key=key, reverse=reverse)
+
+    def _get_filters(self):
+        return (_get_param(self.request, 'top', int),
+                _get_param(self.request, 'min_rate', float))
+
+    def _paginate(self, summary):
+        page_size = utils_functions.get_page_size(self.request)
+        marker, direction = self._get_marker()
+        ids = [str(item['tenant_id']) for item in summary]
+        start, end = 0, page_size
+        if marker in ids:
+            if direction == 'asc':
+                end = ids.index(marker)
+                start = max(0, end - page_size)
+            else:
+                start = ids.index(marker) + 1
+                end = start + page_size
+        self._has_prev_data = start > 0
+        self._has_more_data = end < len(summary)
+        return summary[start:end]
+
+    def _get_names(self, summary):
+        return api.resolve_project_names(
+            self.request, [item['tenant_id'] for item in summary
+                           if item['tenant_id']])
+
     def get_data(self):
-        summary = api.cloudkittyclient(self.request).report.get_summary(
-            groupby=['tenant_id'], all_tenants=True)['summary']
-
-        tenants, _ = api_keystone.tenant_list(self.request)
-        tenants = {tenant.id: tenant.name for tenant in tenants}
-        summary.append({
-            'tenant_id': 'ALL',
-            'rate': sum([float(item['rate']) for item in summary]),
-        })
-        summary = api.identify(summary, key='tenant_id')
-        for tenant in summary:
+        summary = api.get_rating_summary(self.request)
+        # The total is computed over every project, not only the ones
+        # displayed on the current page
+        cloud_total = utils.sum_rates(summary)
+
+        top, min_rate = self._get_filters()
+        selected = summary
+        if min_rate is not None:
+            selected = [item for item in selected
+                        if float(item['rate']) >= min_rate]
+        if top is not None:
+            # Only the top N projects are selected and displayed on a single
+            # page, there is no need to sort the whole summary
+            selected = heapq.nlargest(top, selected, key=_rate_key)
+        # Sorting by name requires the name of every project, otherwise only
+        # the projects displayed on the page are resolved
+        sort_by_name = self._get_sort()[0] == 'name'
+        tenants = self._get_names(selected) if sort_by_name else {}
+        page = self._sort(selected, tenants)
+        if top is None:
+            page = self._paginate(page)
+        if not sort_by_name:
+            tenants = self._get_names(page)
+
+        page = [dict(item, rate=utils.to_decimal(item['rate']))
+                for item in page]
+        if len(selected) < len(summary):
+            others = cloud_total - utils.sum_rates(selected)
+            page.append({'tenant_id': sum_tables.OTHERS_ID, 'rate': others})
+        page.append({'tenant_id': 'ALL', 'rate': cloud_total})
+        page = api.identify(page, key='tenant_id')
+        for tenant in page:
             tenant['name'] = tenants.get(tenant.id, '-')
-        summary[-1]['name'] = 'Cloud Total'
-        for tenant in summary:
-            tenant['rate'] = utils.formatRate(tenant['rate'],
-                                              rate_prefix, rate_postfix)
-        return summary
+        if len(selected) < len(summary):
+            page[-2]['name'] = _('Others')
+        page[-1]['name'] = 'Cloud Total'
+        return page
+
+    def get_context_data(self, **kwargs):
+        context = super(IndexView, self).get_context_data(**kwargs)
+        sort_key, reverse = self._get_sort()
+        context['sort_key'] = sort_key
+        context['sort_dir'] = 'desc' if reverse else 'asc'
+        context['top'], context['min_rate'] = self._get_filters()
+        return context
 
 
 class TenantDetailsView(tables.DataTableView):
@@ -57,25 +135,9 @@ class TenantDetailsView(tables.DataTableView):
     table_class = sum_tables.TenantSummaryTable
     page_title = _("Script Details : {{ table.project_id }}")
 
-    def _get_cloud_total_summary(self):
-        return api.cloudkittyclient(self.request).report.get_summary(
-            groupby=['res_type'], all_tenants=True)['summary']
-
     def get_data(self):
         tenant_id = self.kwargs['project_id']
-        if tenant_id == 'ALL':
-            summary = self._get_cloud_total_summary()
-        else:
-            summary = api.cloudkittyclient(self.request).report.get_summary(
-                groupby=['res_type'], tenant_id=tenant_id)['summary']
-
-        summary.append({
-            'tenant_id': tenant_id,
-            'res_type': 'TOTAL',
-            'rate': sum([float(item['rate']) for item in summary]),
-        })
-        summary = api.identify(summary, key='res_type', name=True)
-        for item in summary:
-            item['rate'] = utils.formatRate(item['rate'],
-                                            rate_prefix, rate_postfix)
-        return summary
+        summary = utils.summarize(
+            api.get_project_summary(self.request, tenant_id),
+            {'tenant_id': tenant_id, 'res_type': 'TOTAL'})
+        return api.identify(summary, key='res_type', name=True)
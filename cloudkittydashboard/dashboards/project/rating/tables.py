@@ -15,12 +15,15 @@ from django.utils.translation import gettext_lazy as _
 
 from horizon import tables
 
+from cloudkittydashboard import utils
+
 
 class SummaryTable(tables.DataTable):
     """This table formats a summary for the given tenant."""
 
     res_type = tables.Column('type', verbose_name=_('Metric Type'))
-    rate = tables.Column('rate', verbose_name=_('Rate'))
+    rate = tables.Column('rate', verbose_name=_('Rate'),
+                         filters=(utils.rate_formatter(),))
 
     class Meta(object):
         name = "summary"
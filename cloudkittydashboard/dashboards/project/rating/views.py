@@ -11,11 +11,14 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import functools
 import json
+import logging
 
 from django.conf import settings
 from django import http
 from django.utils.translation import gettext_lazy as _
+from django.views.decorators.http import require_POST
 from horizon import exceptions
 from horizon import tables
 
@@ -24,10 +27,7 @@ from cloudkittydashboard.dashboards.project.rating \
     import tables as rating_tables
 from cloudkittydashboard import utils
 
-rate_prefix = getattr(settings,
-                      'OPENSTACK_CLOUDKITTY_RATE_PREFIX', None)
-rate_postfix = getattr(settings,
-                       'OPENSTACK_CLOUDKITTY_RATE_POSTFIX', None)
+LOG = logging.getLogger(__name__)
 
 
 class IndexView(tables.DataTableView):
@@ -40,14 +40,22 @@ class IndexView(tables.DataTableView):
                 tenant_id=self.request.user.tenant_id,
                 groupby=['type'], response_format='object')
 
-        data = summary.get('results')
-        total = sum([r.get('rate') for r in data])
+        return utils.summarize(summary.get('results'), {'type': 'TOTAL'})
 
-        data.append({'type': 'TOTAL', 'rate': total})
-        for item in data:
-            item['rate'] = utils.formatRate(item['rate'],
-                                            rate_prefix, rate_postfix)
-        return data
+
+def _update_quotation_data(element, service):
+    if isinstance(element, dict):
+        element['service'] = service
+    else:
+        for elem in element:
+            _update_quotation_data(elem, service)
+
+
+def _is_quotation_spec(spec):
+    # A resource description, or a list of resource descriptions
+    if isinstance(spec, list):
+        return all(isinstance(elem, dict) for elem in spec)
+    return isinstance(spec, dict)
 
 
 def quote(request):
@@ -56,22 +64,49 @@ def quote(request):
         if request.method == 'POST':
             json_data = json.loads(request.body)
 
-            def __update_quotation_data(element, service):
-                if isinstance(element, dict):
-                    element['service'] = service
-                else:
-                    for elem in element:
-                        __update_quotation_data(elem, service)
-
             try:
                 service = getattr(
                     settings, 'CLOUDKITTY_QUOTATION_SERVICE', 'instance')
-                __update_quotation_data(json_data, service)
-                pricing = float(api.cloudkittyclient(request)
-                                .rating.get_quotation(res_data=json_data))
+                _update_quotation_data(json_data, service)
+                pricing = float(api.get_quotation(request, json_data))
             except Exception:
                 exceptions.handle(request,
                                   _('Unable to retrieve price.'))
 
     return http.HttpResponse(json.dumps(pricing),
                              content_type='application/json')
+
+
+@require_POST
+def quote_batch(request):
+    """Return the prices of several resource descriptions at once.
+
+    The body is a JSON list, each element being the data expected by
+    :func:`quote`. The response is the list of the prices, in the same order,
+    ``null`` if a price could not be retrieved.
+    """
+    max_specs = getattr(settings, 'CLOUDKITTY_QUOTE_BATCH_MAX_SIZE', 100)
+    try:
+        specs = json.loads(request.body)
+    except ValueError:
+        return http.HttpResponseBadRequest()
+    if not isinstance(specs, list) or len(specs) > max_specs:
+        return http.HttpResponseBadRequest()
+    if not all(_is_quotation_spec(spec) for spec in specs):
+        return http.HttpResponseBadRequest()
+
+    service = getattr(settings, 'CLOUDKITTY_QUOTATION_SERVICE', 'instance')
+    for spec in specs:
+        _update_quotation_data(spec, service)
+    results = api.gather(*[
+        functools.partial(api.get_quotation, request, spec)
+        for spec in specs])
+
+    prices = []
+    for price, error in results:
+        if error is not None:
+            LOG.warning('Unable to retrieve price: %s', error)
+            prices.append(None)
+        else:
+            prices.append(float(price))
+    return http.JsonResponse(prices, safe=False)
@@ -4,4 +4,5 @@ from cloudkittydashboard.dashboards.project.reporting import views
 
 urlpatterns = [
     re_path(r'^$', views.IndexView.as_view(), name='index'),
+    re_path(r'^data$', views.data, name='data'),
 ]
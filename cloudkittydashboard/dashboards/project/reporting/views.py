@@ -17,22 +17,33 @@ import collections
 import datetime
 import decimal
 import time
-
-from horizon import tabs
-from horizon import exceptions
-from horizon import messages
-
-from cloudkittydashboard import forms
+from urllib import parse
 
 from django.conf import settings
+from django import http
+from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from horizon import messages
+from horizon import tabs
+import numpy as np
 
 from cloudkittydashboard.api import cloudkitty as api
+from cloudkittydashboard import forms
 
 
+def _parse_begin(begin):
+    return int(time.mktime(
+        datetime.datetime.strptime(begin[:16], "%Y-%m-%dT%H:%M").timetuple()))
 
-def _do_this_month(data):
+
+def _do_this_month_reference(data):
+    """Reference implementation of :func:`_do_this_month`.
+
+    It is kept to check the equivalence of both implementations.
+    """
     services = {}
 
     # these variables will keep track of the time span to fill the dicts with
@@ -42,9 +53,7 @@ def _do_this_month(data):
     end_timestamp = None
     for dataframe in data.get('dataframes', []):
         begin = dataframe['begin']
-        timestamp = int(time.mktime(
-            datetime.datetime.strptime(begin[:16],
-                                       "%Y-%m-%dT%H:%M").timetuple()))
+        timestamp = _parse_begin(begin)
         if start_timestamp is None or timestamp < start_timestamp:
             start_timestamp = timestamp
         if end_timestamp is None or timestamp > end_timestamp:
@@ -77,56 +86,286 @@ def _do_this_month(data):
     return services
 
 
+RESOLUTIONS = (
+    ('hour', 3600),
+    ('day', 86400),
+    ('week', 604800),
+)
+
+
+class DataframeAggregator(object):
+    """Aggregates dataframes per service and per hour, chunk by chunk.
+
+    Each chunk of dataframes passed to :meth:`add` is laid out in columns
+    (timestamps, service codes, ratings) and reduced with
+    ``numpy.bincount`` to one value per service and timestamp, so the raw
+    API response can be released before the next chunk is fetched.
+    """
+
+    def __init__(self):
+        self._codes = {}
+        self._parsed = {}
+        self._partials = []
+        # Time span of all the dataframes, including the empty ones
+        self._start = None
+        self._end = None
+
+    def add(self, data):
+        frame_timestamps = []
+        frame_sizes = []
+        service_codes = []
+        ratings = []
+        codes = self._codes
+        for dataframe in data.get('dataframes', []):
+            begin = dataframe['begin']
+            if begin not in self._parsed:
+                self._parsed[begin] = _parse_begin(begin)
+            resources = dataframe['resources']
+            frame_timestamps.append(self._parsed[begin])
+            frame_sizes.append(len(resources))
+            service_codes.extend([codes.setdefault(r['service'], len(codes))
+                                  for r in resources])
+            ratings.extend([r['rating'] for r in resources])
+        if frame_timestamps:
+            start, end = min(frame_timestamps), max(frame_timestamps)
+            if self._start is None or start < self._start:
+                self._start = start
+            if self._end is None or end > self._end:
+                self._end = end
+        if not service_codes:
+            return
+
+        timestamps = np.repeat(
+            np.array(frame_timestamps, dtype=np.int64), frame_sizes)
+        columns, column_idx = np.unique(timestamps, return_inverse=True)
+        service_codes = np.array(service_codes, dtype=np.int64)
+        keys = service_codes * len(columns) + column_idx
+        size = len(codes) * len(columns)
+        counts = np.bincount(keys, minlength=size)
+        sums = np.bincount(keys, weights=np.array(ratings, dtype=np.float64),
+                           minlength=size)
+        present = np.flatnonzero(counts)
+        self._partials.append((present // len(columns),
+                               columns[present % len(columns)],
+                               sums[present]))
+
+    def _columns(self):
+        return (np.concatenate([p[0] for p in self._partials]),
+                np.concatenate([p[1] for p in self._partials]),
+                np.concatenate([p[2] for p in self._partials]))
+
+    def choose_resolution(self, max_points):
+        """Returns the finest resolution fitting in ``max_points``.
+
+        ``max_points`` is the maximal number of points of all the series
+        together. The coarsest resolution is returned if none fits.
+        """
+        if not self._partials:
+            return RESOLUTIONS[0]
+        for name, step in RESOLUTIONS:
+            n_points = len(self._codes) * (
+                (self._end - self._start) // step + 1)
+            if n_points <= max_points:
+                return name, step
+        return RESOLUTIONS[-1]
+
+    def _matrix(self, step):
+        service_codes, timestamps, sums = self._columns()
+        start, end = self._start, self._end
+        n_services = len(self._codes)
+        cumulated = np.bincount(service_codes, weights=sums,
+                                minlength=n_services)
+        if step > 3600:
+            columns = np.arange(start, end + 1, step)
+            column_idx = (timestamps - start) // step
+        else:
+            columns = np.union1d(np.arange(start, end + 1, 3600), timestamps)
+            column_idx = np.searchsorted(columns, timestamps)
+        size = n_services * len(columns)
+        keys = service_codes * len(columns) + column_idx
+        matrix = np.bincount(keys, weights=sums, minlength=size)
+        matrix = matrix.reshape(n_services, len(columns))
+
+        on_grid = (columns - start) % 3600 == 0
+        if on_grid.all():
+            present = None
+        else:
+            present = np.bincount(keys, minlength=size) > 0
+            present = present.reshape(n_services, len(columns)) | on_grid
+        return columns, matrix, cumulated, present
+
+    def result(self, step=3600):
+        """Returns the aggregated data.
+
+        The result maps each service to its cumulated rating and to an
+        ``OrderedDict`` of ratings per ``step`` seconds (hourly by default),
+        gap-filled with zeros over the whole period (rickshaw needs this to
+        display stacked graphs).
+        """
+        if not self._partials:
+            return {}
+        columns, matrix, cumulated, present = self._matrix(step)
+        columns = columns.tolist()
+
+        services = {}
+        for service, code in self._codes.items():
+            values = matrix[code].tolist()
+            if present is None:
+                items = zip(columns, values)
+            else:
+                # Timestamps off the hourly grid are only kept for the
+                # services having data at that time
+                items = [(t, v) for t, v, k in
+                         zip(columns, values, present[code]) if k]
+            services[service] = {
+                'cumulated': decimal.Decimal(str(cumulated[code])),
+                'hourly': collections.OrderedDict(items),
+            }
+        return services
+
+    def series(self, step=3600):
+        """Returns the aggregated data in a compact columnar format.
+
+        All the series share the same ``timestamps`` array::
+
+            {"timestamps": [t0, t1, ...],
+             "services": [{"name": "compute",
+                           "cumulated": 42.0,
+                           "values": [v0, v1, ...]}, ...]}
+        """
+        if not self._partials:
+            return {'timestamps': [], 'services': []}
+        columns, matrix, cumulated, _ = self._matrix(step)
+        return {
+            'timestamps': columns.tolist(),
+            'services': [{
+                'name': service,
+                'cumulated': float(cumulated[code]),
+                'values': matrix[code].tolist(),
+            } for service, code in self._codes.items()],
+        }
+
+
+def _do_this_month(data):
+    """Aggregates dataframes per service and per hour.
+
+    See :class:`DataframeAggregator` for the format of the result.
+    """
+    aggregator = DataframeAggregator()
+    aggregator.add(data)
+    return aggregator.result()
+
+
+def _iter_windows(begin, end, days):
+    """Splits the [begin, end] period in contiguous windows of ``days``."""
+    fmt = "%Y-%m-%dT%H:%M:%S"
+    if not days:
+        yield begin, end
+        return
+    window_begin = datetime.datetime.strptime(begin, fmt)
+    period_end = datetime.datetime.strptime(end, fmt)
+    step = datetime.timedelta(days=days)
+    while window_begin < period_end:
+        window_end = min(window_begin + step, period_end)
+        yield window_begin.strftime(fmt), window_end.strftime(fmt)
+        window_begin = window_end
+
+
+def _aggregate_period(client, begin, end, tenant_id):
+    """Fetches and aggregates the dataframes of the [begin, end] period.
+
+    The period is walked in windows of ``CLOUDKITTY_REPORTING_FETCH_WINDOW``
+    days, and each window is aggregated before the next one is fetched, so
+    memory usage does not grow with the length of the period.
+
+    Returns the aggregator, the name and the step of the finest resolution
+    (hour, day or week) keeping the number of points under
+    ``CLOUDKITTY_REPORTING_MAX_POINTS``.
+    """
+    days = getattr(settings, 'CLOUDKITTY_REPORTING_FETCH_WINDOW', 7)
+    max_points = getattr(settings, 'CLOUDKITTY_REPORTING_MAX_POINTS', 5000)
+    aggregator = DataframeAggregator()
+    for window_begin, window_end in _iter_windows(begin, end, days):
+        aggregator.add(client.storage.get_dataframes(
+            begin=window_begin, end=window_end, tenant_id=tenant_id))
+    granularity, step = aggregator.choose_resolution(max_points)
+    return aggregator, granularity, step
+
+
+def _get_this_month(client, begin, end, tenant_id):
+    """Returns the downsampled data of the period and its resolution."""
+    aggregator, granularity, step = _aggregate_period(
+        client, begin, end, tenant_id)
+    return aggregator.result(step=step), granularity
+
+
+def _get_period(form, today, request=None):
+    """Returns the (begin, end) period selected in the date form.
+
+    The current month is used if the form is not filled in or invalid.
+    Errors are reported to the user if ``request`` is given.
+    """
+    def error(msg):
+        if request is not None:
+            messages.error(request, msg)
+
+    day_end = calendar.monthrange(today.year, today.month)[1]
+    month_begin = "%4d-%02d-01T00:00:00" % (today.year, today.month)
+    month_end = "%4d-%02d-%02dT23:59:59" % (today.year, today.month, day_end)
+
+    if form.is_valid():
+        start = form.cleaned_data['start']
+        end = form.cleaned_data['end']
+        begin = "%4d-%02d-%02dT00:00:00" % (start.year, start.month,
+                                            start.day)
+        end = "%4d-%02d-%02dT23:59:59" % (end.year, end.month, end.day)
+        if end < begin:
+            error(_("Invalid time period. The end date should be more "
+                    "recent than the start date. Setting the end as today."))
+            end = month_end
+        elif start > today.date():
+            error(_("Invalid time period. You are requesting data from the "
+                    "future which may not exist."))
+        return begin, end
+
+    if form.is_bound:
+        error(_("Invalid date format: Using this month as default."))
+    return month_begin, month_end
+
+
+@cache_control(private=True,
+               max_age=getattr(settings, 'CLOUDKITTY_REPORTING_DATA_MAX_AGE',
+                               300))
+@gzip_page
+def data(request):
+    """Returns the reporting series of the period in JSON."""
+    form = forms.DateForm(request.GET)
+    begin, end = _get_period(form, datetime.datetime.today())
+    client = api.cloudkittyclient(request)
+    aggregator, granularity, step = _aggregate_period(
+        client, begin, end, request.user.tenant_id)
+    series = aggregator.series(step=step)
+    series['granularity'] = granularity
+    return http.JsonResponse(series)
+
+
 class CostRepartitionTab(tabs.Tab):
     name = "This month"
     slug = "this_month"
     template_name = 'project/reporting/this_month.html'
 
     def get_context_data(self, request, **kwargs):
-        today = datetime.datetime.today()
-        day_start, day_end = calendar.monthrange(today.year, today.month)
-      
         form = self.get_form()
-        
-    
-        if form.is_valid():
-            #set values to be from datepicker form
-            start = form.cleaned_data['start']
-            end = form.cleaned_data['end']
-            begin = "%4d-%02d-%02dT00:00:00" % (start.year, start.month, start.day)             
-            end = "%4d-%02d-%02dT23:59:59" % (end.year, end.month, end.day)
-
-            if end <  begin :
-                messages.error(self.request,
-                                _("Invalid time period. The end date should be "
-                                "more recent than the start date. Setting the end as today."))    
-                      
-                end = "%4d-%02d-%02dT23:59:59" % (today.year, today.month, day_end)
-
-            elif start > today.date():
-                messages.error(self.request,
-                               _("Invalid time period. You are requesting "
-                                 "data from the future which may not exist."))
-           
-        elif form.is_bound: #when the form is invalid
-            messages.error(self.request,
-                               _("Invalid date format: "
-                                "Using this month as default."))
-            
-            begin = "%4d-%02d-%02dT00:00:00" % (today.year, today.month, day_start)
-            end = "%4d-%02d-%02dT23:59:59" % (today.year, today.month, day_end)
-        
-                          
-        else: #set default date values (before form is filled in)
-            begin = "%4d-%02d-%02dT00:00:00" % (today.year, today.month, day_start)
-            end = "%4d-%02d-%02dT23:59:59" % (today.year, today.month, day_end)         
-
-        client = api.cloudkittyclient(request)
-        data = client.storage.get_dataframes(
-            begin=begin, end=end, tenant_id=request.user.tenant_id)
-        parsed_data = _do_this_month(data)
-        return {'repartition_data': parsed_data,
-                'form': form}
+        # Only report errors, the data is fetched from the data view
+        _get_period(form, datetime.datetime.today(), request=request)
+        # The data view is cached by the browser, scope its URL to the
+        # project so switching projects does not serve stale series
+        params = {'tenant_id': request.user.tenant_id}
+        if form.is_bound:
+            params.update(form.data.items())
+        data_url = "%s?%s" % (reverse('horizon:project:reporting:data'),
+                              parse.urlencode(params))
+        return {'form': form, 'data_url': data_url}
 
     @property
     def today(self):
@@ -140,7 +379,6 @@ class CostRepartitionTab(tabs.Tab):
         return datetime.date(self.today.year, self.today.month, 1)
 
     def init_form(self):
-        print("ENTERS INIT FORM")
         self.start = self.first_day
         self.end = self.today.date()
 
@@ -154,7 +392,6 @@ class CostRepartitionTab(tabs.Tab):
             if start and end:
                 # bound form
                 self.form = forms.DateForm({'start': start, 'end': end})
-            
             else:
                 # non-bound form
                 init = self.init_form()
@@ -167,8 +404,6 @@ class CostRepartitionTab(tabs.Tab):
         return self.form
 
 
-
-
 class ReportingTabs(tabs.TabGroup):
     slug = "reporting_tabs"
     tabs = (CostRepartitionTab, )
@@ -177,4 +412,4 @@ class ReportingTabs(tabs.TabGroup):
 
 class IndexView(tabs.TabbedTableView):
     tab_group_class = ReportingTabs
-    template_name = 'project/reporting/index.html'
\ No newline at end of file
+    template_name = 'project/reporting/index.html'
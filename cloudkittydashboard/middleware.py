@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+import cProfile
+import ipaddress
+import time
+
+from django.conf import settings
+from django import http
+
+from cloudkittydashboard.api import metrics
+from cloudkittydashboard import profiling
+
+
+class ServerTimingMiddleware(object):
+    """Expose the CloudKitty API calls made while serving a request.
+
+    The calls are added to the ``Server-Timing`` header of the response. If
+    ``CLOUDKITTY_METRICS_PATH`` is set, the metrics of the process are
+    served on this path in the Prometheus text format, to the clients of the
+    ``CLOUDKITTY_METRICS_ALLOWED_NETWORKS`` networks only.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.metrics_path = getattr(settings, 'CLOUDKITTY_METRICS_PATH', None)
+        self.metrics_networks = [
+            ipaddress.ip_network(network) for network in getattr(
+                settings, 'CLOUDKITTY_METRICS_ALLOWED_NETWORKS',
+                ('127.0.0.0/8', '::1/128'))]
+
+    def _metrics_allowed(self, request):
+        try:
+            address = ipaddress.ip_address(request.META.get('REMOTE_ADDR'))
+        except ValueError:
+            return False
+        return any(address in network for network in self.metrics_networks)
+
+    def __call__(self, request):
+        if self.metrics_path and request.path == self.metrics_path:
+            if not self._metrics_allowed(request):
+                return http.HttpResponseForbidden()
+            return http.HttpResponse(
+                metrics.registry.render_prometheus(),
+                content_type='text/plain; version=0.0.4; charset=utf-8')
+
+        response = self.get_response(request)
+        timings = request.__dict__.get('_cloudkitty_timings')
+        if timings:
+            value = metrics.server_timing(timings)
+            if response.has_header('Server-Timing'):
+                value = '%s, %s' % (response['Server-Timing'], value)
+            response['Server-Timing'] = value
+        return response
+
+
+class ProfilingMiddleware(object):
+    """Profile the views of the dashboard.
+
+    Requests made by administrators with the ``X-CloudKitty-Profile`` header
+    are profiled with :mod:`cProfile`. The stacks of the requests running for
+    more than ``CLOUDKITTY_PROFILING_BUDGET`` seconds are sampled. The top
+    functions of the profiles are kept in :data:`profiling.store` and
+    displayed by the "Profiling" admin panel.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = 'HTTP_' + getattr(
+            settings, 'CLOUDKITTY_PROFILING_HEADER',
+            'X-CloudKitty-Profile').upper().replace('-', '_')
+        self.top = getattr(settings, 'CLOUDKITTY_PROFILING_TOP', 20)
+        budget = getattr(settings, 'CLOUDKITTY_PROFILING_BUDGET', 2.0)
+        self.sampler = None
+        if budget is not None:
+            self.sampler = profiling.Sampler(
+                budget,
+                getattr(settings, 'CLOUDKITTY_PROFILING_INTERVAL', 0.01))
+
+    def _profile_requested(self, request):
+        if self.header not in request.META:
+            return False
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return False
+        return user.is_superuser
+
+    def __call__(self, request):
+        request._cloudkitty_profiling_start = time.monotonic()
+        if self._profile_requested(request):
+            return self._profile(request)
+        try:
+            return self.get_response(request)
+        finally:
+            samples = request.__dict__.get('_cloudkitty_profiling_samples')
+            if samples is not None:
+                self.sampler.unregister()
+                self._record_samples(request, samples)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'view_class', view_func)
+        if not view.__module__.startswith('cloudkittydashboard.'):
+            return None
+        request._cloudkitty_profiling_view = '%s.%s' % (
+            view.__module__, view.__qualname__)
+        profiled = request.__dict__.get('_cloudkitty_profiling_profiled')
+        if self.sampler is not None and not profiled:
+            request._cloudkitty_profiling_samples = self.sampler.register(
+                request._cloudkitty_profiling_start)
+        return None
+
+    @staticmethod
+    def _duration(request):
+        return time.monotonic() - request._cloudkitty_profiling_start
+
+    def _profile(self, request):
+        request._cloudkitty_profiling_profiled = True
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return self.get_response(request)
+        finally:
+            profile.disable()
+            view = request.__dict__.get('_cloudkitty_profiling_view')
+            if view is not None:
+                profiling.store.add(
+                    view, request.path, 'cprofile', self._duration(request),
+                    profiling.cprofile_functions(profile, self.top))
+
+    def _record_samples(self, request, samples):
+        if samples['count']:
+            profiling.store.add(
+                request._cloudkitty_profiling_view, request.path, 'sampling',
+                self._duration(request),
+                self.sampler.functions(samples, self.top))
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+import collections
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+
+def _function_name(filename, lineno, name):
+    if filename == '~':
+        # Built-in functions
+        return name
+    return '%s:%d(%s)' % (_short_path(filename), lineno, name)
+
+
+def _short_path(filename):
+    for path in sorted(sys.path, key=len, reverse=True):
+        if path and filename.startswith(path + os.sep):
+            return filename[len(path) + 1:]
+    return filename
+
+
+def _top(functions, top):
+    functions.sort(key=lambda f: (f['self'], f['cumulative']), reverse=True)
+    return functions[:top]
+
+
+def cprofile_functions(profile, top):
+    """Return the ``top`` functions with the highest self time.
+
+    :param profile: A disabled :class:`cProfile.Profile`.
+    """
+    functions = [{
+        'name': _function_name(*func),
+        'calls': calls,
+        'self': self_time,
+        'cumulative': cumulative,
+    } for func, (_, calls, self_time, cumulative, _) in
+        pstats.Stats(profile).stats.items()]
+    return _top(functions, top)
+
+
+class ProfileStore(object):
+    """Bounded ring buffer of the profiles of the process."""
+
+    def __init__(self, max_size=100):
+        self._profiles = collections.deque(maxlen=max_size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, view, path, mode, duration, functions):
+        profile = {
+            'id': str(next(self._ids)),
+            'time': time.time(),
+            'view': view,
+            'path': path,
+            'mode': mode,
+            'duration': duration,
+            'functions': functions,
+        }
+        with self._lock:
+            self._profiles.appendleft(profile)
+        return profile
+
+    def list(self):
+        """Return the profiles, most recent first."""
+        with self._lock:
+            return list(self._profiles)
+
+    def get(self, profile_id):
+        with self._lock:
+            for profile in self._profiles:
+                if profile['id'] == profile_id:
+                    return profile
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+
+class Sampler(object):
+    """Sample the stacks of the threads serving slow requests.
+
+    A single thread wakes up every ``interval`` seconds and records the
+    stack of each registered thread running for more than ``budget``
+    seconds. Requests within their budget only cost a registration.
+    """
+
+    def __init__(self, budget, interval=0.01):
+        self.budget = budget
+        self.interval = interval
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self, start):
+        """Register the current thread, started at ``start``."""
+        samples = {'count': 0, 'self': collections.Counter(),
+                   'cumulative': collections.Counter()}
+        with self._lock:
+            self._threads[threading.get_ident()] = (start, samples)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='cloudkitty-profiling-sampler',
+                    daemon=True)
+                self._thread.start()
+        return samples
+
+    def unregister(self):
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+
+    def _sample(self, now):
+        # The lock is held while sampling, so that the samples of a thread
+        # are complete once it is unregistered.
+        with self._lock:
+            threads = [(ident, samples)
+                       for ident, (start, samples) in self._threads.items()
+                       if now - start > self.budget]
+            if not threads:
+                return
+            frames = sys._current_frames()
+            for ident, samples in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self._add_sample(samples, frame)
+
+    @staticmethod
+    def _add_sample(samples, frame):
+        samples['count'] += 1
+        code = frame.f_code
+        samples['self'][
+            (code.co_filename, code.co_firstlineno, code.co_name)] += 1
+        seen = set()
+        while frame is not None:
+            code = frame.f_code
+            func = (code.co_filename, code.co_firstlineno, code.co_name)
+            if func not in seen:
+                seen.add(func)
+                samples['cumulative'][func] += 1
+            frame = frame.f_back
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self._sample(time.monotonic())
+
+    def functions(self, samples, top):
+        """Return the ``top`` functions sampled the most often."""
+        functions = [{
+            'name': _function_name(*func),
+            'calls': None,
+            'self': samples['self'][func] * self.interval,
+            'cumulative': count * self.interval,
+        } for func, count in samples['cumulative'].items()]
+        return _top(functions, top)
+
+
+store = ProfileStore(
+    getattr(settings, 'CLOUDKITTY_PROFILING_BUFFER_SIZE', 100))
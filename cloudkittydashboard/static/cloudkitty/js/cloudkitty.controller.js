@@ -9,36 +9,95 @@
     '$scope',
     'horizon.framework.widgets.wizard.events',
     '$http',
+    '$q',
+    '$timeout',
     '$window'
   ];
 
-  function CloudkittyStepController($scope, wizardEvents, $http, $window) {
+  function CloudkittyStepController($scope, wizardEvents, $http, $q,
+                                    $timeout, $window) {
 
-    var onSwitch = $scope.$on(wizardEvents.ON_SWITCH, function(evt, args) {
+    // Delay (ms) without change before quoting
+    var DEBOUNCE_DELAY = 300;
+    // Maximum number of flavors quoted at once, see
+    // CLOUDKITTY_QUOTE_BATCH_MAX_SIZE
+    var MAX_FLAVORS = 100;
+    var pending = null;
+    var canceler = null;
+    var lastQuote = null;
 
-      if(!$scope.model.newInstanceSpec.flavor) return false;
+    $scope.flavorPrices = [];
 
-      var disk_total = $scope.model.newInstanceSpec.flavor.ephemeral + $scope.model.newInstanceSpec.flavor.disk;
+    function buildSpec(flavor) {
+      var spec = $scope.model.newInstanceSpec;
+      var disk_total = flavor.ephemeral + flavor.disk;
 
       var desc_form = {
-        'flavor_name': $scope.model.newInstanceSpec.flavor.name,
-        'flavor_id': $scope.model.newInstanceSpec.flavor.id,
-        'vcpus': $scope.model.newInstanceSpec.flavor.vcpus,
-        'disk': $scope.model.newInstanceSpec.flavor.disk,
-        'ephemeral': $scope.model.newInstanceSpec.flavor.ephemeral,
+        'flavor_name': flavor.name,
+        'flavor_id': flavor.id,
+        'vcpus': flavor.vcpus,
+        'disk': flavor.disk,
+        'ephemeral': flavor.ephemeral,
         'disk_total': disk_total,
         'disk_total_display': disk_total,
-        'ram': $scope.model.newInstanceSpec.flavor.ram,
-        'source_type': $scope.model.newInstanceSpec.source_type.type,
-        'source_val': $scope.model.newInstanceSpec.source[0].id,
-        'image_id': $scope.model.newInstanceSpec.source[0].id,
+        'ram': flavor.ram,
+        'source_type': spec.source_type.type,
+        'source_val': spec.source[0].id,
+        'image_id': spec.source[0].id,
       }
 
-      var form_data = [{"desc": desc_form, "volume": $scope.model.newInstanceSpec.instance_count}];
+      return [{"desc": desc_form, "volume": spec.instance_count}];
+    }
+
+    /*
+     Quotes every flavor with a single request, once the spec did not change
+     for DEBOUNCE_DELAY ms.
+     */
+    function quote(flavors, selected) {
+      var specs = flavors.map(buildSpec);
+      var serialized = angular.toJson(specs);
+      // Cancel the quote of an intermediate spec, even when going back to
+      // the last quoted one
+      $timeout.cancel(pending);
+      if (serialized === lastQuote) return;
+
+      pending = $timeout(function() {
+        // Only the prices of the last spec are relevant
+        if (canceler) canceler.resolve();
+        canceler = $q.defer();
+        lastQuote = serialized;
+        $http.post($window.WEBROOT + 'project/rating/quote/batch', specs,
+                   {timeout: canceler.promise}).then(function(res) {
+          $scope.flavorPrices = flavors.map(function(flavor, i) {
+            return {
+              name: flavor.name,
+              price: res.data[i],
+              selected: flavor.id === selected.id
+            };
+          });
+          $scope.price = res.data[flavors.indexOf(selected)];
+        }, function(res) {
+          if (res.status !== -1) lastQuote = null;
+        });
+      }, DEBOUNCE_DELAY);
+    }
+
+    var onSwitch = $scope.$on(wizardEvents.ON_SWITCH, function(evt, args) {
 
-      $http.post($window.WEBROOT + 'project/rating/quote', form_data).then(function(res, status) {
-        $scope.price = res.data;
+      var selected = $scope.model.newInstanceSpec.flavor;
+      if(!selected) return false;
+
+      var flavors = ($scope.model.flavors || []).filter(function(flavor) {
+        return flavor.id !== selected.id;
       });
+      flavors.unshift(selected);
+
+      quote(flavors.slice(0, MAX_FLAVORS), selected);
+    });
+
+    $scope.$on('$destroy', function() {
+      $timeout.cancel(pending);
+      if (canceler) canceler.resolve();
     });
   }
 
@@ -0,0 +1,52 @@
+/*
+    Licensed under the Apache License, Version 2.0 (the "License"); you may
+    not use this file except in compliance with the License. You may obtain
+    a copy of the License at
+
+         http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+    License for the specific language governing permissions and limitations
+    under the License.
+*/
+
+/*
+ Polls the progress of a hashmap import while the import form is submitted,
+ see ImportProgressView.
+ */
+hashmapImport = {
+    poll_delay: 1000, // Delay (ms) between two progress requests
+
+    init: function() {
+        var scope = this;
+        var progress = $('#hashmap_import_progress');
+        progress.closest('form').on('submit', function() {
+            scope.poll(progress);
+        });
+    },
+
+    poll: function(progress) {
+        var scope = this;
+        setTimeout(function() {
+            // The modal is closed once the import is done
+            if (!$.contains(document, progress[0])) {
+                return;
+            }
+            $.getJSON(progress.data('url'), function(status) {
+                if (status.total) {
+                    progress.text(progress.data('label')
+                        .replace('%(done)s', status.done)
+                        .replace('%(total)s', status.total)
+                        .replace('%(errors)s', status.errors));
+                }
+                if (!status.total || status.done < status.total) {
+                    scope.poll(progress);
+                }
+            });
+        }, this.poll_delay);
+    }
+};
+
+hashmapImport.init();
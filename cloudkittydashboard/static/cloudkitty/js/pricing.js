@@ -16,6 +16,10 @@
 
 pricing = {
     is_price: false, // Is this a price display ?
+    debounce_delay: 300, // Delay (ms) without change before quoting
+    _timer: null, // Pending quote
+    _xhr: null, // Quote request in flight
+    _last_quote: null, // Serialized data of the last quote
 
     init: function() {
         this._attachInputHandlers(); // handler
@@ -84,13 +88,36 @@ pricing = {
             var url_data = [
                 '/dashboard/project/rating/quote',
                 '/project/rating/quote']
-            this.sendPost(form_data, url_data);
+            this.schedulePost(form_data, url_data);
         }
     },
 
+    /*
+     Quotes the form once it did not change for debounce_delay ms, so that
+     quickly changing the flavor or the count only triggers a single request.
+     */
+    schedulePost: function(form_data, url_data) {
+        var scope = this;
+        var serialized = JSON.stringify(form_data);
+        // Cancel the quote of an intermediate form, even when going back to
+        // the last quoted one
+        clearTimeout(this._timer);
+        if (serialized === this._last_quote) {
+            return;
+        }
+        this._timer = setTimeout(function() {
+            scope._last_quote = serialized;
+            scope.sendPost(form_data, url_data);
+        }, this.debounce_delay);
+    },
+
     sendPost: function(form_data, url_data) {
         var url = url_data.shift();
-        $.ajax({
+        // Only the price of the last form data is relevant
+        if (this._xhr) {
+            this._xhr.abort();
+        }
+        this._xhr = $.ajax({
             type: "post",  // send POST data
             url: url,
             dataType: 'json',
@@ -99,9 +126,15 @@ pricing = {
             success: function (data) {
                 $("#price").text(data);
             },
-            error: function () {
-                if (url_data)
+            error: function (xhr, textStatus) {
+                if (textStatus === 'abort') {
+                    return;
+                }
+                if (url_data.length) {
                     pricing.sendPost(form_data, url_data);
+                } else {
+                    pricing._last_quote = null;
+                }
             },
             beforeSend: function(xhr, settings){
                 $.ajaxSettings.beforeSend(xhr, settings);
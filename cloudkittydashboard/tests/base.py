@@ -15,9 +15,23 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import os
+
+import django
 from oslotest import base
 
 
 class TestCase(base.BaseTestCase):
 
     """Test case base class for all unit tests."""
+
+
+class DashboardTestCase(TestCase):
+
+    """Test case base class for tests importing the dashboard modules."""
+
+    def setUp(self):
+        super(DashboardTestCase, self).setUp()
+        os.environ['DJANGO_SETTINGS_MODULE'] = 'openstack_dashboard.settings'
+        django.setup()
+        os.environ.pop('DJANGO_SETTINGS_MODULE')
@@ -0,0 +1,40 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+"""Benchmarks of the data processing of the dashboard.
+
+The benchmarks follow the conventions of asv: classes with ``time_*``
+methods, parametrized by ``params``. Run them with
+``python -m cloudkittydashboard.tests.benchmarks``.
+"""
+import os
+
+import django
+from django.test import utils as test_utils
+
+_settings = None
+
+
+def setup_django():
+    """Configure Django once, with a local memory cache."""
+    global _settings
+    if _settings is not None:
+        return
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE',
+                          'openstack_dashboard.settings')
+    django.setup()
+    _settings = test_utils.override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    })
+    _settings.enable()
@@ -0,0 +1,177 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+"""Run the benchmarks and compare them with the stored baseline."""
+import argparse
+import functools
+import itertools
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import timeit
+
+from cloudkittydashboard.tests import benchmarks
+from cloudkittydashboard.tests.benchmarks import cases
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEFAULT_SCALES = '1k,10k,100k'
+
+
+def _combinations(params):
+    if params and isinstance(params[0], list):
+        return list(itertools.product(*params))
+    return [(param,) for param in params]
+
+
+def get_cases(scales, pattern=None):
+    """Yield the ``(name, class, method, params)`` of the benchmarks."""
+    for cls_name, cls in sorted(vars(cases).items()):
+        if not isinstance(cls, type) or cls is cases.Benchmark:
+            continue
+        if not issubclass(cls, cases.Benchmark):
+            continue
+        methods = sorted(m for m in dir(cls)
+                         if m.startswith(('time_', 'track_')))
+        for method in methods:
+            for params in _combinations(cls.params):
+                if params[0] not in scales:
+                    continue
+                name = '%s.%s(%s)' % (cls_name, method, ', '.join(params))
+                if pattern and not re.search(pattern, name):
+                    continue
+                yield name, cls, method, params
+
+
+def measure(cls, method, params, repeat):
+    """Return the per-call times of ``repeat`` runs of a benchmark.
+
+    ``track_*`` benchmarks are run once, and return the tracked value.
+    """
+    bench = cls()
+    bench.setup(*params)
+    try:
+        func = functools.partial(getattr(bench, method), *params)
+        if method.startswith('track_'):
+            return [func()]
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        return [t / number for t in timer.repeat(repeat, number)]
+    finally:
+        bench.teardown(*params)
+
+
+def is_regression(value, reference, method, tolerance, floor):
+    """Whether ``value`` regressed from its baseline ``reference``.
+
+    Timings of tiny benchmarks are dominated by noise: a slowdown of less
+    than ``floor`` seconds is never reported.
+    """
+    if not reference:
+        return False
+    slack = reference * tolerance
+    if method.startswith('time_'):
+        slack = max(slack, floor)
+    return value > reference + slack
+
+
+def _format(value, method='time_'):
+    if method.startswith('track_'):
+        return '%.3gMB' % (value / 1e6)
+    for unit, factor in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if value * factor >= 1:
+            return '%.3g%s' % (value * factor, unit)
+    return '%.3gns' % (value * 1e9)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m cloudkittydashboard.tests.benchmarks',
+        description=__doc__)
+    parser.add_argument('--scales', default=DEFAULT_SCALES,
+                        help='Comma-separated dataset sizes, among %s '
+                             '(default: %s)' % (', '.join(cases.SCALES),
+                                                DEFAULT_SCALES))
+    parser.add_argument('--filter', help='Only run the benchmarks whose name '
+                                         'matches this regular expression')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='Baseline file (default: %(default)s)')
+    parser.add_argument('--save', action='store_true',
+                        help='Store the results in the baseline file')
+    parser.add_argument('--tolerance', type=float, default=1.0,
+                        help='Slowdown ratio reported as a regression '
+                             '(default: %(default)s)')
+    parser.add_argument('--floor', type=float, default=0.001,
+                        help='Slowdown in seconds under which timings are '
+                             'not reported as a regression '
+                             '(default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    benchmarks.setup_django()
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    def run(cases):
+        regressions = []
+        for case in cases:
+            name, cls, method, params = case
+            times = measure(cls, method, params, args.repeat)
+            # The median is less sensitive than the minimum to a single lucky
+            # or unlucky run
+            results[name] = median = statistics.median(times)
+            reference = baseline.get(name)
+            ratio = median / reference if reference else None
+            if is_regression(median, reference, method, args.tolerance,
+                             args.floor):
+                regressions.append(case)
+            print('%-60s %10s %10s %10s %7s' % (
+                name, _format(min(times), method), _format(median, method),
+                _format(reference, method) if reference else '-',
+                '%.2f' % ratio if ratio is not None else '-'))
+            sys.stdout.flush()
+        return regressions
+
+    results = {}
+    print('%-60s %10s %10s %10s %7s' % ('benchmark', 'min', 'median',
+                                        'baseline', 'ratio'))
+    regressions = run(get_cases(args.scales.split(','), args.filter))
+    if regressions and not args.save:
+        # Timings drift with the load of the machine: only report the
+        # regressions measured twice
+        print('\nMeasuring %d possible regression(s) again:'
+              % len(regressions))
+        regressions = run(regressions)
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'machine': platform.machine(),
+                       'results': dict(sorted(baseline.items()))},
+                      f, indent=2)
+            f.write('\n')
+    elif regressions:
+        print('\n%d regression(s) over %d%%:' % (len(regressions),
+                                                 args.tolerance * 100))
+        for name, _, _, _ in regressions:
+            print('  %s' % name)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
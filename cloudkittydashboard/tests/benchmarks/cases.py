@@ -0,0 +1,336 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+import collections.abc
+import json
+import tracemalloc
+from unittest import mock
+
+from django.test import utils as test_utils
+
+from cloudkittydashboard.tests import benchmarks
+from cloudkittydashboard.tests.benchmarks import datasets
+from cloudkittydashboard.tests.benchmarks import fakes
+
+SCALES = list(datasets.SCALES)
+
+
+class Request(object):
+    """Minimal request, new for each call so that no cache is shared."""
+
+    GET = {}
+    COOKIES = {}
+    method = 'POST'
+
+    def __init__(self, body=None):
+        self.body = body
+        self.session = {}
+        self.user = mock.Mock(services_region='RegionOne',
+                              tenant_id='project-0', project_id='project-0')
+
+    def is_ajax(self):
+        return True
+
+
+class Benchmark(object):
+    params = SCALES
+    param_names = ['scale']
+
+    def setup(self, scale):
+        benchmarks.setup_django()
+        self._patchers = []
+        self.size = datasets.SCALES[scale]
+
+    def teardown(self, scale):
+        for patcher in reversed(self._patchers):
+            patcher.stop()
+
+    def patch(self, patcher):
+        self._patchers.append(patcher)
+        return patcher.start()
+
+
+class DoThisMonth(Benchmark):
+    """Aggregation of the dataframes of the reporting panel."""
+
+    def setup(self, scale):
+        super(DoThisMonth, self).setup(scale)
+        from cloudkittydashboard.dashboards.project.reporting import views
+        self.views = views
+        self.data = datasets.dataframes(self.size)
+
+    def time_do_this_month(self, scale):
+        self.views._do_this_month(self.data)
+
+
+class Identify(Benchmark):
+
+    def setup(self, scale):
+        super(Identify, self).setup(scale)
+        from cloudkittydashboard.api import cloudkitty
+        self.api = cloudkitty
+        self.summary = datasets.rating_summary(self.size)
+
+    # identify replaces the items of the lists in place, a new list is given
+    # at each call
+    def time_identify(self, scale):
+        self.api.identify(list(self.summary), key='tenant_id')
+
+    def time_identify_name(self, scale):
+        self.api.identify(list(self.summary), key='tenant_id', name=True)
+
+
+class SlotsRow(collections.abc.Mapping):
+    """Prototype of a compact table row, with a slot for each key.
+
+    Subclasses are created by :func:`make_slots_rows`. Rows use less than
+    half of the memory of a dict, but are slower to build and to read from
+    horizon columns, so the tables keep using dicts.
+    """
+
+    __slots__ = ()
+    _fields = ()
+
+    def __init__(self, data):
+        for key, value in data.items():
+            object.__setattr__(self, key, value)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __iter__(self):
+        return (key for key in self._fields if hasattr(self, key))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def make_slots_rows(items, name='Row'):
+    fields = tuple(dict.fromkeys(key for item in items for key in item))
+    cls = type(name, (SlotsRow,), {'__slots__': fields, '_fields': fields})
+    return [cls(item) for item in items]
+
+
+class Rows(Benchmark):
+    """TemplatizableDict rows, compared with the SlotsRow prototype.
+
+    The ``track_*`` benchmarks return the memory used by the rows, in bytes.
+    """
+
+    params = [SCALES, ['dict', 'row']]
+    param_names = ['scale', 'kind']
+
+    def setup(self, scale, kind):
+        super(Rows, self).setup(scale)
+        from horizon import tables
+
+        from cloudkittydashboard import utils
+        self.utils = utils
+        self.columns = [tables.Column(key)
+                        for key in ('id', 'cost', 'group_id')]
+        self.mappings = datasets.mappings(self.size)
+        for mapping in self.mappings:
+            mapping['id'] = mapping['name'] = mapping['mapping_id']
+        self.rows = self._build(kind)
+
+    def teardown(self, scale, kind):
+        super(Rows, self).teardown(scale)
+
+    def _build(self, kind):
+        if kind == 'dict':
+            return [self.utils.TemplatizableDict(m) for m in self.mappings]
+        return make_slots_rows(self.mappings, 'MappingRow')
+
+    def time_build(self, scale, kind):
+        self._build(kind)
+
+    def time_attribute_access(self, scale, kind):
+        for row in self.rows:
+            row.id
+            row.cost
+            row.group_id
+
+    def time_item_access(self, scale, kind):
+        for row in self.rows:
+            row['id']
+            row.get('cost')
+            row.get('tenant_id')
+
+    # How horizon tables read the rows
+    def time_column(self, scale, kind):
+        for row in self.rows:
+            for column in self.columns:
+                column.get_raw_data(row)
+
+    def track_memory(self, scale, kind):
+        tracemalloc.start()
+        try:
+            rows = self._build(kind)  # noqa
+            size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        return size
+    track_memory.unit = 'bytes'
+
+
+class AddGroupname(Benchmark):
+    """Group names of the mappings of the hashmap panels."""
+
+    def setup(self, scale):
+        super(AddGroupname, self).setup(scale)
+        from cloudkittydashboard.dashboards.admin.hashmap import tables
+        self.tables = tables
+        config = datasets.hashmap(n_services=1, n_mappings=10, n_groups=100)
+        self.patch(mock.patch.object(
+            tables.api, 'cloudkittyclient',
+            return_value=fakes.FakeClient(hashmap=config)))
+        self.mappings = datasets.mappings(self.size, n_groups=100)
+
+    def time_add_groupname(self, scale):
+        self.tables.add_groupname(Request(), self.mappings)
+
+
+class AdminSummary(Benchmark):
+    """Totals and formatting of the admin rating summary."""
+
+    def setup(self, scale):
+        super(AdminSummary, self).setup(scale)
+        from cloudkittydashboard.dashboards.admin.summary import views
+        from cloudkittydashboard import utils
+        self.views = views
+        self.utils = utils
+        self.summary = datasets.rating_summary(self.size)
+        self.patch(mock.patch.object(views.api, 'get_rating_summary',
+                                     return_value=self.summary))
+        self.patch(mock.patch.object(
+            views.api, 'resolve_project_names',
+            side_effect=lambda request, ids: {i: i[-8:] for i in ids}))
+        self.rates = [utils.to_decimal(item['rate'])
+                      for item in self.summary]
+
+    def _get_data(self, **params):
+        view = self.views.IndexView()
+        view.request = Request()
+        view.request.GET = params
+        view.kwargs = {}
+        return view.get_data()
+
+    def time_index(self, scale):
+        self._get_data()
+
+    def time_index_top(self, scale):
+        self._get_data(top='10')
+
+    def time_index_by_name(self, scale):
+        self._get_data(sort='name')
+
+    def time_sum_rates(self, scale):
+        self.utils.sum_rates(self.summary)
+
+    def time_format_rates(self, scale):
+        formatter = self.utils.rate_formatter()
+        for rate in self.rates:
+            formatter(rate)
+
+
+def legacy_summarize(items, total_row, prefix, postfix):
+    """The float sum and formatting loop replaced by utils.summarize."""
+    from cloudkittydashboard import utils
+    total_row['rate'] = sum([float(item['rate']) for item in items])
+    items.append(total_row)
+    for item in items:
+        item['rate'] = utils.formatRate(item['rate'], prefix, postfix)
+    return items
+
+
+class Summarize(Benchmark):
+    """utils.summarize, compared with the code it replaced.
+
+    Every row is formatted, as when a whole table is rendered.
+    """
+
+    params = [SCALES, ['legacy', 'decimal']]
+    param_names = ['scale', 'kind']
+
+    def setup(self, scale, kind):
+        super(Summarize, self).setup(scale)
+        from cloudkittydashboard import utils
+        self.utils = utils
+        self.summary = datasets.project_summary(self.size)
+
+    def teardown(self, scale, kind):
+        super(Summarize, self).teardown(scale)
+
+    def time_summarize(self, scale, kind):
+        # Both implementations update the rows in place
+        items = [dict(item) for item in self.summary]
+        if kind == 'legacy':
+            legacy_summarize(items, {'type': 'TOTAL'}, None, None)
+            return
+        formatter = self.utils.rate_formatter()
+        for item in self.utils.summarize(items, {'type': 'TOTAL'}):
+            formatter(item['rate'])
+
+
+class ProjectSummary(Benchmark):
+    """Totals of the project rating panel."""
+
+    def setup(self, scale):
+        super(ProjectSummary, self).setup(scale)
+        from cloudkittydashboard.dashboards.project.rating import views
+        self.views = views
+        self.client = fakes.FakeClient(
+            summary=datasets.project_summary(self.size))
+        self.patch(mock.patch.object(views.api, 'cloudkittyclient',
+                                     return_value=self.client))
+
+    def time_index(self, scale):
+        view = self.views.IndexView()
+        view.request = Request()
+        view.get_data()
+
+
+class Quote(Benchmark):
+    """Quotations of the launch instance wizard.
+
+    The size is the number of resources of the quotation request.
+    """
+
+    params = [[s for s in SCALES if s != '1m'], ['api', 'local']]
+    param_names = ['scale', 'mode']
+
+    def setup(self, scale, mode):
+        super(Quote, self).setup(scale)
+        from cloudkittydashboard.api import cloudkitty
+        from cloudkittydashboard.dashboards.project.rating import views
+        self.views = views
+        self.settings = test_utils.override_settings(
+            CLOUDKITTY_QUOTE_CACHE_TTL=0,
+            CLOUDKITTY_LOCAL_QUOTATION=mode == 'local')
+        self.settings.enable()
+        client = fakes.FakeClient(hashmap=datasets.hashmap())
+        self.patch(mock.patch.object(cloudkitty, 'cloudkittyclient',
+                                     return_value=client))
+        self.body = json.dumps(datasets.quotation(self.size))
+        # Load the hashmap configuration once
+        price = json.loads(self.views.quote(Request(self.body)).content)
+        assert price > 0, 'Quotation failed'
+
+    def teardown(self, scale, mode):
+        super(Quote, self).teardown(scale)
+        self.settings.disable()
+
+    def time_quote(self, scale, mode):
+        self.views.quote(Request(self.body))
@@ -0,0 +1,169 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+"""Synthetic CloudKitty datasets.
+
+The generators are seeded, so that a given size always produces the same
+data. Payloads follow the format of the CloudKitty API.
+"""
+import datetime
+import random
+
+# Sizes of the datasets, in number of resources
+SCALES = {
+    '1k': 1000,
+    '10k': 10000,
+    '100k': 100000,
+    '1m': 1000000,
+}
+
+SERVICES = ('instance', 'volume.size', 'image.size', 'network.bw.in',
+            'network.bw.out', 'network.floating', 'ip.floating', 'radosgw')
+
+FLAVORS = ('m1.tiny', 'm1.small', 'm1.medium', 'm1.large', 'm1.xlarge')
+
+
+def dataframes(n_resources, n_frames=720, services=SERVICES, seed=42):
+    """Return a storage dataframes payload of ``n_resources`` resources.
+
+    Resources are spread over ``n_frames`` hourly frames.
+    """
+    rand = random.Random(seed)
+    start = datetime.datetime(2019, 3, 1)
+    n_frames = min(n_frames, n_resources) or 1
+    frames = []
+    for i in range(n_frames):
+        begin = start + datetime.timedelta(hours=i)
+        count = n_resources // n_frames + (i < n_resources % n_frames)
+        frames.append({
+            'begin': begin.strftime('%Y-%m-%dT%H:%M:%S'),
+            'end': (begin + datetime.timedelta(hours=1)).strftime(
+                '%Y-%m-%dT%H:%M:%S'),
+            'tenant_id': 'project-0',
+            'resources': [{
+                'service': rand.choice(services),
+                'rating': str(round(rand.uniform(0, 10), 4)),
+                'volume': '1',
+                'desc': {},
+            } for _ in range(count)],
+        })
+    return {'dataframes': frames}
+
+
+def project_ids(n_projects):
+    return ['%032x' % i for i in range(n_projects)]
+
+
+def rating_summary(n_projects, seed=42):
+    """Return the rating summary of ``n_projects`` projects."""
+    rand = random.Random(seed)
+    return [{'tenant_id': project_id,
+             'rate': str(round(rand.uniform(0, 10000), 4))}
+            for project_id in project_ids(n_projects)]
+
+
+def project_summary(n_rows, services=SERVICES, seed=42):
+    """Return ``n_rows`` summary rows, as used by the rating panels."""
+    rand = random.Random(seed)
+    return [{'type': services[i % len(services)], 'tenant_id': 'project-0',
+             'rate': round(rand.uniform(0, 100), 4)}
+            for i in range(n_rows)]
+
+
+def groups(n_groups):
+    return [{'group_id': 'group-%d' % i, 'name': 'Group %d' % i}
+            for i in range(n_groups)]
+
+
+def mappings(n_mappings, n_groups=10, field_id=None, service_id=None,
+             seed=42):
+    """Return ``n_mappings`` hashmap mappings, spread over groups."""
+    rand = random.Random(seed)
+    result = []
+    for i in range(n_mappings):
+        mapping = {
+            'mapping_id': 'mapping-%d' % i,
+            'field_id': field_id,
+            'service_id': service_id,
+            'group_id': 'group-%d' % (i % n_groups) if n_groups else None,
+            'tenant_id': None,
+            'type': 'rate' if i % 5 == 0 else 'flat',
+            'cost': str(round(rand.uniform(0, 1), 8)),
+            'value': '',
+        }
+        if field_id is not None:
+            mapping['value'] = (FLAVORS[i] if i < len(FLAVORS)
+                                else 'value-%d' % i)
+        result.append(mapping)
+    return result
+
+
+def hashmap(n_services=len(SERVICES), n_mappings=100, n_groups=10):
+    """Return a hashmap configuration.
+
+    Each service has a ``flavor_id`` field with ``n_mappings`` mappings, a
+    service mapping and a service threshold.
+    """
+    config = {'services': [], 'fields': [], 'mappings': [],
+              'thresholds': [], 'groups': groups(n_groups)}
+    for i, name in enumerate(SERVICES[:n_services]):
+        service_id = 'service-%d' % i
+        field_id = 'field-%d' % i
+        config['services'].append({'service_id': service_id, 'name': name})
+        config['fields'].append({'field_id': field_id,
+                                 'service_id': service_id,
+                                 'name': 'flavor_id'})
+        config['mappings'].extend(mappings(1, n_groups,
+                                           service_id=service_id))
+        field_mappings = mappings(n_mappings, n_groups, field_id=field_id)
+        for mapping in field_mappings:
+            mapping['mapping_id'] = '%s-%s' % (field_id,
+                                               mapping['mapping_id'])
+        config['mappings'].extend(field_mappings)
+        config['thresholds'].append({
+            'threshold_id': 'threshold-%d' % i, 'service_id': service_id,
+            'field_id': None, 'group_id': None, 'tenant_id': None,
+            'level': '10', 'type': 'rate', 'cost': '0.9'})
+    return config
+
+
+def quotation(n_resources):
+    """Return a quotation request of ``n_resources`` instances."""
+    return [{'service': 'instance',
+             'desc': {'flavor_id': FLAVORS[i % len(FLAVORS)],
+                      'image_id': 'image-%d' % (i % 7)},
+             'volume': '1'}
+            for i in range(n_resources)]
+
+
+def rating_matrix(n_projects, services=SERVICES, seed=42):
+    """Return the rating of each service of ``n_projects`` projects."""
+    rand = random.Random(seed)
+    return [{'project_id': project_id, 'type': service,
+             'rate': round(rand.uniform(0, 1000), 4),
+             'qty': round(rand.uniform(0, 100), 2)}
+            for project_id in project_ids(n_projects)
+            for service in services]
+
+
+def scripts(n_scripts):
+    """Return ``n_scripts`` pyscripts."""
+    data = 'import decimal\n\n\ndef rate(data):\n    return data\n'
+    return [{'script_id': 'script-%d' % i, 'name': 'script-%d' % i,
+             'data': data, 'checksum': '%040x' % i}
+            for i in range(n_scripts)]
+
+
+def metrics(services=SERVICES):
+    return [{'metric_id': service, 'unit': 'unit',
+             'metadata': ['flavor_id', 'image_id']}
+            for service in services]
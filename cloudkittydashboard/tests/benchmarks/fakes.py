@@ -0,0 +1,117 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+"""In-memory stand-in for cloudkittyclient, serving :mod:`datasets`."""
+from keystoneauth1 import exceptions
+
+
+def _filter(entries, **filters):
+    filters = {key: value for key, value in filters.items()
+               if value is not None}
+    return [entry for entry in entries
+            if all(entry.get(key) == value
+                   for key, value in filters.items())]
+
+
+def _get_one(entries, key, value):
+    for entry in entries:
+        if entry[key] == value:
+            return entry
+    raise exceptions.NotFound()
+
+
+class FakeHashmapManager(object):
+
+    def __init__(self, config):
+        self._config = config
+
+    def get_service(self, service_id=None):
+        if service_id is not None:
+            return _get_one(self._config['services'], 'service_id',
+                            service_id)
+        return {'services': self._config['services']}
+
+    def get_field(self, service_id=None, field_id=None):
+        if field_id is not None:
+            return _get_one(self._config['fields'], 'field_id', field_id)
+        return {'fields': _filter(self._config['fields'],
+                                  service_id=service_id)}
+
+    def get_mapping(self, service_id=None, field_id=None, group_id=None,
+                    mapping_id=None, tenant_id=None):
+        if mapping_id is not None:
+            return _get_one(self._config['mappings'], 'mapping_id',
+                            mapping_id)
+        return {'mappings': _filter(
+            self._config['mappings'], service_id=service_id,
+            field_id=field_id, group_id=group_id, tenant_id=tenant_id)}
+
+    def get_threshold(self, service_id=None, field_id=None, group_id=None,
+                      threshold_id=None, tenant_id=None):
+        if threshold_id is not None:
+            return _get_one(self._config['thresholds'], 'threshold_id',
+                            threshold_id)
+        return {'thresholds': _filter(
+            self._config['thresholds'], service_id=service_id,
+            field_id=field_id, group_id=group_id, tenant_id=tenant_id)}
+
+    def get_group(self, group_id=None):
+        if group_id is not None:
+            return _get_one(self._config['groups'], 'group_id', group_id)
+        return {'groups': self._config['groups']}
+
+
+class FakeRatingManager(object):
+
+    def __init__(self, hashmap, price=1.0):
+        self.hashmap = FakeHashmapManager(hashmap)
+        self._price = price
+
+    def get_module(self, module_id=None):
+        modules = [
+            {'module_id': 'hashmap', 'enabled': True, 'priority': 1,
+             'hot-config': True, 'description': 'HashMap rating module.'},
+            {'module_id': 'noop', 'enabled': False, 'priority': 1,
+             'hot-config': False, 'description': 'Dummy test module.'},
+        ]
+        if module_id is not None:
+            return _get_one(modules, 'module_id', module_id)
+        return {'modules': modules}
+
+    def get_quotation(self, res_data=None):
+        return self._price * len(res_data or ())
+
+
+class FakeSummaryManager(object):
+
+    def __init__(self, results):
+        self._results = results
+
+    def get_summary(self, offset=0, limit=None, response_format='object',
+                    **kwargs):
+        end = None if limit is None else offset + limit
+        return {'total': len(self._results),
+                'results': self._results[offset:end]}
+
+
+class FakeClient(object):
+    """Fake client serving a dataset.
+
+    :param hashmap: Hashmap configuration, see :func:`datasets.hashmap`.
+    :param summary: Results of the v2 summary, see
+                    :func:`datasets.project_summary`.
+    :param price: Price of a resource returned by the quotation API.
+    """
+
+    def __init__(self, hashmap=None, summary=None, price=1.0):
+        self.rating = FakeRatingManager(hashmap or {}, price)
+        self.summary = FakeSummaryManager(summary or [])
@@ -0,0 +1,186 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+"""Load the panels of a running Horizon and report their latency.
+
+The identifiers used in the URLs are the ones of the datasets of the fake
+CloudKitty API, see :mod:`server`.
+"""
+import argparse
+from collections import OrderedDict
+from concurrent import futures
+import json
+import math
+import threading
+import time
+
+import requests
+
+from cloudkittydashboard.tests.benchmarks import datasets
+
+PROJECT_ID = datasets.project_ids(1)[0]
+
+# View name -> (method, path, body)
+VIEWS = OrderedDict([
+    ('project:rating:index', ('GET', '/project/rating/', None)),
+    ('project:rating:quote', ('POST', '/project/rating/quote', [
+        {'desc': {'flavor_id': 'm1.small'}, 'volume': '1'}])),
+    ('project:rating:quote_batch', ('POST', '/project/rating/quote/batch', [
+        [{'desc': {'flavor_id': flavor}, 'volume': '1'}]
+        for flavor in datasets.FLAVORS])),
+    ('project:reporting:index', ('GET', '/project/reporting/', None)),
+    ('project:reporting:data', ('GET', '/project/reporting/data', None)),
+    ('admin:rating_summary:index', ('GET', '/admin/rating_summary/', None)),
+    ('admin:rating_summary:project_details',
+     ('GET', '/admin/rating_summary/%s/' % PROJECT_ID, None)),
+    ('admin:hashmap:index', ('GET', '/admin/hashmap/', None)),
+    ('admin:hashmap:service', ('GET', '/admin/hashmap/service/service-0/',
+                               None)),
+    ('admin:hashmap:field', ('GET', '/admin/hashmap/field/field-0/', None)),
+    ('admin:hashmap:group_details',
+     ('GET', '/admin/hashmap/group/group-0/details/', None)),
+    ('admin:pyscripts:index', ('GET', '/admin/pyscripts/', None)),
+    ('admin:pyscripts:script_details',
+     ('GET', '/admin/pyscripts/script-0/', None)),
+    ('admin:rating_modules:index', ('GET', '/admin/rating_modules/', None)),
+    ('admin:rating_modules:module_details',
+     ('GET', '/admin/rating_modules/hashmap/', None)),
+])
+
+
+def percentile(values, p):
+    """Return the ``p`` percentile of ``values``, by nearest rank."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(int(math.ceil(p / 100.0 * len(values))), 1)
+    return values[rank - 1]
+
+
+def login(url, username, password, domain=None, region=None, verify=True):
+    """Log in to Horizon and return the session cookies."""
+    session = requests.Session()
+    session.verify = verify
+    login_url = url + '/auth/login/'
+    session.get(login_url).raise_for_status()
+    data = {
+        'csrfmiddlewaretoken': session.cookies.get('csrftoken'),
+        'username': username,
+        'password': password,
+        'region': region or '',
+    }
+    if domain:
+        data['domain'] = domain
+    response = session.post(login_url, data=data,
+                            headers={'Referer': login_url})
+    response.raise_for_status()
+    if '/auth/login' in response.url:
+        raise RuntimeError('Unable to log in as %s' % username)
+    return session.cookies
+
+
+class Driver(object):
+    """Request views concurrently and record their latency."""
+
+    def __init__(self, url, cookies, verify=True):
+        self.url = url
+        self.cookies = cookies
+        self.verify = verify
+        self.results = OrderedDict()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.verify = self.verify
+            session.cookies.update(self.cookies)
+        return session
+
+    def request(self, name, method, path, body=None):
+        session = self._session()
+        headers = {'Content-Type': 'application/json',
+                   'X-Requested-With': 'XMLHttpRequest',
+                   'X-CSRFToken': session.cookies.get('csrftoken', ''),
+                   'Referer': self.url + path}
+        data = None if body is None else json.dumps(body)
+        start = time.perf_counter()
+        try:
+            response = session.request(method, self.url + path, data=data,
+                                       headers=headers,
+                                       allow_redirects=False)
+            failed = response.status_code >= 300
+        except requests.RequestException:
+            failed = True
+        duration = time.perf_counter() - start
+        with self._lock:
+            result = self.results.setdefault(name, {'times': [],
+                                                    'errors': 0})
+            result['times'].append(duration)
+            result['errors'] += int(failed)
+
+    def run(self, views, count, concurrency):
+        for name in views:
+            self.results[name] = {'times': [], 'errors': 0}
+        with futures.ThreadPoolExecutor(concurrency) as executor:
+            tasks = [executor.submit(self.request, name, *VIEWS[name])
+                     for _ in range(count) for name in views]
+            for task in tasks:
+                task.result()
+        return self.results
+
+    def report(self):
+        lines = ['%-40s %6s %6s %9s %9s %9s %9s' % (
+            'view', 'count', 'errors', 'p50', 'p95', 'p99', 'max')]
+        for name, result in self.results.items():
+            times = result['times']
+            lines.append('%-40s %6d %6d %s' % (
+                name, len(times), result['errors'], ' '.join(
+                    '%7.1fms' % (percentile(times, p) * 1000)
+                    for p in (50, 95, 99, 100))))
+        return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m cloudkittydashboard.tests.loadtest.driver',
+        description=__doc__)
+    parser.add_argument('--url', default='http://127.0.0.1:8000',
+                        help='URL of Horizon, including its web root')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--domain')
+    parser.add_argument('--region')
+    parser.add_argument('--insecure', action='store_true')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=10,
+                        help='Number of requests per view')
+    parser.add_argument('--views', help='Comma-separated views to request, '
+                                        'among: %s' % ', '.join(VIEWS))
+    args = parser.parse_args(argv)
+
+    views = args.views.split(',') if args.views else list(VIEWS)
+    unknown = set(views) - set(VIEWS)
+    if unknown:
+        parser.error('Unknown views: %s' % ', '.join(sorted(unknown)))
+
+    url = args.url.rstrip('/')
+    cookies = login(url, args.username, args.password, args.domain,
+                    args.region, verify=not args.insecure)
+    driver = Driver(url, cookies, verify=not args.insecure)
+    driver.run(views, args.requests, args.concurrency)
+    print(driver.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+"""Fake CloudKitty v1/v2 API serving synthetic datasets.
+
+Point the dashboard to the server with the ``CLOUDKITTY_ENDPOINT_OVERRIDE``
+setting. Keystone is still used to authenticate the users.
+"""
+import argparse
+from http import server as http_server
+import json
+import re
+import time
+from urllib import parse
+
+from cloudkittydashboard.tests.benchmarks import datasets
+
+# Endpoint categories, used to configure the latency of the endpoints
+CATEGORIES = ('hashmap', 'pyscripts', 'modules', 'quote', 'info', 'storage',
+              'report', 'summary')
+
+
+class Dataset(object):
+    """Fixtures served by the fake API."""
+
+    def __init__(self, projects=100, services=len(datasets.SERVICES),
+                 mappings=100, groups=10, scripts=5, resources=10000):
+        self.hashmap = datasets.hashmap(services, mappings, groups)
+        self.scripts = datasets.scripts(scripts)
+        self.metrics = datasets.metrics(datasets.SERVICES[:services])
+        self.matrix = datasets.rating_matrix(
+            projects, datasets.SERVICES[:services])
+        self.dataframes = datasets.dataframes(resources)
+        self.modules = [
+            {'module_id': 'hashmap', 'description': 'HashMap rating module.',
+             'enabled': True, 'hot-config': True, 'priority': 1},
+            {'module_id': 'pyscripts', 'description': 'PyScripts rating '
+             'module.', 'enabled': bool(scripts), 'hot-config': True,
+             'priority': 2},
+            {'module_id': 'noop', 'description': 'Dummy test module.',
+             'enabled': False, 'hot-config': False, 'priority': 1},
+        ]
+
+
+def _filter(entries, query, keys):
+    for key in keys:
+        if key in query:
+            value = query[key] or None
+            entries = [e for e in entries if e.get(key) == value]
+    return entries
+
+
+def _group(rows, groupby, value_keys):
+    groups = {}
+    for row in rows:
+        key = tuple(row[field] for field in groupby)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = dict(zip(groupby, key))
+            group.update((k, 0) for k in value_keys)
+        for k in value_keys:
+            group[k] += row[k]
+    return list(groups.values())
+
+
+class FakeCloudKittyAPI(object):
+    """Route the requests made to the fake API.
+
+    Handlers return a ``(status, body)`` tuple, ``body`` being serialized in
+    JSON.
+    """
+
+    def __init__(self, dataset, latency=0.0, latencies=None):
+        self.dataset = dataset
+        self.latency = latency
+        self.latencies = latencies or {}
+        hashmap = r'^/v1/rating/module_config/hashmap'
+        self.routes = [
+            ('GET', r'^/v1/info/config/?$', self.info_config),
+            ('GET', r'^/v1/info/metrics/?$', self.info_metrics),
+            ('GET', r'^/v1/info/metrics/(?P<id>[^/]+)/?$', self.info_metric),
+            ('GET', r'^/v1/rating/modules/?$', self.modules),
+            ('GET', r'^/v1/rating/modules/(?P<id>[^/]+)/?$', self.module),
+            ('PUT', r'^/v1/rating/modules/(?P<id>[^/]+)/?$', self.no_content),
+            ('POST', r'^/v1/rating/quote/?$', self.quote),
+            ('GET', hashmap + r'/groups/mappings/?$', self.group_mappings),
+            ('GET', hashmap + r'/groups/thresholds/?$',
+             self.group_thresholds),
+            ('GET', hashmap + r'/(?P<kind>services|fields|mappings|'
+             r'thresholds|groups)/?$', self.hashmap_list),
+            ('GET', hashmap + r'/(?P<kind>services|fields|mappings|'
+             r'thresholds|groups)/(?P<id>[^/]+)/?$', self.hashmap_get),
+            ('GET', r'^/v1/rating/module_config/pyscripts/scripts/?$',
+             self.scripts),
+            ('GET', r'^/v1/rating/module_config/pyscripts/scripts/'
+             r'(?P<id>[^/]+)/?$', self.script),
+            ('GET', r'^/v1/storage/dataframes/?$', self.storage_dataframes),
+            ('GET', r'^/v1/report/summary/?$', self.report_summary),
+            ('GET', r'^/v1/report/total/?$', self.report_total),
+            ('GET', r'^/v1/report/tenants/?$', self.report_tenants),
+            ('GET', r'^/v2/summary/?$', self.summary),
+        ]
+        self.routes = [(method, re.compile(pattern), handler)
+                       for method, pattern, handler in self.routes]
+
+    @staticmethod
+    def category(path):
+        for category in CATEGORIES:
+            if '/%s' % category in path:
+                return category
+        return None
+
+    def handle(self, method, url, body=None):
+        parsed = parse.urlsplit(url)
+        query = dict(parse.parse_qsl(parsed.query, keep_blank_values=True))
+        time.sleep(self.latencies.get(self.category(parsed.path),
+                                      self.latency))
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(parsed.path)
+            if match and route_method == method:
+                return handler(query=query, body=body, **match.groupdict())
+        return 404, {'faultstring': 'Not found: %s %s' % (method, url)}
+
+    @staticmethod
+    def _get(entries, key, value):
+        for entry in entries:
+            if entry[key] == value:
+                return 200, entry
+        return 404, {'faultstring': 'No such resource: %s' % value}
+
+    def no_content(self, **kwargs):
+        return 204, None
+
+    def info_config(self, **kwargs):
+        return 200, {'metrics': {m['metric_id']: {'unit': m['unit']}
+                                 for m in self.dataset.metrics}}
+
+    def info_metrics(self, **kwargs):
+        return 200, {'metrics': self.dataset.metrics}
+
+    def info_metric(self, id, **kwargs):
+        return self._get(self.dataset.metrics, 'metric_id', id)
+
+    def modules(self, **kwargs):
+        return 200, {'modules': self.dataset.modules}
+
+    def module(self, id, **kwargs):
+        return self._get(self.dataset.modules, 'module_id', id)
+
+    def quote(self, body, **kwargs):
+        resources = json.loads(body or '{}').get('resources', [])
+        return 200, sum(float(r.get('volume', 1)) for r in resources)
+
+    def hashmap_list(self, kind, query, **kwargs):
+        entries = _filter(self.dataset.hashmap[kind], query,
+                          ('service_id', 'field_id', 'group_id',
+                           'tenant_id'))
+        return 200, {kind: entries}
+
+    def hashmap_get(self, kind, id, **kwargs):
+        return self._get(self.dataset.hashmap[kind], '%s_id' % kind[:-1], id)
+
+    def group_mappings(self, query, **kwargs):
+        return self.hashmap_list('mappings', {'group_id': query['group_id']})
+
+    def group_thresholds(self, query, **kwargs):
+        return self.hashmap_list('thresholds',
+                                 {'group_id': query['group_id']})
+
+    def scripts(self, query, **kwargs):
+        scripts = self.dataset.scripts
+        if query.get('no_data'):
+            scripts = [dict(s, data=None) for s in scripts]
+        return 200, {'scripts': scripts}
+
+    def script(self, id, **kwargs):
+        return self._get(self.dataset.scripts, 'script_id', id)
+
+    def storage_dataframes(self, query, **kwargs):
+        return 200, self.dataset.dataframes
+
+    def _rows(self, tenant_id=None):
+        rows = self.dataset.matrix
+        if tenant_id:
+            rows = [row for row in rows if row['project_id'] == tenant_id]
+        return rows
+
+    def report_summary(self, query, **kwargs):
+        groupby = [g for g in query.get('groupby', '').split(',') if g]
+        rows = [{'tenant_id': row['project_id'], 'res_type': row['type'],
+                 'rate': row['rate']}
+                for row in self._rows(query.get('tenant_id'))
+                if query.get('service') in (None, row['type'])]
+        summary = _group(rows, groupby, ['rate'])
+        for item in summary:
+            item.setdefault('tenant_id', query.get('tenant_id') or 'ALL')
+            item.setdefault('res_type', query.get('service') or 'ALL')
+            item['rate'] = str(item['rate'])
+        return 200, {'summary': summary}
+
+    def report_total(self, query, **kwargs):
+        return 200, sum(row['rate']
+                        for row in self._rows(query.get('tenant_id')))
+
+    def report_tenants(self, **kwargs):
+        return 200, sorted(set(row['project_id']
+                               for row in self.dataset.matrix))
+
+    def summary(self, query, **kwargs):
+        filters = dict(f.split(':', 1)
+                       for f in query.get('filters', '').split(',') if f)
+        groupby = [g for g in query.get('groupby', '').split(',') if g]
+        rows = self._rows(filters.get('project_id'))
+        results = _group(rows, groupby, ['rate', 'qty'])
+        offset = int(query.get('offset', 0))
+        limit = int(query.get('limit', 100))
+        return 200, {'total': len(results),
+                     'results': results[offset:offset + limit]}
+
+
+class RequestHandler(http_server.BaseHTTPRequestHandler):
+
+    api = None
+    protocol_version = 'HTTP/1.1'
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        status, data = self.api.handle(self.command, self.path, body)
+        payload = b'' if data is None else json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(api, host='127.0.0.1', port=8889):
+    handler = type('Handler', (RequestHandler,), {'api': api})
+    return http_server.ThreadingHTTPServer((host, port), handler)
+
+
+def _latency(value):
+    """Parse a latency in milliseconds, optionally prefixed by a category."""
+    category, _, latency = value.rpartition('=')
+    if category and category not in CATEGORIES:
+        raise argparse.ArgumentTypeError(
+            'Unknown category %s, expected one of %s' % (
+                category, ', '.join(CATEGORIES)))
+    return category or None, float(latency) / 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m cloudkittydashboard.tests.loadtest.server',
+        description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8889)
+    parser.add_argument('--latency', type=_latency, action='append',
+                        default=[], metavar='[CATEGORY=]MS',
+                        help='Latency added to the responses, for all '
+                             'endpoints or for one of: %s' % ', '.join(
+                                 CATEGORIES))
+    parser.add_argument('--projects', type=int, default=100)
+    parser.add_argument('--services', type=int,
+                        default=len(datasets.SERVICES))
+    parser.add_argument('--mappings', type=int, default=100,
+                        help='Number of mappings per field')
+    parser.add_argument('--groups', type=int, default=10)
+    parser.add_argument('--scripts', type=int, default=5)
+    parser.add_argument('--resources', type=int, default=10000,
+                        help='Number of resources of the dataframes')
+    args = parser.parse_args(argv)
+
+    latencies = dict(args.latency)
+    api = FakeCloudKittyAPI(
+        Dataset(args.projects, args.services, args.mappings, args.groups,
+                args.scripts, args.resources),
+        latency=latencies.pop(None, 0.0), latencies=latencies)
+    httpd = make_server(api, args.host, args.port)
+    print('Fake CloudKitty API listening on http://%s:%d' % (
+        args.host, args.port))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
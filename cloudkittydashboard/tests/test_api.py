@@ -0,0 +1,558 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+import datetime
+import decimal
+import threading
+from unittest import mock
+
+from django.test import utils as test_utils
+from keystoneauth1 import exceptions as ks_exceptions
+
+from cloudkittydashboard.tests import base
+from cloudkittydashboard import utils
+
+
+class ClientPoolTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(ClientPoolTest, self).setUp()
+        from cloudkittydashboard.api import cloudkitty
+        self.api = cloudkitty
+        self.pool = cloudkitty.ClientPool(max_size=2)
+
+    def _token(self, minutes=60):
+        token = mock.MagicMock()
+        now = datetime.datetime.now(datetime.timezone.utc)
+        token.expires = now + datetime.timedelta(minutes=minutes)
+        return token
+
+    def test_client_is_reused(self):
+        factory = mock.MagicMock(side_effect=[mock.sentinel.a,
+                                              mock.sentinel.b])
+        token = self._token()
+        self.assertIs(self.pool.get('k', token, factory), mock.sentinel.a)
+        self.assertIs(self.pool.get('k', token, factory), mock.sentinel.a)
+        self.assertEqual(factory.call_count, 1)
+
+    def test_expired_client_is_rebuilt(self):
+        factory = mock.MagicMock(side_effect=[mock.sentinel.a,
+                                              mock.sentinel.b])
+        token = self._token(minutes=-1)
+        self.assertIs(self.pool.get('k', token, factory), mock.sentinel.a)
+        self.assertIs(self.pool.get('k', token, factory), mock.sentinel.b)
+
+    def test_lru_eviction(self):
+        token = self._token()
+        self.pool.get('a', token, mock.MagicMock())
+        self.pool.get('b', token, mock.MagicMock())
+        self.pool.get('a', token, mock.MagicMock())
+        self.pool.get('c', token, mock.MagicMock())
+        self.assertEqual(len(self.pool), 2)
+        self.assertEqual(list(self.pool._clients.keys()), ['a', 'c'])
+
+    @mock.patch('cloudkittydashboard.api.cloudkitty._build_client')
+    def test_cloudkittyclient_key(self, build_mock):
+        request = mock.MagicMock()
+        request.user.token = self._token()
+        with mock.patch.object(self.api, '_client_pool', self.pool):
+            client_v1 = self.api.cloudkittyclient(request)
+            self.assertIs(client_v1._target,
+                          self.api.cloudkittyclient(request)._target)
+            self.api.cloudkittyclient(request, version='2')
+        self.assertEqual(build_mock.call_count, 2)
+
+    @test_utils.override_settings(
+        CLOUDKITTY_ENDPOINT_OVERRIDE='http://127.0.0.1:8889')
+    def test_endpoint_override(self):
+        request = mock.MagicMock()
+        request.user.token.id = 'token'
+        with mock.patch.object(self.api.ck_client, 'Client') as client_mock:
+            self.api._build_client(request, '1')
+        adapter_options = client_mock.call_args[1]['adapter_options']
+        self.assertEqual('http://127.0.0.1:8889',
+                         adapter_options['endpoint_override'])
+
+
+class GatherTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(GatherTest, self).setUp()
+        from cloudkittydashboard.api import cloudkitty
+        self.api = cloudkitty
+
+    def test_gather_keeps_order_and_captures_errors(self):
+        error = ValueError('nope')
+
+        def fail():
+            raise error
+
+        results = self.api.gather(lambda: 1, fail, lambda: 3)
+        self.assertEqual(results, [(1, None), (None, error), (3, None)])
+
+    def test_gather_timeout(self):
+        event = threading.Event()
+        self.addCleanup(event.set)
+        results = self.api.gather(event.wait, lambda: 2, timeout=0.01)
+        self.assertIsNone(results[0][0])
+        self.assertIsInstance(results[0][1], TimeoutError)
+        self.assertEqual(results[1], (2, None))
+
+    def test_gather_no_call(self):
+        self.assertEqual(self.api.gather(), [])
+
+
+class IdentifyTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(IdentifyTest, self).setUp()
+        from cloudkittydashboard.api import cloudkitty
+        self.api = cloudkitty
+
+    def test_identify_list_in_place(self):
+        modules = [{'module_id': 'hashmap', 'name': 'Hashmap'},
+                   {'module_id': 'noop', 'name': None}]
+        rows = self.api.identify(modules, key='module_id', name=True)
+        self.assertIs(rows, modules)
+        self.assertEqual([(row.id, row.name) for row in rows],
+                         [('hashmap', 'Hashmap'), ('noop', 'noop')])
+        self.assertIsInstance(rows[0], utils.TemplatizableDict)
+
+    def test_identify_default_key(self):
+        fields = iter([{'key': 'field', 'field_id': 'f-1'},
+                       {'key': 'field', 'field_id': 'f-2', 'extra': 1}])
+        rows = self.api.identify(fields)
+        self.assertEqual([row.id for row in rows], ['f-1', 'f-2'])
+        self.assertEqual(rows[1].extra, 1)
+        self.assertFalse(hasattr(rows[0], 'name'))
+
+    def test_identify_dict(self):
+        row = self.api.identify({'script_id': 's-1'}, key='script_id',
+                                name=True)
+        self.assertEqual(row, {'script_id': 's-1', 'id': 's-1',
+                               'name': 's-1'})
+
+    def test_identify_lazy(self):
+        groups = [{'group_id': 'g-1'}, {'group_id': 'g-2'}]
+        rows = self.api.identify(groups, key='group_id', lazy=True)
+        self.assertNotIn('id', groups[0])
+        self.assertEqual([row.id for row in rows], ['g-1', 'g-2'])
+
+
+class CachedGettersTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(CachedGettersTest, self).setUp()
+        from cloudkittydashboard.api import cloudkitty
+        self.api = cloudkitty
+        patcher = mock.patch.object(cloudkitty, 'cloudkittyclient')
+        self.client = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_get_hashmap_object_is_cached_per_request(self):
+        get_service = self.client.rating.hashmap.get_service
+        get_service.side_effect = lambda service_id: {'id': service_id}
+        request = mock.MagicMock(spec=['user'])
+        for _ in range(2):
+            self.assertEqual(
+                self.api.get_hashmap_object(request, 'service', 's1'),
+                {'id': 's1'})
+        get_service.assert_called_once_with(service_id='s1')
+
+        self.api.get_hashmap_object(mock.MagicMock(spec=['user']),
+                                    'service', 's1')
+        self.assertEqual(get_service.call_count, 2)
+
+    @mock.patch.dict('cloudkittydashboard.api.cloudkitty._info_config_cache')
+    def test_get_info_config_is_cached_per_process(self):
+        self.client.info.get_config.return_value = {'period': 60}
+        for _ in range(2):
+            request = mock.MagicMock()
+            request.user.services_region = 'RegionOne'
+            self.assertEqual(self.api.get_info_config(request),
+                             {'period': 60})
+        self.client.info.get_config.assert_called_once_with()
+
+
+class GetCachedTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(GetCachedTest, self).setUp()
+        from cloudkittydashboard.api import cloudkitty
+        self.api = cloudkitty
+        overrides = test_utils.override_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': self.id()}},
+            CLOUDKITTY_SUMMARY_CACHE_REFRESH_AHEAD=10)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_value_is_cached(self):
+        loader = mock.MagicMock(side_effect=[1, 2])
+        self.assertEqual(self.api.get_cached('k', loader, ttl=60), 1)
+        self.assertEqual(self.api.get_cached('k', loader, ttl=60), 1)
+        self.assertEqual(self.api.get_cached('k', loader, refresh=True), 2)
+        self.assertEqual(loader.call_count, 2)
+
+    @mock.patch('threading.Thread')
+    def test_value_is_refreshed_ahead(self, thread_mock):
+        loader = mock.MagicMock(side_effect=[1, 2])
+        # The value must be refreshed 10 seconds before it expires
+        self.assertEqual(self.api.get_cached('k', loader, ttl=5), 1)
+        self.assertEqual(self.api.get_cached('k', loader, ttl=5), 1)
+        self.assertEqual(self.api.get_cached('k', loader, ttl=5), 1)
+        thread_mock.assert_called_once_with(
+            target=self.api._refresh_cached, args=('k', 5, loader),
+            daemon=True)
+
+        self.api._refresh_cached('k', 5, loader)
+        self.assertEqual(self.api.get_cached('k', loader, ttl=5), 2)
+
+
+class SummaryMatrixTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(SummaryMatrixTest, self).setUp()
+        from cloudkittydashboard.api import cloudkitty
+        self.api = cloudkitty
+        overrides = test_utils.override_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': self.id()}},
+            CLOUDKITTY_SUMMARY_V2_MATRIX=True,
+            CLOUDKITTY_SUMMARY_V2_PAGE_SIZE=2)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        patcher = mock.patch.object(cloudkitty, 'cloudkittyclient')
+        self.client = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        results = [
+            {'project_id': 'p1', 'type': 'cpu', 'rate': 1.0},
+            {'project_id': 'p1', 'type': 'image', 'rate': 0.5},
+            {'project_id': 'p2', 'type': 'cpu', 'rate': 2.0},
+        ]
+
+        def get_summary(offset, limit, **kwargs):
+            return {'total': len(results),
+                    'results': results[offset:offset + limit]}
+
+        self.get_summary = self.client.summary.get_summary
+        self.get_summary.side_effect = get_summary
+        self.request = mock.MagicMock()
+        self.request.user.services_region = 'RegionOne'
+
+    def test_matrix_is_paginated_and_cached(self):
+        expected = {'p1': {'cpu': 1.0, 'image': 0.5}, 'p2': {'cpu': 2.0}}
+        self.assertEqual(self.api.get_rating_matrix(self.request), expected)
+        self.assertEqual(self.api.get_rating_matrix(self.request), expected)
+        self.assertEqual(self.get_summary.call_count, 2)
+        self.assertEqual(self.get_summary.call_args.kwargs['groupby'],
+                         ['project_id', 'type'])
+
+    def test_matrix_sums_are_exact(self):
+        self.get_summary.side_effect = None
+        self.get_summary.return_value = {'total': 2, 'results': [
+            {'project_id': 'p1', 'type': 'cpu', 'rate': 0.1},
+            {'project_id': 'p1', 'type': 'cpu', 'rate': 0.2}]}
+        matrix = self.api.get_rating_matrix(self.request)
+        self.assertEqual(matrix['p1']['cpu'], decimal.Decimal('0.3'))
+        self.assertEqual(self.api.get_rating_summary(self.request),
+                         [{'tenant_id': 'p1', 'rate': decimal.Decimal('0.3')}])
+
+    def test_summaries_share_the_matrix(self):
+        self.assertEqual(
+            self.api.get_rating_summary(self.request),
+            [{'tenant_id': 'p1', 'rate': 1.5},
+             {'tenant_id': 'p2', 'rate': 2.0}])
+        self.assertEqual(
+            self.api.get_project_summary(self.request, 'p1'),
+            [{'tenant_id': 'p1', 'res_type': 'cpu', 'rate': 1.0},
+             {'tenant_id': 'p1', 'res_type': 'image', 'rate': 0.5}])
+        self.assertEqual(
+            self.api.get_project_summary(self.request, 'ALL'),
+            [{'tenant_id': 'ALL', 'res_type': 'cpu', 'rate': 3.0},
+             {'tenant_id': 'ALL', 'res_type': 'image', 'rate': 0.5}])
+        self.assertEqual(self.api.get_project_summary(self.request, 'p3'),
+                         [])
+        self.assertEqual(self.get_summary.call_count, 2)
+        self.client.report.get_summary.assert_not_called()
+
+
+class QuotationCacheTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(QuotationCacheTest, self).setUp()
+        from cloudkittydashboard.api import cloudkitty
+        self.api = cloudkitty
+        overrides = test_utils.override_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': self.id()}})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        patcher = mock.patch.object(cloudkitty, 'cloudkittyclient')
+        self.get_quotation = patcher.start().return_value.rating.get_quotation
+        self.addCleanup(patcher.stop)
+        self.get_quotation.side_effect = [1.0, 2.0, 3.0]
+        self.request = self._request('p1')
+
+    def _request(self, project_id):
+        request = mock.MagicMock()
+        request.user.services_region = 'RegionOne'
+        request.user.project_id = project_id
+        return request
+
+    def test_quote_is_cached(self):
+        res_data = [{'desc': {'vcpus': 1, 'ram': 512}, 'volume': 1}]
+        self.assertEqual(self.api.get_quotation(self.request, res_data), 1.0)
+        # The order of the keys does not matter
+        res_data = [{'volume': 1, 'desc': {'ram': 512, 'vcpus': 1}}]
+        self.assertEqual(self.api.get_quotation(self.request, res_data), 1.0)
+        self.get_quotation.assert_called_once_with(res_data=res_data)
+
+        self.assertEqual(
+            self.api.get_quotation(self._request('p2'), res_data), 2.0)
+
+    def test_config_change_invalidates_quotes(self):
+        res_data = [{'desc': {'vcpus': 1}, 'volume': 1}]
+        version = self.api.get_rating_config_version(self.request)
+        self.assertEqual(self.api.get_quotation(self.request, res_data), 1.0)
+        self.api.bump_rating_config_version(self.request)
+        self.assertEqual(self.api.get_rating_config_version(self.request),
+                         version + 1)
+        self.assertEqual(self.api.get_quotation(self.request, res_data), 2.0)
+
+    @test_utils.override_settings(CLOUDKITTY_QUOTE_CACHE_TTL=0)
+    def test_cache_can_be_disabled(self):
+        res_data = [{'desc': {'vcpus': 1}, 'volume': 1}]
+        self.api.get_quotation(self.request, res_data)
+        self.api.get_quotation(self.request, res_data)
+        self.assertEqual(self.get_quotation.call_count, 2)
+
+
+class ProjectNamesTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(ProjectNamesTest, self).setUp()
+        from cloudkittydashboard.api import cloudkitty
+        self.api = cloudkitty
+        self.names = cloudkitty.ProjectNameCache(max_size=3)
+        patcher = mock.patch.object(cloudkitty, '_project_name_cache',
+                                    self.names)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(cloudkitty.api_keystone, 'tenant_get')
+        self.tenant_get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        def tenant_get(request, project_id, admin=True):
+            if project_id == 'deleted':
+                raise ks_exceptions.NotFound()
+            if project_id == 'broken':
+                raise ks_exceptions.ServiceUnavailable()
+            project = mock.MagicMock()
+            project.name = project_id.upper()
+            return project
+
+        self.tenant_get.side_effect = tenant_get
+
+    def test_only_missing_projects_are_resolved(self):
+        request = mock.MagicMock()
+        self.assertEqual(
+            self.api.resolve_project_names(request, ['a', 'deleted']),
+            {'a': 'A'})
+        self.assertEqual(self.tenant_get.call_count, 2)
+        self.assertEqual(
+            self.api.resolve_project_names(request,
+                                           ['a', 'b', 'deleted']),
+            {'a': 'A', 'b': 'B'})
+        # Deleted projects are cached as well
+        self.assertEqual(self.tenant_get.call_count, 3)
+
+    def test_errors_are_not_cached(self):
+        request = mock.MagicMock()
+        self.assertEqual(
+            self.api.resolve_project_names(request, ['broken']), {})
+        self.api.resolve_project_names(request, ['broken'])
+        self.assertEqual(self.tenant_get.call_count, 2)
+
+    @test_utils.override_settings(CLOUDKITTY_PROJECT_NAMES_LIST_THRESHOLD=1)
+    @mock.patch('cloudkittydashboard.api.cloudkitty.get_project_names')
+    def test_projects_are_listed_above_threshold(self, list_mock):
+        list_mock.return_value = {'a': 'A', 'b': 'B', 'c': 'C'}
+        self.names.max_size = 10
+        self.assertEqual(
+            self.api.resolve_project_names(mock.MagicMock(),
+                                           ['a', 'b', 'deleted']),
+            {'a': 'A', 'b': 'B'})
+        self.tenant_get.assert_not_called()
+        self.assertEqual(self.names.get_many(['c', 'deleted']),
+                         ({'c': 'C', 'deleted': None}, []))
+
+    def test_lru_eviction(self):
+        self.names.set_many({'a': 'A', 'b': 'B', 'c': 'C'})
+        self.names.get_many(['a'])
+        self.names.set_many({'d': 'D'})
+        self.assertEqual(list(self.names._names.keys()), ['c', 'a', 'd'])
+
+
+class HashmapEvaluatorTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(HashmapEvaluatorTest, self).setUp()
+        from cloudkittydashboard.api import hashmap
+        self.hashmap = hashmap
+        groups = {'g1': 'instance_uptime', 'g2': 'instance_extra'}
+        service = {'service_id': 's1', 'name': 'instance'}
+        flavor = {'field_id': 'f1', 'name': 'flavor_name'}
+        vcpus = {'field_id': 'f2', 'name': 'vcpus'}
+        services = [(
+            service,
+            [{'type': 'rate', 'cost': '1.5', 'group_id': 'g1'}],
+            [{'level': '10', 'type': 'rate', 'cost': '0.5',
+              'group_id': 'g1'},
+             {'level': '100', 'type': 'rate', 'cost': '0.1',
+              'group_id': 'g1'}],
+            [(flavor,
+              [{'value': 'm1.small', 'type': 'flat', 'cost': '0.1',
+                'group_id': 'g1'},
+               {'value': 'm1.large', 'type': 'flat', 'cost': '0.4',
+                'group_id': 'g1'},
+               {'value': 'm1.large', 'type': 'flat', 'cost': '0.02',
+                'group_id': 'g2'}],
+              []),
+             (vcpus, [],
+              [{'level': '4', 'type': 'flat', 'cost': '0.03',
+                'group_id': 'g2'}])]),
+        ]
+        self.evaluator = hashmap.HashmapEvaluator(
+            hashmap.build_rules(services, groups))
+
+    def _quote(self, volume=1, **desc):
+        return self.evaluator.quote(
+            [{'service': 'instance', 'desc': desc, 'volume': volume}])
+
+    def test_flat_and_rate(self):
+        # 0.1 * 1.5
+        self.assertEqual(self._quote(flavor_name='m1.small'),
+                         decimal.Decimal('0.15'))
+        # (0.4 * 1.5 + 0.02) * 2
+        self.assertEqual(self._quote(2, flavor_name='m1.large'),
+                         decimal.Decimal('1.24'))
+
+    def test_rate_without_flat(self):
+        self.assertEqual(self._quote(flavor_name='m1.tiny'), 0)
+        self.assertEqual(
+            self.evaluator.quote([{'service': 'volume', 'desc': {},
+                                   'volume': 1}]), 0)
+
+    def test_thresholds(self):
+        # Service threshold: only the highest level reached is applied
+        self.assertEqual(self._quote(10, flavor_name='m1.small'),
+                         decimal.Decimal('0.75'))
+        self.assertEqual(self._quote(100, flavor_name='m1.small'),
+                         decimal.Decimal('1.5'))
+        # Field threshold: added to the flat cost of its group
+        self.assertEqual(self._quote(flavor_name='m1.large', vcpus=4),
+                         decimal.Decimal('0.65'))
+        self.assertEqual(self._quote(flavor_name='m1.large', vcpus=2),
+                         decimal.Decimal('0.62'))
+
+
+class LocalQuotationTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(LocalQuotationTest, self).setUp()
+        from cloudkittydashboard.api import cloudkitty
+        self.api = cloudkitty
+        overrides = test_utils.override_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': self.id()}},
+            CLOUDKITTY_LOCAL_QUOTATION=True,
+            CLOUDKITTY_QUOTE_CACHE_TTL=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        patcher = mock.patch.dict(cloudkitty._hashmap_evaluators)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(cloudkitty, 'cloudkittyclient')
+        self.client = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+        self.client.rating.get_module.return_value = {'modules': [
+            {'module_id': 'hashmap', 'enabled': True},
+            {'module_id': 'pyscripts', 'enabled': False}]}
+        self.client.rating.get_quotation.return_value = 42.0
+        hashmap = self.client.rating.hashmap
+        hashmap.get_service.return_value = {'services': [
+            {'service_id': 's1', 'name': 'instance'}]}
+        hashmap.get_field.return_value = {'fields': []}
+        self.mappings = [{'type': 'flat', 'cost': '0.5', 'group_id': None,
+                          'tenant_id': None}]
+        hashmap.get_mapping.return_value = {'mappings': self.mappings}
+        hashmap.get_threshold.return_value = {'thresholds': []}
+        hashmap.get_group.return_value = {'groups': []}
+
+        self.request = mock.MagicMock()
+        self.request.user.services_region = 'RegionOne'
+        self.res_data = [{'service': 'instance', 'desc': {}, 'volume': 2}]
+
+    def test_quote_is_computed_locally(self):
+        for _i in range(2):
+            self.assertEqual(
+                self.api.get_quotation(self.request, self.res_data), 1)
+        self.client.rating.get_quotation.assert_not_called()
+        self.client.rating.hashmap.get_service.assert_called_once_with()
+
+        # The configuration is reloaded once it changed
+        self.api.bump_rating_config_version(self.request)
+        self.api.get_quotation(self.request, self.res_data)
+        self.assertEqual(
+            self.client.rating.hashmap.get_service.call_count, 2)
+
+    def test_concurrent_misses_load_the_rules_once(self):
+        loaded = threading.Event()
+        load_rules = self.api._load_hashmap_rules
+
+        def slow_load(request):
+            loaded.wait(1)
+            return load_rules(request)
+
+        with mock.patch.object(self.api, '_load_hashmap_rules',
+                               side_effect=slow_load) as load:
+            threads = [threading.Thread(target=self.api.get_hashmap_evaluator,
+                                        args=(self.request,))
+                       for _i in range(5)]
+            for thread in threads:
+                thread.start()
+            loaded.set()
+            for thread in threads:
+                thread.join()
+        load.assert_called_once_with(self.request)
+
+    def test_fallback_when_other_modules_are_enabled(self):
+        self.client.rating.get_module.return_value['modules'][1][
+            'enabled'] = True
+        self.assertEqual(
+            self.api.get_quotation(self.request, self.res_data), 42.0)
+
+    def test_fallback_on_project_specific_rules(self):
+        self.mappings[0]['tenant_id'] = 'p1'
+        self.assertEqual(
+            self.api.get_quotation(self.request, self.res_data), 42.0)
+
+    def test_fallback_on_error(self):
+        self.client.rating.hashmap.get_service.side_effect = ValueError()
+        self.assertEqual(
+            self.api.get_quotation(self.request, self.res_data), 42.0)
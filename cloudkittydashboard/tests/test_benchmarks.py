@@ -0,0 +1,41 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+from unittest import mock
+
+from django.test import utils as test_utils
+
+from cloudkittydashboard.tests import base
+
+
+class BenchmarksTest(base.DashboardTestCase):
+
+    @test_utils.override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_benchmarks_run(self):
+        from cloudkittydashboard.tests import benchmarks
+        from cloudkittydashboard.tests.benchmarks import __main__ as runner
+        # Django is already configured by the test case
+        patcher = mock.patch.object(benchmarks, '_settings', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        names = []
+        for name, cls, method, params in runner.get_cases(['1k']):
+            bench = cls()
+            bench.setup(*params)
+            try:
+                getattr(bench, method)(*params)
+            finally:
+                bench.teardown(*params)
+            names.append(name)
+        self.assertIn('Quote.time_quote(1k, local)', names)
+        self.assertNotIn('Identify.time_identify(10k)', names)
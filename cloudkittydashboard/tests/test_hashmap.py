@@ -0,0 +1,442 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+import decimal
+import json
+from unittest import mock
+
+from django.test import utils as test_utils
+from keystoneauth1 import exceptions
+
+from cloudkittydashboard.tests import base
+
+
+class HashmapIndexViewTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(HashmapIndexViewTest, self).setUp()
+        from cloudkittydashboard.dashboards.admin.hashmap import views
+        self.views = views
+        self.client = mock.MagicMock()
+        self.client.rating.hashmap.get_service.return_value = {
+            'services': [
+                {'service_id': 's2', 'name': 'volume.size'},
+                {'service_id': 's1', 'name': 'instance'},
+                {'service_id': 's3', 'name': 'custom'},
+            ]}
+        patcher = mock.patch.object(
+            views.api, 'cloudkittyclient', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get_data(self):
+        view = self.views.IndexView()
+        view.request = mock.MagicMock()
+        return view.get_data()
+
+    def test_get_data_uses_metric_listing(self):
+        self.client.info.get_metric.return_value = {'metrics': [
+            {'metric_id': 'instance', 'unit': 'instance'},
+            {'metric_id': 'volume.size', 'unit': 'GiB'},
+        ]}
+        self.assertEqual(self._get_data(), [
+            {'id': 's3', 'name': 'custom', 'unit': '-'},
+            {'id': 's1', 'name': 'instance', 'unit': 'instance'},
+            {'id': 's2', 'name': 'volume.size', 'unit': 'GiB'},
+        ])
+        self.client.info.get_metric.assert_called_once_with()
+
+    def test_get_data_falls_back_to_single_metric_calls(self):
+        units = {'instance': 'instance', 'volume.size': 'GiB'}
+
+        def get_metric(metric_name=None):
+            if metric_name is None:
+                raise exceptions.MethodNotAllowed()
+            if metric_name not in units:
+                raise exceptions.NotFound()
+            return {'metric_id': metric_name, 'unit': units[metric_name]}
+
+        self.client.info.get_metric.side_effect = get_metric
+        self.assertEqual(
+            [s['unit'] for s in self._get_data()],
+            ['-', 'instance', 'GiB'])
+        self.assertEqual(self.client.info.get_metric.call_count, 4)
+
+
+class AddGroupnameTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(AddGroupnameTest, self).setUp()
+        from cloudkittydashboard.dashboards.admin.hashmap import tables
+        self.tables = tables
+        self.client = mock.MagicMock()
+        self.client.rating.hashmap.get_group.side_effect = self._get_group
+        patcher = mock.patch.object(
+            tables.api, 'cloudkittyclient', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.request = mock.MagicMock(spec=['user'])
+
+    @staticmethod
+    def _get_group(group_id=None):
+        if group_id is None:
+            return {'groups': [{'group_id': 'g1', 'name': 'one'}]}
+        if group_id == 'gone':
+            raise exceptions.NotFound()
+        return {'group_id': group_id, 'name': 'name-%s' % group_id}
+
+    def test_group_index_is_shared_by_request(self):
+        mappings = [{'group_id': 'g1'}, {'group_id': None}]
+        thresholds = [{'group_id': 'g1'}]
+        self.tables.add_groupname(self.request, mappings)
+        self.tables.add_groupname(self.request, thresholds)
+        self.assertEqual(mappings[0]['group_name'], 'one')
+        self.assertNotIn('group_name', mappings[1])
+        self.assertEqual(thresholds[0]['group_name'], 'one')
+        self.client.rating.hashmap.get_group.assert_called_once_with()
+
+    def test_unknown_groups_are_resolved_once(self):
+        datums = [{'group_id': 'g2'}, {'group_id': 'g2'},
+                  {'group_id': 'gone'}]
+        self.tables.add_groupname(self.request, datums)
+        self.tables.add_groupname(self.request, [{'group_id': 'g2'}])
+        self.assertEqual(datums[0]['group_name'], 'name-g2')
+        self.assertEqual(datums[1]['group_name'], 'name-g2')
+        self.assertNotIn('group_name', datums[2])
+        # One listing, then one call for each unknown id
+        self.assertEqual(self.client.rating.hashmap.get_group.call_count, 3)
+
+
+class GroupDetailsViewTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(GroupDetailsViewTest, self).setUp()
+        from cloudkittydashboard.dashboards.admin.hashmap import views
+        self.views = views
+
+    @mock.patch('cloudkittydashboard.api.cloudkitty.cloudkittyclient')
+    def test_get_data(self, client_mock):
+        hashmap = client_mock.return_value.rating.hashmap
+        hashmap.get_group.return_value = {'group_id': 'g1', 'name': 'one'}
+        hashmap.get_mapping.return_value = {'mappings': [
+            {'mapping_id': 'm1', 'service_id': 's1'},
+            {'mapping_id': 'm2', 'field_id': 'f1'},
+        ]}
+        hashmap.get_threshold.side_effect = exceptions.NotFound()
+
+        view = self.views.GroupDetailsView()
+        view.request = mock.MagicMock()
+        context = view.get_data(view.request, {}, group_id='g1')
+
+        self.assertEqual(context['group'], {'group_id': 'g1', 'name': 'one'})
+        self.assertEqual(context['mappings'], {
+            'services': [{'mapping_id': 'm1', 'service_id': 's1'}],
+            'fields': [{'mapping_id': 'm2', 'field_id': 'f1'}],
+        })
+        self.assertEqual(context['thresholds'],
+                         {'services': [], 'fields': []})
+        hashmap.get_mapping.assert_called_once_with(group_id='g1')
+
+    @mock.patch('cloudkittydashboard.api.cloudkitty.cloudkittyclient')
+    def test_get_data_without_rules(self, client_mock):
+        hashmap = client_mock.return_value.rating.hashmap
+        hashmap.get_group.return_value = {'group_id': 'g1', 'name': 'one'}
+        hashmap.get_mapping.return_value = {}
+        hashmap.get_threshold.return_value = {}
+
+        view = self.views.GroupDetailsView()
+        view.request = mock.MagicMock()
+        context = view.get_data(view.request, {}, group_id='g1')
+
+        self.assertEqual(context['mappings'], {'services': [], 'fields': []})
+        self.assertEqual(context['thresholds'],
+                         {'services': [], 'fields': []})
+
+
+CONFIG_DOCUMENT = """
+groups: [uptime]
+services:
+  - name: instance
+    mappings:
+      - {type: flat, cost: 0.01, group: uptime}
+    thresholds:
+      - {level: 100, type: rate, cost: 0.9}
+    fields:
+      - name: flavor_id
+        mappings:
+          - {value: m1.small, cost: 0.1, tenant_id: p1}
+          - {value: m1.large, cost: 1.5, group: large}
+"""
+
+CONFIG_CSV = """service,field,value,level,type,cost,group,tenant_id
+,,,,,,uptime,
+instance,,,,flat,0.01,uptime,
+instance,,,100,rate,0.9,,
+instance,flavor_id,m1.small,,,0.1,,p1
+instance,flavor_id,m1.large,,flat,1.5,large,
+"""
+
+
+class HashmapConfigTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(HashmapConfigTest, self).setUp()
+        from cloudkittydashboard.api import hashmap
+        self.hashmap = hashmap
+        self.services = [(
+            {'service_id': 's1', 'name': 'instance'},
+            [{'mapping_id': 'm1', 'type': 'flat', 'cost': '0.01000000',
+              'group_id': 'g1', 'value': None, 'tenant_id': None}],
+            [{'threshold_id': 't1', 'type': 'rate', 'cost': '0.8',
+              'level': '100.00', 'group_id': None, 'tenant_id': None}],
+            [({'field_id': 'f1', 'name': 'flavor_id'}, [
+                {'mapping_id': 'm2', 'type': 'flat', 'cost': '0.1',
+                 'value': 'm1.small', 'tenant_id': 'p1'},
+                {'mapping_id': 'm3', 'type': 'flat', 'cost': '3',
+                 'value': 'm1.tiny'},
+            ], [])],
+        ), ({'service_id': 's2', 'name': 'image.size'}, [], [], [])]
+        self.groups = [{'group_id': 'g1', 'name': 'uptime'},
+                       {'group_id': 'g2', 'name': 'unused'}]
+        self.current = hashmap.config_from_api(self.services, self.groups)
+
+    def _parse(self, content, fmt='yaml'):
+        return self.hashmap.parse_config(
+            self.hashmap.load_document(content, fmt))
+
+    def _diff(self, desired, prune=False):
+        return [(op['action'], op['kind'], op['path'], op.get('id'))
+                for op in self.hashmap.diff(self.current, desired, prune)]
+
+    def test_parse_config(self):
+        config = self._parse(CONFIG_DOCUMENT)
+        self.assertEqual(set(config['groups']), {'uptime', 'large'})
+        field = config['services']['instance']['fields']['flavor_id']
+        self.assertEqual(field['mappings'][('m1.small', None, 'p1')],
+                         {'type': 'flat', 'cost': decimal.Decimal('0.1')})
+
+    def test_parse_csv(self):
+        self.assertEqual(self._parse(CONFIG_CSV, 'csv'),
+                         self._parse(CONFIG_DOCUMENT))
+
+    def test_parse_errors(self):
+        for document, error in (
+                ('services: [{name: a, mappings: [{type: flat}]}]',
+                 'a mapping #1: cost is required'),
+                ('services: [{name: a, mappings: [{cost: 1, type: x}]}]',
+                 'a mapping #1: type must be one of flat, rate'),
+                ('services: [{name: a}, {name: a}]',
+                 'a: duplicate service'),
+                ('services: [{name: a, mappings: [{cost: 1, value: v}]}]',
+                 'a mapping #1: unknown keys value'),
+                ('services: [', 'Invalid YAML document')):
+            with self.assertRaisesRegex(self.hashmap.ConfigError, error):
+                self._parse(document)
+
+    def test_diff(self):
+        self.assertEqual(self._diff(self._parse(CONFIG_DOCUMENT)), [
+            ('create', 'group', 'large', None),
+            ('update', 'threshold', 'instance >= 100', 't1'),
+            ('create', 'mapping',
+             'instance/flavor_id = m1.large (group large)', None),
+        ])
+
+    def test_diff_prune(self):
+        self.assertEqual(self._diff(self._parse(CONFIG_DOCUMENT), True), [
+            ('create', 'group', 'large', None),
+            ('update', 'threshold', 'instance >= 100', 't1'),
+            ('create', 'mapping',
+             'instance/flavor_id = m1.large (group large)', None),
+            ('delete', 'mapping', 'instance/flavor_id = m1.tiny', 'm3'),
+            ('delete', 'service', 'image.size', 's2'),
+            ('delete', 'group', 'unused', 'g2'),
+        ])
+
+    def test_export_round_trip(self):
+        names = {group['group_id']: group['name'] for group in self.groups}
+        for fmt in self.hashmap.FORMATS:
+            services = (self.hashmap.export_service(loaded, names)
+                        for loaded in self.services)
+            document = ''.join(self.hashmap.iter_export(
+                fmt, sorted(names.values()), services))
+            self.assertEqual(self._diff(self._parse(document, fmt), True),
+                             [], fmt)
+
+
+class ApplyHashmapOperationsTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(ApplyHashmapOperationsTest, self).setUp()
+        from cloudkittydashboard.api import cloudkitty
+        from cloudkittydashboard.api import hashmap
+        self.api = cloudkitty
+        self.hashmap = hashmap
+        self.client = mock.MagicMock()
+        manager = self.client.rating.hashmap
+        manager.create_group.side_effect = lambda name: {
+            'group_id': 'group-%s' % name}
+        manager.create_service.side_effect = lambda name: {
+            'service_id': 'service-%s' % name}
+        manager.create_field.side_effect = lambda name, service_id: {
+            'field_id': '%s/field-%s' % (service_id, name)}
+        for patcher in (
+                mock.patch.object(cloudkitty, 'cloudkittyclient',
+                                  return_value=self.client),
+                mock.patch.object(cloudkitty, 'bump_rating_config_version')):
+            self.bump = patcher.start()
+            self.addCleanup(patcher.stop)
+        self.current = hashmap.config_from_api([], [])
+        self.desired = hashmap.parse_config(hashmap.load_document(
+            CONFIG_DOCUMENT, 'yaml'))
+
+    def test_apply(self):
+        operations = self.hashmap.diff(self.current, self.desired)
+        progress = mock.Mock()
+        results = self.api.apply_hashmap_operations(
+            mock.Mock(), operations, self.current, progress)
+
+        self.assertEqual([error for __, error in results], [None] * 8)
+        self.assertEqual(progress.call_count, 8)
+        self.assertEqual(progress.call_args[0][:2], (8, 8))
+        self.bump.assert_called_once()
+        manager = self.client.rating.hashmap
+        manager.create_mapping.assert_any_call(
+            field_id='service-instance/field-flavor_id', value='m1.large',
+            group_id='group-large', type='flat', cost=1.5)
+        manager.create_threshold.assert_called_once_with(
+            service_id='service-instance', level=100.0, type='rate',
+            cost=0.9)
+
+    def test_dependent_operations_fail(self):
+        self.client.rating.hashmap.create_service.side_effect = (
+            exceptions.HttpError())
+        operations = self.hashmap.diff(self.current, self.desired)
+        results = self.api.apply_hashmap_operations(
+            mock.Mock(), operations, self.current)
+
+        failed = sorted(op['path'] for op, error in results if error)
+        self.assertEqual(len(failed), 6)
+        self.assertEqual(failed[0], 'instance')
+        self.client.rating.hashmap.create_mapping.assert_not_called()
+        # Groups were created
+        self.bump.assert_called_once()
+
+
+class ExportViewTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(ExportViewTest, self).setUp()
+        from cloudkittydashboard.dashboards.admin.hashmap import views
+        from cloudkittydashboard.tests.benchmarks import datasets
+        from cloudkittydashboard.tests.benchmarks import fakes
+        self.views = views
+        client = fakes.FakeClient(hashmap=datasets.hashmap(
+            n_services=2, n_mappings=3, n_groups=2))
+        patcher = mock.patch.object(views.api, 'cloudkittyclient',
+                                    return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _export(self, fmt):
+        request = mock.MagicMock()
+        request.GET = {'format': fmt}
+        return self.views.ExportView().get(request)
+
+    def test_export(self):
+        from cloudkittydashboard.api import hashmap
+        response = self._export('json')
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename="hashmap.json"')
+        document = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(
+            [service['name'] for service in document['services']],
+            ['instance', 'volume.size'])
+        self.assertEqual(len(document['services'][0]['fields'][0][
+            'mappings']), 3)
+        hashmap.parse_config(document)
+
+    def test_export_unknown_format(self):
+        self.assertEqual(self._export('xml').status_code, 400)
+
+
+class ImportFormTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(ImportFormTest, self).setUp()
+        from cloudkittydashboard.api import hashmap
+        from cloudkittydashboard.dashboards.admin.hashmap import forms
+        self.forms = forms
+        self.request = mock.MagicMock()
+        overrides = test_utils.override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': self.id()}})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for name, value in (
+                ('get_hashmap_config',
+                 hashmap.config_from_api([], [])),
+                ('apply_hashmap_operations', [])):
+            patcher = mock.patch.object(forms.api, name, return_value=value)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def _handle(self, name, content, **data):
+        from django.core.files import uploadedfile
+        form = self.forms.ImportForm(
+            self.request, data=data, files={
+                'document': uploadedfile.SimpleUploadedFile(name, content)})
+        self.assertTrue(form.is_valid(), form.errors)
+        return form.handle(self.request, form.cleaned_data)
+
+    def test_dry_run(self):
+        self.assertTrue(self._handle('hashmap.csv', CONFIG_CSV.encode(),
+                                     dry_run='on'))
+        self.apply_hashmap_operations.assert_not_called()
+
+    def test_import(self):
+        self.assertTrue(self._handle('hashmap.yaml',
+                                     CONFIG_DOCUMENT.encode()))
+        operations = self.apply_hashmap_operations.call_args[0][1]
+        self.assertEqual(len(operations), 8)
+
+    def test_import_progress(self):
+        from cloudkittydashboard.dashboards.admin.hashmap import views
+        import_id = 'a' * 32
+        view = views.ImportProgressView()
+
+        def status():
+            response = view.get(self.request, import_id=import_id)
+            return json.loads(response.content)
+
+        self.assertEqual(status(), {})
+        self.assertTrue(self._handle('hashmap.yaml', CONFIG_DOCUMENT.encode(),
+                                     import_id=import_id))
+        self.assertEqual(status(), {'done': 0, 'total': 8, 'errors': 0})
+        progress = self.apply_hashmap_operations.call_args[1]['progress']
+        progress(1, 8, {}, None)
+        progress(2, 8, {}, Exception())
+        self.assertEqual(status(), {'done': 2, 'total': 8, 'errors': 1})
+
+    def test_import_id(self):
+        form = self.forms.ImportForm(self.request)
+        self.assertRegex(form['import_id'].value(), '^[0-9a-f]{32}$')
+        self.assertNotEqual(form['import_id'].value(),
+                            self.forms.ImportForm(self.request)[
+                                'import_id'].value())
+
+    def test_invalid_document(self):
+        from django.core.files import uploadedfile
+        form = self.forms.ImportForm(self.request, data={}, files={
+            'document': uploadedfile.SimpleUploadedFile(
+                'hashmap.json', b'{"services": 1}')})
+        self.assertFalse(form.is_valid())
+        self.assertIn('services must be a list', str(form.errors))
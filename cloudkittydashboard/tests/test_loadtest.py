@@ -0,0 +1,108 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+import threading
+from unittest import mock
+
+from cloudkittyclient import client as ck_client
+from keystoneauth1 import exceptions
+from keystoneauth1 import session as ks_session
+
+from cloudkittydashboard.tests import base
+from cloudkittydashboard.tests.loadtest import driver
+from cloudkittydashboard.tests.loadtest import server
+
+
+class FakeServerTest(base.TestCase):
+
+    def setUp(self):
+        super(FakeServerTest, self).setUp()
+        self.api = server.FakeCloudKittyAPI(
+            server.Dataset(projects=3, services=2, mappings=5, groups=2,
+                           scripts=1, resources=10))
+        self.httpd = server.make_server(self.api, port=0)
+        thread = threading.Thread(target=self.httpd.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.httpd.server_close)
+        self.addCleanup(self.httpd.shutdown)
+        self.url = 'http://127.0.0.1:%d' % self.httpd.server_address[1]
+
+    def _client(self, version='1'):
+        return ck_client.Client(
+            version, session=ks_session.Session(),
+            adapter_options={'endpoint_override': self.url})
+
+    def test_v1(self):
+        client = self._client()
+        self.assertEqual(
+            ['hashmap', 'pyscripts', 'noop'],
+            [m['module_id'] for m in client.rating.get_module()['modules']])
+        hashmap = client.rating.hashmap
+        services = hashmap.get_service()['services']
+        self.assertEqual(2, len(services))
+        fields = hashmap.get_field(service_id='service-0')['fields']
+        self.assertEqual(['field-0'], [f['field_id'] for f in fields])
+        self.assertEqual(5, len(hashmap.get_mapping(
+            field_id='field-0')['mappings']))
+        self.assertEqual('Group 1', hashmap.get_group(
+            group_id='group-1')['name'])
+        self.assertRaises(exceptions.HttpError, hashmap.get_group,
+                          group_id='unknown')
+        self.assertEqual(2.0, client.rating.get_quotation(res_data=[
+            {'service': 'instance', 'desc': {}, 'volume': '2'}]))
+        summary = client.report.get_summary(groupby=['tenant_id'])
+        self.assertEqual(3, len(summary['summary']))
+        self.assertEqual(
+            10, sum(len(frame['resources']) for frame in
+                    client.storage.get_dataframes()['dataframes']))
+
+    def test_v2_summary(self):
+        client = self._client('2')
+        summary = client.summary.get_summary(
+            groupby=['project_id', 'type'], offset=2, limit=3,
+            response_format='object')
+        self.assertEqual(6, summary['total'])
+        self.assertEqual(3, len(summary['results']))
+        summary = client.summary.get_summary(
+            groupby=['type'], filters={'project_id': '%032x' % 1})
+        self.assertEqual(2, summary['total'])
+
+    def test_latency(self):
+        self.api.latencies = {'hashmap': 0.01}
+        with mock.patch.object(server.time, 'sleep') as sleep:
+            self.api.handle('GET', '/v1/rating/module_config/hashmap/groups')
+            self.api.handle('GET', '/v1/rating/modules')
+        sleep.assert_has_calls([mock.call(0.01), mock.call(0.0)])
+
+    def test_driver(self):
+        views = {'modules': ('GET', '/v1/rating/modules', None),
+                 'missing': ('GET', '/v1/missing', None)}
+        with mock.patch.dict(driver.VIEWS, views):
+            load = driver.Driver(self.url, {})
+            results = load.run(['modules', 'missing'], count=4,
+                               concurrency=2)
+        self.assertEqual(4, len(results['modules']['times']))
+        self.assertEqual(0, results['modules']['errors'])
+        self.assertEqual(4, results['missing']['errors'])
+        self.assertIn('modules', load.report())
+
+
+class PercentileTest(base.TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(50, driver.percentile(values, 50))
+        self.assertEqual(99, driver.percentile(values, 99))
+        self.assertEqual(100, driver.percentile(values, 100))
+        self.assertEqual(3, driver.percentile([3], 95))
+        self.assertIsNone(driver.percentile([], 50))
@@ -0,0 +1,137 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+from unittest import mock
+
+from django import http
+from django.test import utils as test_utils
+
+from cloudkittydashboard.tests import base
+
+
+class InstrumentedProxyTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(InstrumentedProxyTest, self).setUp()
+        from cloudkittyclient.common import base as ck_base
+        from cloudkittydashboard.api import metrics
+        self.metrics = metrics
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+
+        class FakeManager(ck_base.BaseManager):
+
+            def get_service(self, **kwargs):
+                metrics.response_hook(mock.Mock(content=b'{"a": 1}'))
+                return {'service_id': kwargs.get('service_id')}
+
+            def delete_service(self, **kwargs):
+                raise ValueError('failed')
+
+        self.client = mock.Mock(spec=['rating', 'session'])
+        self.client.rating = FakeManager(None)
+        self.client.rating.hashmap = FakeManager(None)
+        self.request = mock.Mock(spec=[])
+
+    def test_calls_are_recorded(self):
+        proxy = self.metrics.InstrumentedProxy(self.client, self.request)
+        result = proxy.rating.hashmap.get_service(service_id='s1')
+        self.assertEqual({'service_id': 's1'}, result)
+        self.assertRaises(ValueError, proxy.rating.hashmap.delete_service)
+
+        stats = self.metrics.registry.snapshot()
+        self.assertEqual(1, stats['rating.hashmap.get_service']['count'])
+        self.assertEqual(8, stats['rating.hashmap.get_service']['bytes'])
+        self.assertEqual(0, stats['rating.hashmap.get_service']['errors'])
+        self.assertEqual(1, stats['rating.hashmap.delete_service']['errors'])
+        self.assertEqual(
+            ['rating.hashmap.get_service', 'rating.hashmap.delete_service'],
+            [t[0] for t in self.request._cloudkitty_timings])
+
+    def test_other_attributes_are_not_wrapped(self):
+        proxy = self.metrics.InstrumentedProxy(self.client, self.request)
+        self.assertIs(self.client.session, proxy.session)
+        self.assertIs(self.client.rating.api_client,
+                      proxy.rating.api_client)
+
+    def test_server_timing(self):
+        timings = [('report.get_total', 0.01, 10, False),
+                   ('info.get_config', 0.002, 5, False),
+                   ('report.get_total', 0.03, 20, True)]
+        self.assertEqual(
+            'ck.report.get_total;dur=40.0;desc="2 call(s), 30 bytes", '
+            'ck.info.get_config;dur=2.0;desc="1 call(s), 5 bytes"',
+            self.metrics.server_timing(timings))
+
+    def test_render_prometheus(self):
+        self.metrics.record('info.get_config', 0.5, 12, True)
+        output = self.metrics.registry.render_prometheus()
+        self.assertIn('# TYPE cloudkitty_api_calls_total counter\n', output)
+        self.assertIn('cloudkitty_api_calls_total{call="info.get_config"} 1\n',
+                      output)
+        self.assertIn(
+            'cloudkitty_api_response_bytes_total{call="info.get_config"} 12\n',
+            output)
+
+
+class ServerTimingMiddlewareTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(ServerTimingMiddlewareTest, self).setUp()
+        from cloudkittydashboard.api import metrics
+        from cloudkittydashboard import middleware
+        self.metrics = metrics
+        self.middleware = middleware
+
+    def test_server_timing_header(self):
+        request = mock.Mock(spec=['path'], path='/project/rating/')
+
+        def get_response(request):
+            self.metrics.record('report.get_total', 0.01, 10, False, request)
+            response = http.HttpResponse()
+            response['Server-Timing'] = 'app;dur=20'
+            return response
+
+        response = self.middleware.ServerTimingMiddleware(get_response)(
+            request)
+        self.assertEqual(
+            'app;dur=20, ck.report.get_total;dur=10.0;'
+            'desc="1 call(s), 10 bytes"',
+            response['Server-Timing'])
+
+    def test_no_calls(self):
+        request = mock.Mock(spec=['path'], path='/project/rating/')
+        response = self.middleware.ServerTimingMiddleware(
+            lambda r: http.HttpResponse())(request)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @test_utils.override_settings(CLOUDKITTY_METRICS_PATH='/metrics')
+    def test_metrics_path(self):
+        request = mock.Mock(spec=['path', 'META'], path='/metrics',
+                            META={'REMOTE_ADDR': '127.0.0.1'})
+        get_response = mock.Mock()
+        response = self.middleware.ServerTimingMiddleware(get_response)(
+            request)
+        get_response.assert_not_called()
+        self.assertIn(b'cloudkitty_api_calls_total', response.content)
+
+    @test_utils.override_settings(
+        CLOUDKITTY_METRICS_PATH='/metrics',
+        CLOUDKITTY_METRICS_ALLOWED_NETWORKS=['10.0.0.0/8'])
+    def test_metrics_allowed_networks(self):
+        middleware = self.middleware.ServerTimingMiddleware(mock.Mock())
+        for address, status in (('10.1.2.3', 200), ('127.0.0.1', 403),
+                                ('192.0.2.1', 403), (None, 403)):
+            request = mock.Mock(spec=['path', 'META'], path='/metrics',
+                                META={'REMOTE_ADDR': address})
+            self.assertEqual(middleware(request).status_code, status,
+                             address)
@@ -16,6 +16,8 @@ import os
 from unittest import mock
 
 from django import http
+from django.test import client as test_client
+from django.test import utils as test_utils
 
 from cloudkittydashboard.tests import base
 
@@ -61,9 +63,7 @@ class PredictivePricingTest(base.TestCase):
         request.method = 'POST'
         request.body = json.dumps(body)
 
-        client_mock = mock.MagicMock()
-        client_mock.rating.get_quotation.return_value = 42.0
-        api_mock.cloudkittyclient.return_value = client_mock
+        api_mock.get_quotation.return_value = 42.0
 
         settings = mock.MagicMock()
         settings.CLOUDKITTY_QUOTATION_SERVICE = 'test_service'
@@ -72,9 +72,58 @@ class PredictivePricingTest(base.TestCase):
                 settings):
             resp = self.quote(request)
 
-        api_mock.cloudkittyclient.assert_called_with(request)
-        client_mock.rating.get_quotation.assert_called_with(
-            res_data=expected_body)
+        api_mock.get_quotation.assert_called_with(request, expected_body)
         self.assertIsInstance(resp, http.HttpResponse)
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(resp.content.decode(), '42.0')
+
+
+class QuoteBatchTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(QuoteBatchTest, self).setUp()
+        from cloudkittydashboard.dashboards.project.rating import views
+        self.views = views
+        self.factory = test_client.RequestFactory()
+
+    def _post(self, body):
+        request = self.factory.post('/project/rating/quote/batch',
+                                    data=json.dumps(body),
+                                    content_type='application/json')
+        request.user = mock.MagicMock()
+        return self.views.quote_batch(request)
+
+    @mock.patch('cloudkittydashboard.dashboards.project.rating.views.api.'
+                'get_quotation')
+    def test_quote_batch(self, quotation_mock):
+        def get_quotation(request, res_data):
+            if res_data[0]['desc']['flavor'] == 'broken':
+                raise ValueError()
+            return {'m1.small': 1.5, 'm1.large': 3}[
+                res_data[0]['desc']['flavor']]
+
+        quotation_mock.side_effect = get_quotation
+        specs = [[{'desc': {'flavor': flavor}, 'volume': 1}]
+                 for flavor in ('m1.small', 'broken', 'm1.large')]
+        response = self._post(specs)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), [1.5, None, 3.0])
+        self.assertEqual(quotation_mock.call_count, 3)
+        self.assertEqual(
+            quotation_mock.call_args_list[0][0][1],
+            [{'desc': {'flavor': 'm1.small'}, 'volume': 1,
+              'service': 'instance'}])
+
+    def test_quote_batch_invalid_body(self):
+        self.assertEqual(self._post({'not': 'a list'}).status_code, 400)
+        with test_utils.override_settings(CLOUDKITTY_QUOTE_BATCH_MAX_SIZE=1):
+            self.assertEqual(self._post([[], []]).status_code, 400)
+
+    def test_quote_batch_malformed_specs(self):
+        for specs in (['x'], [1], [None], [[{'volume': 1}, 'x']], [[[]]]):
+            self.assertEqual(self._post(specs).status_code, 400, specs)
+
+    def test_quote_batch_requires_post(self):
+        request = self.factory.get('/project/rating/quote/batch')
+        self.assertEqual(self.views.quote_batch(request).status_code, 405)
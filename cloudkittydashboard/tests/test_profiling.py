@@ -0,0 +1,173 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+import time
+from unittest import mock
+
+from django import http
+from django.test import utils as test_utils
+
+from cloudkittydashboard.tests import base
+
+
+def _slow_function():
+    return sum(i * i for i in range(1000))
+
+
+class ProfileStoreTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(ProfileStoreTest, self).setUp()
+        from cloudkittydashboard import profiling
+        self.store = profiling.ProfileStore(max_size=2)
+
+    def test_ring_buffer(self):
+        first = self.store.add('View', '/a', 'cprofile', 0.1, [])
+        second = self.store.add('View', '/b', 'cprofile', 0.1, [])
+        third = self.store.add('View', '/c', 'cprofile', 0.1, [])
+        self.assertEqual([third, second], self.store.list())
+        self.assertIsNone(self.store.get(first['id']))
+        self.assertIs(second, self.store.get(second['id']))
+
+
+class SamplerTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(SamplerTest, self).setUp()
+        from cloudkittydashboard import profiling
+        self.sampler = profiling.Sampler(budget=1, interval=0.01)
+        # Samples are taken by the tests
+        self.sampler._thread = mock.Mock()
+
+    def test_only_slow_requests_are_sampled(self):
+        start = time.monotonic()
+        samples = self.sampler.register(start)
+        self.sampler._sample(start + 0.5)
+        self.assertEqual(0, samples['count'])
+        self.sampler._sample(start + 1.5)
+        self.assertEqual(1, samples['count'])
+        self.sampler.unregister()
+        self.sampler._sample(start + 2)
+        self.assertEqual(1, samples['count'])
+
+        # The thread sampled itself
+        functions = self.sampler.functions(samples, 100)
+        self.assertIn('(_sample)', functions[0]['name'])
+        self.assertEqual(0.01, functions[0]['self'])
+        self.assertIn('(test_only_slow_requests_are_sampled)',
+                      ' '.join(f['name'] for f in functions))
+
+
+class ProfilingMiddlewareTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(ProfilingMiddlewareTest, self).setUp()
+        from cloudkittydashboard.dashboards.admin.summary import views
+        from cloudkittydashboard import middleware
+        from cloudkittydashboard import profiling
+        self.view = views.IndexView.as_view()
+        self.middleware = middleware
+        self.store = profiling.store
+        self.store.clear()
+        self.addCleanup(self.store.clear)
+
+    def _request(self, header=False, superuser=True):
+        request = mock.Mock(spec=['path', 'META', 'user'])
+        request.path = '/admin/rating_summary/'
+        request.META = {'HTTP_X_CLOUDKITTY_PROFILE': '1'} if header else {}
+        request.user.is_authenticated = True
+        request.user.is_superuser = superuser
+        return request
+
+    def _get_response(self, middleware, view):
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            _slow_function()
+            return http.HttpResponse()
+        return get_response
+
+    @test_utils.override_settings(CLOUDKITTY_PROFILING_BUDGET=None)
+    def test_cprofile(self):
+        middleware = self.middleware.ProfilingMiddleware(None)
+        middleware.get_response = self._get_response(middleware, self.view)
+        middleware(self._request(header=True))
+
+        profile = self.store.list()[0]
+        self.assertEqual(
+            'cloudkittydashboard.dashboards.admin.summary.views.IndexView',
+            profile['view'])
+        self.assertEqual('cprofile', profile['mode'])
+        self.assertIn('_slow_function',
+                      ' '.join(f['name'] for f in profile['functions']))
+
+    @test_utils.override_settings(CLOUDKITTY_PROFILING_BUDGET=None)
+    def test_header_requires_superuser(self):
+        middleware = self.middleware.ProfilingMiddleware(None)
+        middleware.get_response = self._get_response(middleware, self.view)
+        middleware(self._request(header=True, superuser=False))
+        self.assertEqual([], self.store.list())
+
+    @test_utils.override_settings(CLOUDKITTY_PROFILING_BUDGET=None)
+    def test_other_views_are_ignored(self):
+        middleware = self.middleware.ProfilingMiddleware(None)
+        middleware.get_response = self._get_response(
+            middleware, http.HttpResponse)
+        middleware(self._request(header=True))
+        self.assertEqual([], self.store.list())
+
+    @test_utils.override_settings(CLOUDKITTY_PROFILING_BUDGET=0)
+    def test_sampling(self):
+        middleware = self.middleware.ProfilingMiddleware(None)
+        sampler = middleware.sampler
+        sampler._thread = mock.Mock()
+
+        def get_response(request):
+            middleware.process_view(request, self.view, (), {})
+            sampler._sample(time.monotonic() + 1)
+            return http.HttpResponse()
+
+        middleware.get_response = get_response
+        middleware(self._request())
+
+        profile = self.store.list()[0]
+        self.assertEqual('sampling', profile['mode'])
+        self.assertIn('(get_response)',
+                      ' '.join(f['name'] for f in profile['functions']))
+        self.assertEqual({}, sampler._threads)
+
+
+class ProfilingViewsTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(ProfilingViewsTest, self).setUp()
+        from cloudkittydashboard.dashboards.admin.profiling import views
+        from cloudkittydashboard import profiling
+        self.views = views
+        self.store = profiling.store
+        self.store.clear()
+        self.addCleanup(self.store.clear)
+
+    def test_profile_details(self):
+        functions = [{'name': 'f', 'calls': 1, 'self': 0.1,
+                      'cumulative': 0.2}]
+        profile = self.store.add('View', '/a', 'cprofile', 0.2, functions)
+
+        view = self.views.ProfileDetailsView()
+        view.kwargs = {'profile_id': profile['id']}
+        self.assertEqual(functions, view.get_data())
+
+        view.kwargs = {'profile_id': 'unknown'}
+        self.assertRaises(http.Http404, view.get_data)
+
+    def test_index(self):
+        profile = self.store.add('View', '/a', 'sampling', 0.2, [])
+        self.assertEqual([profile], self.views.IndexView().get_data())
@@ -0,0 +1,245 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+import datetime
+import json
+import random
+from unittest import mock
+
+from django.test import client as test_client
+
+from cloudkittydashboard.tests import base
+
+
+def generate_dataframes(n_frames, n_resources, services, step=3600,
+                        seed=42):
+    rand = random.Random(seed)
+    start = datetime.datetime(2019, 3, 1)
+    dataframes = []
+    for i in range(n_frames):
+        begin = start + datetime.timedelta(seconds=i * step)
+        dataframes.append({
+            'begin': begin.strftime('%Y-%m-%dT%H:%M:%S'),
+            'end': (begin + datetime.timedelta(seconds=step)).strftime(
+                '%Y-%m-%dT%H:%M:%S'),
+            'resources': [{
+                'service': rand.choice(services),
+                'rating': str(round(rand.uniform(0, 10), 4)),
+            } for _ in range(rand.randint(0, n_resources))],
+        })
+    rand.shuffle(dataframes)
+    return {'dataframes': dataframes}
+
+
+class DoThisMonthTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(DoThisMonthTest, self).setUp()
+        from cloudkittydashboard.dashboards.project.reporting import views
+        self.views = views
+
+    def assertSameAggregation(self, data):
+        expected = self.views._do_this_month_reference(data)
+        result = self.views._do_this_month(data)
+        self.assertEqual(list(result.keys()), list(expected.keys()))
+        for service, values in expected.items():
+            self.assertAlmostEqual(float(result[service]['cumulated']),
+                                   float(values['cumulated']), places=6)
+            self.assertEqual(list(result[service]['hourly'].keys()),
+                             list(values['hourly'].keys()))
+            for got, want in zip(result[service]['hourly'].values(),
+                                 values['hourly'].values()):
+                self.assertAlmostEqual(got, want, places=9)
+
+    def test_empty(self):
+        self.assertEqual(self.views._do_this_month({}), {})
+        self.assertEqual(
+            self.views._do_this_month({'dataframes': [
+                {'begin': '2019-03-01T00:00:00', 'resources': []}]}),
+            {})
+
+    def test_equivalence_hourly(self):
+        self.assertSameAggregation(generate_dataframes(
+            200, 20, ['compute', 'volume', 'image', 'network']))
+
+    def test_equivalence_with_gaps(self):
+        data = generate_dataframes(24, 5, ['compute', 'volume'],
+                                   step=3 * 3600)
+        self.assertSameAggregation(data)
+
+    def test_equivalence_off_grid(self):
+        data = generate_dataframes(10, 5, ['compute'])
+        data['dataframes'].append({
+            'begin': '2019-03-01T01:30:00',
+            'resources': [{'service': 'volume', 'rating': '1.5'}]})
+        self.assertSameAggregation(data)
+
+    def test_equivalence_empty_frames(self):
+        data = {'dataframes': [
+            {'begin': '2019-03-01T00:00:00', 'resources': []},
+            {'begin': '2019-03-01T02:00:00', 'resources': [
+                {'service': 'compute', 'rating': '2'}]},
+            {'begin': '2019-03-01T04:00:00', 'resources': []},
+        ]}
+        self.assertSameAggregation(data)
+        self.assertEqual(
+            len(self.views._do_this_month(data)['compute']['hourly']), 5)
+        # Empty frames in a chunk of their own
+        aggregator = self.views.DataframeAggregator()
+        for frame in data['dataframes']:
+            aggregator.add({'dataframes': [frame]})
+        self.assertEqual(
+            list(aggregator.result()['compute']['hourly'].values()),
+            [0, 0, 2.0, 0, 0])
+
+    def test_equivalence_incremental(self):
+        data = generate_dataframes(100, 10, ['compute', 'volume', 'image'])
+        aggregator = self.views.DataframeAggregator()
+        frames = sorted(data['dataframes'], key=lambda f: f['begin'])
+        for i in range(0, len(frames), 7):
+            aggregator.add({'dataframes': frames[i:i + 7]})
+        expected = self.views._do_this_month_reference(data)
+        result = aggregator.result()
+        self.assertEqual(list(result['compute']['hourly'].items()),
+                         list(expected['compute']['hourly'].items()))
+        self.assertEqual(sorted(result.keys()), sorted(expected.keys()))
+
+    def test_choose_resolution(self):
+        aggregator = self.views.DataframeAggregator()
+        self.assertEqual(aggregator.choose_resolution(10), ('hour', 3600))
+        # 2 services, 24 * 10 hours
+        aggregator.add(generate_dataframes(24 * 10, 5, ['a', 'b']))
+        self.assertEqual(aggregator.choose_resolution(480), ('hour', 3600))
+        self.assertEqual(aggregator.choose_resolution(479), ('day', 86400))
+        self.assertEqual(aggregator.choose_resolution(4), ('week', 604800))
+        self.assertEqual(aggregator.choose_resolution(1), ('week', 604800))
+
+    def test_downsampling(self):
+        data = generate_dataframes(24 * 10, 5, ['a', 'b'])
+        aggregator = self.views.DataframeAggregator()
+        aggregator.add(data)
+        hourly = aggregator.result()
+        daily = aggregator.result(step=86400)
+        for service in ('a', 'b'):
+            self.assertEqual(len(daily[service]['hourly']), 10)
+            hours = list(hourly[service]['hourly'].values())
+            days = list(daily[service]['hourly'].values())
+            for i, value in enumerate(days):
+                self.assertAlmostEqual(value, sum(hours[i * 24:i * 24 + 24]))
+            self.assertEqual(daily[service]['cumulated'],
+                             hourly[service]['cumulated'])
+
+    def test_series(self):
+        data = generate_dataframes(48, 5, ['a', 'b'])
+        aggregator = self.views.DataframeAggregator()
+        self.assertEqual(aggregator.series(),
+                         {'timestamps': [], 'services': []})
+        aggregator.add(data)
+        result = aggregator.result()
+        series = aggregator.series()
+        self.assertEqual(series['timestamps'],
+                         list(result['a']['hourly'].keys()))
+        self.assertEqual([s['name'] for s in series['services']],
+                         list(result.keys()))
+        for service in series['services']:
+            self.assertEqual(
+                service['values'],
+                list(result[service['name']]['hourly'].values()))
+            self.assertAlmostEqual(
+                service['cumulated'],
+                float(result[service['name']]['cumulated']))
+
+
+class GetThisMonthTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(GetThisMonthTest, self).setUp()
+        from cloudkittydashboard.dashboards.project.reporting import views
+        self.views = views
+
+    def test_iter_windows(self):
+        windows = list(self.views._iter_windows(
+            '2019-03-01T00:00:00', '2019-03-17T23:59:59', 7))
+        self.assertEqual(windows, [
+            ('2019-03-01T00:00:00', '2019-03-08T00:00:00'),
+            ('2019-03-08T00:00:00', '2019-03-15T00:00:00'),
+            ('2019-03-15T00:00:00', '2019-03-17T23:59:59'),
+        ])
+        self.assertEqual(
+            list(self.views._iter_windows('a', 'b', 0)), [('a', 'b')])
+
+    def test_get_this_month_fetches_windows(self):
+        data = generate_dataframes(24 * 10, 5, ['compute', 'volume'])
+
+        def get_dataframes(begin, end, tenant_id):
+            frames = [f for f in data['dataframes'] if begin <= f['begin']]
+            return {'dataframes': [f for f in frames if f['end'] <= end]}
+
+        client = mock.MagicMock()
+        client.storage.get_dataframes.side_effect = get_dataframes
+        settings = mock.MagicMock(CLOUDKITTY_REPORTING_FETCH_WINDOW=3,
+                                  CLOUDKITTY_REPORTING_MAX_POINTS=1000)
+        with mock.patch.object(self.views, 'settings', settings):
+            result, granularity = self.views._get_this_month(
+                client, '2019-03-01T00:00:00', '2019-03-11T00:00:00', 'p1')
+
+        self.assertEqual(client.storage.get_dataframes.call_count, 4)
+        self.assertEqual(granularity, 'hour')
+        expected = self.views._do_this_month_reference(data)
+        self.assertEqual(list(result['volume']['hourly'].items()),
+                         list(expected['volume']['hourly'].items()))
+
+    def test_get_period(self):
+        today = datetime.datetime(2019, 2, 14)
+        form = self.views.forms.DateForm(
+            {'start': '2019-01-03', 'end': '2019-01-05'})
+        self.assertEqual(
+            self.views._get_period(form, today),
+            ('2019-01-03T00:00:00', '2019-01-05T23:59:59'))
+        form = self.views.forms.DateForm({})
+        self.assertEqual(
+            self.views._get_period(form, today),
+            ('2019-02-01T00:00:00', '2019-02-28T23:59:59'))
+
+    @mock.patch('cloudkittydashboard.api.cloudkitty.cloudkittyclient')
+    def test_data_view(self, client_mock):
+        data = generate_dataframes(24, 5, ['compute'])
+        client_mock.return_value.storage.get_dataframes.return_value = data
+        request = test_client.RequestFactory().get(
+            '/project/reporting/data',
+            {'start': '2019-03-01', 'end': '2019-03-01'})
+        request.user = mock.MagicMock(tenant_id='p1')
+
+        response = self.views.data(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age=', response['Cache-Control'])
+        payload = json.loads(response.content)
+        self.assertEqual(payload['granularity'], 'hour')
+        self.assertEqual(len(payload['timestamps']), 24)
+        self.assertEqual(payload['services'][0]['name'], 'compute')
+        client_mock.return_value.storage.get_dataframes.assert_called_with(
+            begin='2019-03-01T00:00:00', end='2019-03-01T23:59:59',
+            tenant_id='p1')
+
+    def test_data_url_is_scoped_to_project(self):
+        request = test_client.RequestFactory().get(
+            '/project/reporting/',
+            {'start': '2019-03-01', 'end': '2019-03-02'})
+        request.user = mock.MagicMock(tenant_id='p1')
+        request.session = {}
+        tab = self.views.CostRepartitionTab(mock.MagicMock(), request)
+
+        context = tab.get_context_data(request)
+
+        self.assertIn('tenant_id=p1', context['data_url'])
+        self.assertIn('start=2019-03-01', context['data_url'])
@@ -0,0 +1,143 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+from unittest import mock
+
+from django.test import utils as test_utils
+
+from cloudkittydashboard.tests import base
+
+
+class SummaryIndexViewTest(base.DashboardTestCase):
+
+    def setUp(self):
+        super(SummaryIndexViewTest, self).setUp()
+        from cloudkittydashboard.dashboards.admin.summary import views
+        self.views = views
+        self.summary = [
+            {'tenant_id': 'p1', 'rate': '1.5'},
+            {'tenant_id': 'p2', 'rate': '3'},
+            {'tenant_id': 'p3', 'rate': '0.25'},
+        ]
+        self.names = {'p1': 'one', 'p2': 'two'}
+        patcher = mock.patch.object(views.api, 'get_rating_summary',
+                                    return_value=self.summary)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(
+            views.api, 'resolve_project_names',
+            side_effect=lambda request, ids: {
+                i: self.names[i] for i in ids if i in self.names})
+        self.resolve = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get_view(self, **params):
+        view = self.views.IndexView()
+        view.request = mock.MagicMock()
+        view.request.GET = params
+        view.request.session = {}
+        view.request.COOKIES = {}
+        view.kwargs = {}
+        return view
+
+    def _get_rows(self, **params):
+        data = self._get_view(**params).get_data()
+        return [(d['tenant_id'], d['name'], str(d['rate'])) for d in data]
+
+    def test_get_data(self):
+        self.assertEqual(
+            self._get_rows(),
+            [('p2', 'two', '3'), ('p1', 'one', '1.5'), ('p3', '-', '0.25'),
+             ('ALL', 'Cloud Total', '4.75')])
+        # The cached summary must not be modified
+        self.assertEqual(self.summary[0], {'tenant_id': 'p1', 'rate': '1.5'})
+
+    def test_sort_by_name(self):
+        self.assertEqual(
+            [row[0] for row in self._get_rows(sort='name')],
+            ['p3', 'p1', 'p2', 'ALL'])
+        self.assertEqual(
+            [row[0] for row in self._get_rows(sort='rate', dir='asc')],
+            ['p3', 'p1', 'p2', 'ALL'])
+
+    @test_utils.override_settings(API_RESULT_PAGE_SIZE=2)
+    def test_pagination(self):
+        view = self._get_view()
+        self.assertEqual([row['tenant_id'] for row in view.get_data()],
+                         ['p2', 'p1', 'ALL'])
+        self.assertFalse(view._has_prev_data)
+        self.assertTrue(view._has_more_data)
+        # Only the names of the displayed projects are resolved
+        self.resolve.assert_called_once_with(view.request, ['p2', 'p1'])
+
+        view = self._get_view(marker='p1')
+        data = view.get_data()
+        # The total is computed over all the projects, not only this page
+        self.assertEqual(
+            [(row['tenant_id'], str(row['rate'])) for row in data],
+            [('p3', '0.25'), ('ALL', '4.75')])
+        self.assertTrue(view._has_prev_data)
+        self.assertFalse(view._has_more_data)
+
+        view = self._get_view(prev_marker='p3')
+        self.assertEqual([row['tenant_id'] for row in view.get_data()],
+                         ['p2', 'p1', 'ALL'])
+        self.assertFalse(view._has_prev_data)
+
+    def test_markers_skip_cloud_total(self):
+        view = self._get_view(sort='name')
+        table = self.views.sum_tables.SummaryTable(
+            view.request, data=view.get_data())
+        self.assertEqual(table.get_prev_marker(), 'p3')
+        self.assertEqual(table.get_marker(), 'p2')
+        self.assertEqual(table.get_pagination_string(),
+                         'marker=p2&sort=name')
+
+    def test_top(self):
+        view = self._get_view(top='2')
+        data = view.get_data()
+        self.assertEqual(
+            [(d['tenant_id'], d['name'], str(d['rate'])) for d in data],
+            [('p2', 'two', '3'), ('p1', 'one', '1.5'),
+             ('OTHERS', 'Others', '0.25'), ('ALL', 'Cloud Total', '4.75')])
+        self.assertFalse(view._has_more_data)
+
+    def test_min_rate(self):
+        self.assertEqual(
+            self._get_rows(min_rate='1', sort='name'),
+            [('p1', 'one', '1.5'), ('p2', 'two', '3'),
+             ('OTHERS', 'Others', '0.25'), ('ALL', 'Cloud Total', '4.75')])
+        self.assertEqual(
+            [row[0] for row in self._get_rows(min_rate='2', top='5')],
+            ['p2', 'OTHERS', 'ALL'])
+
+    def test_invalid_filters_are_ignored(self):
+        self.assertEqual(
+            [row[0] for row in self._get_rows(top='-1', min_rate='x')],
+            ['p2', 'p1', 'p3', 'ALL'])
+
+
+class TenantDetailsViewTest(base.DashboardTestCase):
+
+    @mock.patch('cloudkittydashboard.api.cloudkitty.get_project_summary')
+    def test_get_data(self, summary_mock):
+        from cloudkittydashboard.dashboards.admin.summary import views
+        summary_mock.return_value = [
+            {'tenant_id': 'p1', 'res_type': 'cpu', 'rate': 1.0},
+            {'tenant_id': 'p1', 'res_type': 'image', 'rate': 0.5}]
+        view = views.TenantDetailsView()
+        view.request = mock.MagicMock()
+        view.kwargs = {'project_id': 'p1'}
+        self.assertEqual(
+            [(d['res_type'], str(d['rate'])) for d in view.get_data()],
+            [('cpu', '1.0'), ('image', '0.5'), ('TOTAL', '1.5')])
+        summary_mock.assert_called_once_with(view.request, 'p1')
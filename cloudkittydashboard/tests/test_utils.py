@@ -12,8 +12,12 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 #
+import decimal
 import unittest
 
+from django.test import utils as test_utils
+
+from cloudkittydashboard.tests import base
 from cloudkittydashboard import utils
 
 
@@ -26,3 +30,31 @@ class TemplatizableDictTest(unittest.TestCase):
     def test_hasattr_attr_does_not_exist(self):
         obj = utils.TemplatizableDict(a=1, b=2)
         self.assertFalse(hasattr(obj, 'c'))
+
+
+class SummarizeTest(unittest.TestCase):
+
+    def test_summarize(self):
+        items = [{'type': 'a', 'rate': 0.1}, {'type': 'b', 'rate': 0.2},
+                 {'type': 'c', 'rate': '1.05'}, {'type': 'd', 'rate': None}]
+        result = utils.summarize(items, {'type': 'TOTAL'})
+        self.assertIs(result, items)
+        self.assertEqual(
+            [(item['type'], item['rate']) for item in result],
+            [('a', decimal.Decimal('0.1')), ('b', decimal.Decimal('0.2')),
+             ('c', decimal.Decimal('1.05')), ('d', decimal.Decimal(0)),
+             ('TOTAL', decimal.Decimal('1.35'))])
+
+    def test_sum_rates(self):
+        items = [{'rate': 0.1}, {'rate': 0.2}]
+        self.assertEqual(utils.sum_rates(items), decimal.Decimal('0.3'))
+        self.assertEqual(items, [{'rate': 0.1}, {'rate': 0.2}])
+
+
+class FormatRateTest(base.DashboardTestCase):
+
+    @test_utils.override_settings(OPENSTACK_CLOUDKITTY_RATE_PREFIX='$',
+                                  OPENSTACK_CLOUDKITTY_RATE_POSTFIX=' USD')
+    def test_rate_formatter(self):
+        format_rate = utils.rate_formatter()
+        self.assertEqual(format_rate(decimal.Decimal('1.35')), '$1.35 USD')
@@ -13,15 +13,19 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 #
+import decimal
+
+from django.conf import settings
 
 
 class TemplatizableDict(dict):
     """Class allowing to pass a dict to horizon templates"""
 
     def __getattr__(self, key):
-        if key in self.keys():
+        try:
             return self[key]
-        raise AttributeError("Object has no {} attribute".format(key))
+        except KeyError:
+            raise AttributeError("Object has no {} attribute".format(key))
 
     def __setattr__(self, key, val):
         self[key] = val
@@ -34,3 +38,59 @@ def formatRate(rate: float, prefix: str, postfix: str) -> str:
     if postfix:
         rate = rate + postfix
     return rate
+
+
+def to_decimal(rate) -> decimal.Decimal:
+    """Convert a rate returned by the API to a Decimal.
+
+    Floats are converted through their shortest representation, so that
+    ``0.1`` becomes ``Decimal('0.1')`` rather than its binary expansion.
+    """
+    if isinstance(rate, float):
+        return decimal.Decimal(repr(rate))
+    if isinstance(rate, decimal.Decimal):
+        return rate
+    return decimal.Decimal(rate or 0)
+
+
+def sum_rates(items, key='rate') -> decimal.Decimal:
+    """Return the exact sum of the rates of the given items."""
+    total = decimal.Decimal(0)
+    for item in items:
+        total += to_decimal(item[key])
+    return total
+
+
+def summarize(items, total_row, key='rate'):
+    """Convert the rates of items to Decimal and append a total row.
+
+    This is done in a single pass over ``items``, which is modified in place.
+    Rates are left unformatted, see :func:`rate_formatter`.
+
+    :param items: List of dicts.
+    :param total_row: Dict appended to ``items``, its ``key`` is set to the
+                      sum of the rates.
+    :returns: ``items``.
+    """
+    total = decimal.Decimal(0)
+    for item in items:
+        rate = item[key] = to_decimal(item[key])
+        total += rate
+    total_row[key] = total
+    items.append(total_row)
+    return items
+
+
+def rate_formatter():
+    """Return a function formatting rates with the configured affixes.
+
+    Meant to be used as a filter of the rate columns of tables, so that only
+    the rendered rows are formatted. The settings are read once, when the
+    formatter is created.
+    """
+    prefix = getattr(settings, 'OPENSTACK_CLOUDKITTY_RATE_PREFIX', None)
+    postfix = getattr(settings, 'OPENSTACK_CLOUDKITTY_RATE_POSTFIX', None)
+
+    def format_rate(rate) -> str:
+        return formatRate(rate, prefix, postfix)
+    return format_rate